@@ -1,10 +1,12 @@
-from typing import Set
+from typing import Iterable, Set
 
+import settings
 from analysis.resource import Resource, RetrievalFailure
+from analysis.version_space import version_space
 from backends.software_version import SoftwareVersion
 from backends.static_file import StaticFile
 from base.checksum import calculate_checksum
-from settings import BACKEND, FAILED_ASSET_WEIGHT
+from settings import BACKEND
 
 
 class Asset(Resource):
@@ -42,29 +44,79 @@ class Asset(Resource):
         if self._success:
             self._checksum = calculate_checksum(self.content)
 
+    @property
+    def expected_bits(self) -> int:
+        """
+        Retrieve the versions which should provide an asset at this path
+        from the backend as a bitset of the version space.
+        """
+        if not hasattr(self, '_expected_bits'):
+            self._expected_bits = version_space.bitset(
+                BACKEND.retrieve_static_file_users_by_webroot_paths(
+                    self.webroot_path))
+        return self._expected_bits
+
     @property
     def expected_versions(self) -> Set[SoftwareVersion]:
         """
         Retrieve the versions which should provide an asset at this path
         from the backend.
         """
-        if not hasattr(self, '_expected_versions'):
-            self._expected_versions = BACKEND \
-                .retrieve_static_file_users_by_webroot_paths(
-                self.webroot_path)
-        return self._expected_versions
+        return version_space.materialize(self.expected_bits)
 
     @property
     def idf_weight(self):
         """Get the idf weight for this asset."""
         if not self.success:
-            return FAILED_ASSET_WEIGHT
+            return settings.FAILED_ASSET_WEIGHT
         if not hasattr(self, '_idf_weight'):
             # cache in python object
             self._idf_weight = BACKEND.retrieve_static_file_idf_weight(
                 self.checksum)
         return self._idf_weight
 
+    @staticmethod
+    def retrieve_idf_weights(assets: Iterable['Asset']):
+        """
+        Retrieve the idf weights of multiple assets at once and cache
+        them within the asset objects.
+        """
+        missing = [
+            asset
+            for asset in assets
+            if asset.success and not hasattr(asset, '_idf_weight')
+        ]
+        if not missing:
+            return
+        weights = BACKEND.retrieve_static_file_idf_weights(
+            asset.checksum for asset in missing)
+        for asset in missing:
+            asset._idf_weight = weights[asset.checksum]
+
+    @staticmethod
+    def retrieve_versions(assets: Iterable['Asset']):
+        """
+        Retrieve the expected and the using versions of multiple assets
+        at once and cache them within the asset objects.
+        """
+        missing = [
+            asset
+            for asset in assets
+            if not hasattr(asset, '_expected_bits') or
+            (asset.success and not hasattr(asset, '_using_bits'))
+        ]
+        if not missing:
+            return
+        users = BACKEND.retrieve_static_file_users_by_webroot_paths_and_checksums(
+            (asset.webroot_path, asset.checksum if asset.success else None)
+            for asset in missing)
+        for asset in missing:
+            expected_versions, using_versions = users[
+                asset.webroot_path, asset.checksum if asset.success else None]
+            asset._expected_bits = version_space.bitset(expected_versions)
+            if asset.success:
+                asset._using_bits = version_space.bitset(using_versions)
+
     def serialize(self) -> dict:
         """Serialize into a dict."""
         base = super().serialize()
@@ -99,16 +151,24 @@ class Asset(Resource):
                 self.checksum)
         return self._known_static_files
 
+    @property
+    def using_bits(self) -> int:
+        """
+        Retrieve the versions using this asset from the backend as a
+        bitset of the version space.
+        """
+        if not self.success:
+            return 0
+        if not hasattr(self, '_using_bits'):
+            self._using_bits = version_space.bitset(
+                BACKEND.retrieve_static_file_users_by_checksum(
+                    self.checksum))
+        return self._using_bits
+
     @property
     def using_versions(self) -> Set[SoftwareVersion]:
         """
         Retrieve the versions using this asset
         from the backend.
         """
-        if not self.success:
-            return set()
-        if not hasattr(self, '_using_versions'):
-            self._using_versions = BACKEND \
-                .retrieve_static_file_users_by_checksum(
-                self.checksum)
-        return self._using_versions
+        return version_space.materialize(self.using_bits)
@@ -1,16 +1,30 @@
-from typing import Optional
+from typing import Iterable, Optional
 
+import settings
 from backends.software_version import SoftwareVersion
-from settings import NEGATIVE_MATCH_WEIGHT, POSITIVE_MATCH_WEIGHT
 
 
 class Guess:
     """
     A guess during analysis.
+
+    The positive and negative strengths are accumulated when matches are
+    added. Therefore, comparing guesses does not require summing up the
+    idf weights of all matches.
     """
+    __slots__ = (
+        'software_version',
+        'positive_matches',
+        'negative_matches',
+        'positive_strength',
+        'negative_strength',
+    )
+
     # software_version: SoftwareVersion
-    # positive_matches: int
-    # negative_matches: int
+    # positive_matches: set
+    # negative_matches: set
+    # positive_strength: float
+    # negative_strength: float
 
     def __init__(
             self,
@@ -19,11 +33,13 @@ class Guess:
             negative_matches: Optional[set] = None):
         self.software_version = software_version
         self.positive_matches = set()
-        if positive_matches:
-            self.positive_matches = positive_matches
         self.negative_matches = set()
+        self.positive_strength = 0
+        self.negative_strength = 0
+        if positive_matches:
+            self.add_positive_matches(positive_matches)
         if negative_matches:
-            self.negative_matches = negative_matches
+            self.add_negative_matches(negative_matches)
 
     def __lt__(self, other) -> bool:
         return self.strength < other.strength
@@ -51,6 +67,20 @@ class Guess:
             len(self.negative_matches),
             self.negative_strength)
 
+    def add_negative_matches(self, assets: Iterable):
+        """Add assets which are expected but not used by the version."""
+        for asset in assets:
+            if asset not in self.negative_matches:
+                self.negative_matches.add(asset)
+                self.negative_strength += asset.idf_weight
+
+    def add_positive_matches(self, assets: Iterable):
+        """Add assets which are used by the version."""
+        for asset in assets:
+            if asset not in self.positive_matches:
+                self.positive_matches.add(asset)
+                self.positive_strength += asset.idf_weight
+
     def serialize(self) -> dict:
         """Serialize into a dict."""
         return {
@@ -69,26 +99,10 @@ class Guess:
             'negative_strength': self.negative_strength,
         }
 
-    @property
-    def negative_strength(self) -> float:
-        """The negative strength of the guess."""
-        return sum(
-            asset.idf_weight
-            for asset in self.negative_matches
-        )
-
-    @property
-    def positive_strength(self) -> float:
-        """The positive strength of the guess."""
-        return sum(
-            asset.idf_weight
-            for asset in self.positive_matches
-        )
-
     @property
     def strength(self) -> float:
         """The strength of the guess."""
         return (
-            POSITIVE_MATCH_WEIGHT * self.positive_strength +
-            NEGATIVE_MATCH_WEIGHT * self.negative_strength
+            settings.POSITIVE_MATCH_WEIGHT * self.positive_strength +
+            settings.NEGATIVE_MATCH_WEIGHT * self.negative_strength
         )
@@ -0,0 +1,82 @@
+import json
+import os
+from concurrent.futures import Future
+from typing import Iterable, List, Mapping, Optional
+
+from requests.exceptions import ConnectionError
+
+from analysis.resource import PERSISTED_METADATA_SUFFIX, Resource
+from analysis.resource_cache import CachedResponse, open_resource_cache
+from analysis.retrieval import RetrievalEngine
+
+
+class ReplayEngine(RetrievalEngine):
+    """
+    The replay engine serves responses recorded earlier instead of
+    retrieving them via HTTP.
+
+    path is either a directory of persisted resources (see
+    Resource.persist) or a resource cache directory. Alternatively, the
+    recorded responses are given by url as responses. Resources which
+    have not been recorded are regarded as failed retrievals; their urls
+    are collected in unrecorded. Either path or responses is required.
+    """
+    # path: Optional[str]
+    # unrecorded: List[str]
+
+    def __init__(
+            self, path: Optional[str] = None,
+            responses: Optional[Mapping[str, CachedResponse]] = None):
+        if path is None and responses is None:
+            raise ValueError('either path or responses is required')
+        super().__init__()
+        self.path = path
+        self.unrecorded = []
+        self._cache = responses
+        if responses is None and os.path.isfile(os.path.join(path, 'index.jsonl')):
+            self._cache = open_resource_cache(path)
+
+    def get(self, url: str) -> CachedResponse:
+        """Get the recorded response for url."""
+        if self._cache is not None:
+            if url in self._cache:
+                return self._cache[url]
+        else:
+            response = self._load_persisted(url)
+            if response is not None:
+                return response
+        self.unrecorded.append(url)
+        raise ConnectionError('{} has not been recorded'.format(url))
+
+    def submit(self, resources: Iterable[Resource]) -> List[Future]:
+        """Replay the resources immediately, as there is no latency to hide."""
+        futures = []
+        for resource in resources:
+            future = Future()
+            try:
+                resource.retrieve()
+            except Exception as ex:
+                future.set_exception(ex)
+            else:
+                future.set_result(None)
+            futures.append(future)
+        return futures
+
+    def _load_persisted(self, url: str) -> CachedResponse:
+        path = Resource.persist_path(self.path, url)
+        try:
+            with open(path + PERSISTED_METADATA_SUFFIX) as fdes:
+                metadata = json.load(fdes)
+        except FileNotFoundError:
+            return None
+        if metadata['url'] != url:
+            # a different url sharing the same persisted path
+            return None
+        with open(path, 'rb') as fdes:
+            content = fdes.read()
+        return CachedResponse(
+            url=metadata['final_url'],
+            status_code=metadata['status_code'],
+            headers=metadata['headers'],
+            encoding=metadata['encoding'],
+            content=content)
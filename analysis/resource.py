@@ -1,19 +1,23 @@
+import json
 import logging
 import os
 import traceback
 from typing import Optional, Set
 from urllib.parse import urlparse
 
-import requests
 from bs4 import BeautifulSoup
 from requests.exceptions import RequestException
 from urllib3.exceptions import HTTPError
 
+from analysis.retrieval import get_retrieval_engine
 from analysis.wappalyzer_apps import wappalyzer_apps
 from backends.software_version import SoftwareVersion
 from base.checksum import calculate_checksum
 from base.utils import clean_path_name
-from settings import BACKEND, HTML_PARSER, HTTP_TIMEOUT
+from settings import BACKEND, HTML_PARSER
+
+
+PERSISTED_METADATA_SUFFIX = '.meta.json'
 
 
 class RetrievalFailure(Exception):
@@ -69,12 +73,37 @@ class Resource:
     def persist(self, base_path: str):
         """
         Persist this resource underneath base_path.
+
+        The metadata of the response is stored next to its content, which
+        allows to replay it later.
         """
-        if not self.retrieved or not self.success:
+        if not self.retrieved or not self._success:
             logging.info('not storing not (successfully) retrieved resource %s' % self.url)
             return
 
-        parsed_url = urlparse(self.url)
+        path = self.persist_path(base_path, self.url)
+
+        logging.info('persisting resource %s at %s' % (self.url, path))
+
+        os.makedirs(
+            os.path.dirname(path),
+            exist_ok=True)
+
+        with open(path, 'wb') as fdes:
+            fdes.write(self._response.content)
+        with open(path + PERSISTED_METADATA_SUFFIX, 'w') as fdes:
+            json.dump({
+                'url': self.url,
+                'final_url': self._response.url,
+                'status_code': self._response.status_code,
+                'headers': dict(self._response.headers),
+                'encoding': self._response.encoding,
+            }, fdes)
+
+    @staticmethod
+    def persist_path(base_path: str, url: str) -> str:
+        """Get the path a resource with url is persisted at."""
+        parsed_url = urlparse(url)
         path_name = clean_path_name(parsed_url.path[1:]) or '__index__'
 
         if len(path_name) > 200:
@@ -83,20 +112,11 @@ class Resource:
                 calculate_checksum(path_name.encode()).hex(),
                 path_name[-50:]))
 
-        path = os.path.join(
+        return os.path.join(
             base_path,
             '_'.join((parsed_url.scheme, parsed_url.netloc)),
             path_name)
 
-        logging.info('persisting resource %s at %s' % (self.url, path))
-
-        os.makedirs(
-            os.path.dirname(path),
-            exist_ok=True)
-
-        with open(path, 'wb') as fdes:
-            fdes.write(self.content)
-
     @property
     def final_url(self) -> str:
         """The final url, i.e., the url of the resource after all redirects."""
@@ -118,12 +138,12 @@ class Resource:
         logging.info('Retrieving resource %s', self.url)
 
         try:
-            self._response = requests.get(self.url, timeout=HTTP_TIMEOUT)
+            self._response = get_retrieval_engine().get(self.url)
         except (HTTPError, RequestException, UnicodeError) as ex:
             logging.warning(str(ex))
             self._success = False
         else:
-            if self.cache:
+            if self.cache is not None:
                 self.cache[self.url] = self._response
             self._success = True
 
@@ -132,6 +152,11 @@ class Resource:
                 'Retrieval failure for %s',
                 self.url)
 
+    @property
+    def host(self) -> str:
+        """The host (network location) of the resource url."""
+        return urlparse(self.url).netloc
+
     @property
     def retrieved(self) -> bool:
         """Whether the resource has already been retrieved."""
@@ -0,0 +1,151 @@
+import json
+import os
+from threading import Lock
+from typing import Optional, Union
+
+from requests import Response
+from requests.compat import chardet
+from requests.structures import CaseInsensitiveDict
+
+from base.checksum import calculate_checksum
+
+
+class CachedResponse:
+    """
+    A response retrieved from the resource cache.
+
+    It provides the attributes of a requests.Response which are used
+    during the analysis.
+    """
+    __slots__ = ('url', 'status_code', 'headers', 'encoding', 'content')
+
+    # url: str
+    # status_code: int
+    # headers: CaseInsensitiveDict
+    # encoding: Optional[str]
+    # content: bytes
+
+    def __init__(
+            self, url: str, status_code: int, headers: dict,
+            encoding: Optional[str], content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.encoding = encoding
+        self.content = content
+
+    def __repr__(self) -> str:
+        return '<{} [{}]>'.format(self.__class__.__name__, self.status_code)
+
+    @property
+    def text(self) -> str:
+        """The content decoded the same way requests does."""
+        encoding = self.encoding
+        if encoding is None:
+            encoding = chardet.detect(self.content)['encoding'] or 'utf-8'
+        try:
+            return str(self.content, encoding, errors='replace')
+        except LookupError:
+            return str(self.content, errors='replace')
+
+
+class ResourceCache:
+    """
+    A content-addressed on-disk cache for retrieved resources.
+
+    The bodies are stored once per blake2 checksum within the objects
+    directory. The index file maps urls to the metadata of their
+    responses. New entries are appended to it, which allows multiple
+    processes to share a cache: entries appended by other processes are
+    read when looking up an unknown url.
+
+    It can be used in place of the dict cache of resources.
+    """
+    # path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = {}
+        self._index_offset = 0
+        self._lock = Lock()
+        os.makedirs(os.path.join(self.path, 'objects'), exist_ok=True)
+        self._read_index()
+
+    def __contains__(self, url: str) -> bool:
+        if url not in self._entries:
+            self._read_index()
+        return url in self._entries
+
+    def __getitem__(self, url: str) -> CachedResponse:
+        if url not in self:
+            raise KeyError(url)
+        entry = self._entries[url]
+        with open(self._object_path(entry['checksum']), 'rb') as fdes:
+            content = fdes.read()
+        return CachedResponse(
+            url=entry['final_url'],
+            status_code=entry['status_code'],
+            headers=entry['headers'],
+            encoding=entry['encoding'],
+            content=content)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __setitem__(self, url: str, response: Union[Response, CachedResponse]):
+        content = response.content
+        checksum = calculate_checksum(content).hex()
+        object_path = self._object_path(checksum)
+        if not os.path.isfile(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temporary_path = '{}.{}'.format(object_path, os.getpid())
+            with open(temporary_path, 'wb') as fdes:
+                fdes.write(content)
+            os.replace(temporary_path, object_path)
+
+        entry = {
+            'url': url,
+            'final_url': response.url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'checksum': checksum,
+        }
+        with self._lock:
+            self._entries[url] = entry
+            with open(self._index_path, 'a') as fdes:
+                # a single write keeps the lines of concurrent writers apart
+                fdes.write(json.dumps(entry) + '\n')
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, 'index.jsonl')
+
+    def _object_path(self, checksum: str) -> str:
+        return os.path.join(self.path, 'objects', checksum[:2], checksum[2:])
+
+    def _read_index(self):
+        """Read the entries appended to the index since the last read."""
+        with self._lock:
+            if not os.path.isfile(self._index_path):
+                return
+            with open(self._index_path, 'rb') as fdes:
+                fdes.seek(self._index_offset)
+                for line in fdes:
+                    if not line.endswith(b'\n'):
+                        # incomplete line which is currently being written
+                        break
+                    self._index_offset += len(line)
+                    entry = json.loads(line.decode())
+                    self._entries[entry['url']] = entry
+
+
+_caches = {}
+
+
+def open_resource_cache(path: str) -> ResourceCache:
+    """Get the resource cache at path, shared within the process."""
+    path = os.path.abspath(path)
+    if path not in _caches:
+        _caches[path] = ResourceCache(path)
+    return _caches[path]
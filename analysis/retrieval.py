@@ -0,0 +1,129 @@
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Thread
+from typing import Iterable, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from settings import HTTP_TIMEOUT, MAX_CONCURRENT_REQUESTS, \
+    MAX_CONCURRENT_REQUESTS_PER_HOST
+
+
+class RetrievalEngine:
+    """
+    The retrieval engine fetches resources via HTTP.
+
+    It keeps a session with per-host connection pools, so that the
+    connections are kept alive and reused for all resources of a site.
+
+    Multiple resources can be retrieved concurrently. The retrievals are
+    scheduled on an asyncio event loop running in a background thread,
+    which limits the concurrency per host. The blocking requests
+    themselves are executed within a thread pool.
+    """
+    # max_concurrent: int
+    # max_per_host: int
+
+    def __init__(
+            self, max_concurrent: int = MAX_CONCURRENT_REQUESTS,
+            max_per_host: int = MAX_CONCURRENT_REQUESTS_PER_HOST):
+        self.max_concurrent = max_concurrent
+        self.max_per_host = max_per_host
+        self._pid = None
+
+    def get(self, url: str) -> requests.Response:
+        """Retrieve url using the pooled session."""
+        self._prepare()
+        return self._session.get(url, timeout=HTTP_TIMEOUT)
+
+    def retrieve(self, resources: Iterable['Resource']):
+        """Retrieve multiple resources concurrently and wait for all of them."""
+        resources = [
+            resource
+            for resource in resources
+            if not resource.retrieved
+        ]
+        if len(resources) == 1:
+            # no need for concurrency
+            resources[0].retrieve()
+            return
+        wait(self.submit(resources))
+
+    def submit(self, resources: Iterable['Resource']) -> List[Future]:
+        """
+        Schedule the retrieval of multiple resources in the given order.
+
+        A future is returned for every resource. Cancelling a future
+        before the retrieval of its resource has started skips it, while
+        futures of started retrievals cannot be cancelled anymore.
+        """
+        self._prepare()
+        if self._loop is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+            self._loop = asyncio.new_event_loop()
+            Thread(target=self._loop.run_forever, daemon=True).start()
+        futures = []
+        for resource in resources:
+            future = Future()
+            asyncio.run_coroutine_threadsafe(
+                self._retrieve(resource, future), self._loop)
+            futures.append(future)
+        return futures
+
+    async def _retrieve(self, resource: 'Resource', future: Future):
+        host = resource.host
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        async with self._host_semaphores[host]:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                if not resource.retrieved:
+                    await self._loop.run_in_executor(
+                        self._executor, resource.retrieve)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+
+    def _prepare(self):
+        """
+        Create the session of the current process.
+
+        A (forked) worker process requires its own session, event loop
+        and thread pool, as threads and pooled connections are not
+        inherited.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_concurrent,
+            pool_maxsize=self.max_per_host)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+        self._executor = None
+        self._loop = None
+        self._host_semaphores = {}
+
+
+_engine = None
+
+
+def get_retrieval_engine() -> RetrievalEngine:
+    """Get the retrieval engine used to retrieve resources."""
+    global _engine
+    if _engine is None:
+        _engine = RetrievalEngine()
+    return _engine
+
+
+def set_retrieval_engine(engine: RetrievalEngine):
+    """Replace the retrieval engine used to retrieve resources."""
+    global _engine
+    _engine = engine
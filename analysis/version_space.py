@@ -0,0 +1,51 @@
+from typing import Iterable, Set
+
+from backends.software_version import SoftwareVersion
+from base.bitset import iterate_bits
+
+
+class VersionSpace:
+    """
+    A dense bit space of software versions.
+
+    Every version is assigned the next free bit when it is seen first.
+    Sets of versions are kept as integer bitsets of this space, and only
+    one instance of every version is kept.
+    """
+    # _bits: Dict[SoftwareVersion, int]
+    # _versions: List[SoftwareVersion]
+
+    def __init__(self):
+        self._bits = {}
+        self._versions = []
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def bit(self, version: SoftwareVersion) -> int:
+        """Get the bit of a version, assigning a new one if necessary."""
+        bit = self._bits.get(version)
+        if bit is None:
+            bit = len(self._versions)
+            self._bits[version] = bit
+            self._versions.append(version)
+        return bit
+
+    def bitset(self, versions: Iterable[SoftwareVersion]) -> int:
+        """Get the bitset of versions."""
+        result = 0
+        for version in versions:
+            result |= 1 << self.bit(version)
+        return result
+
+    def materialize(self, bitset: int) -> Set[SoftwareVersion]:
+        """Get the versions of a bitset."""
+        return {self._versions[bit] for bit in iterate_bits(bitset)}
+
+    def version(self, bit: int) -> SoftwareVersion:
+        """Get the version of a bit."""
+        return self._versions[bit]
+
+
+# the version space shared by all analyses of this process
+version_space = VersionSpace()
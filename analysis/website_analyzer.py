@@ -1,8 +1,9 @@
 import logging
 import os
-import pickle
 from collections import defaultdict
-from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+from concurrent.futures import Future, wait
+from heapq import nlargest
+from typing import FrozenSet, Iterable, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup, SoupStrainer
@@ -11,8 +12,12 @@ import settings
 from analysis.asset import Asset
 from analysis.guess import Guess
 from analysis.resource import Resource
+from analysis.resource_cache import ResourceCache, open_resource_cache
+from analysis.retrieval import get_retrieval_engine
+from analysis.version_space import version_space
 from backends.software_package import SoftwarePackage
 from backends.software_version import SoftwareVersion
+from base.bitset import iterate_bits
 from base.utils import join_url, most_recent_version
 from files import file_types_for_analysis
 from settings import BACKEND, HTML_PARSER, HTML_RELEVANT_ELEMENTS, \
@@ -26,18 +31,25 @@ class WebsiteAnalyzer:
     """
     # primary_url: str
     # retrieved_resources: Set[Resource]
-    # _cache: dict
-    _cache_file = None
+    # _cache: Union[dict, ResourceCache]
     debug_info = None
     persist_resources = None
 
-    def __init__(self, primary_url: str, cache_file: Optional[str] = None):
+    def __init__(
+            self, primary_url: str, cache_dir: Optional[str] = None,
+            cache: Union[dict, ResourceCache, None] = None):
         self.complete_retrieval = False
         self.dry_run = False
         self.retrieved_resources = set()
+        self._mapped_assets = set()
+        self._mapped_versions = 0
+        self._positive_strengths = []
+        self._negative_strengths = []
         self._cache = {}
-        if cache_file:
-            self._load_cache(cache_file)
+        if cache is not None:
+            self._cache = cache
+        elif cache_dir:
+            self._cache = open_resource_cache(cache_dir)
         if not primary_url.startswith(('http://', 'https://')):
             logging.warning('No scheme was given for the primary URL. Falling back to \'http://\' as scheme.')
             self.primary_url = 'http://{}'.format(primary_url)
@@ -45,8 +57,6 @@ class WebsiteAnalyzer:
             self.primary_url = primary_url
 
     def __del__(self):
-        if self._cache_file:
-            self._persist_cache()
         if self.persist_resources:
             self._persist_resources()
 
@@ -223,15 +233,18 @@ class WebsiteAnalyzer:
     def _get_best_guesses(self, limit: int) -> List[Guess]:
         """
         Extract the best guesses using the retrieved assets.
+
+        The versions are ranked by their accumulated strengths, guesses
+        are only created for the best ones.
         """
-        guesses = sorted((
-            Guess(version, count[0], count[1])
-            for version, count
-            in self._map_retrieved_assets_to_versions().items()
-            if version is not None), reverse=True)
+        Asset.retrieve_idf_weights(self.retrieved_assets)
+        mapped_versions = self._map_retrieved_assets_to_versions()
+        best_bits = nlargest(
+            limit, iterate_bits(mapped_versions), key=self._version_strength)
 
-        if not guesses:
+        if not best_bits:
             return []
+        guesses = [self._materialize_guess(bit) for bit in best_bits]
 
         best_guess_strength = guesses[0].strength
         min_strength = min(
@@ -241,7 +254,7 @@ class WebsiteAnalyzer:
             min_strength = float('-inf')
         return [
             guess
-            for guess in guesses[:limit]
+            for guess in guesses
             if guess.strength >= min_strength
         ]
 
@@ -287,41 +300,45 @@ class WebsiteAnalyzer:
                 for asset in self.retrieved_assets))
         status_codes = defaultdict(int)
         iteration_matching_assets = 0
-        for webroot_path, using_versions, different_checksums in assets_with_entropy:
-            if not self.complete_retrieval and \
-                    iteration_matching_assets >= settings.MIN_ASSETS_PER_ITERATION:
+        candidates = self._candidate_assets(assets_with_entropy)
+        retrievals = []
+        try:
+            for index, (asset, asset_debug_info) in enumerate(candidates):
+                if not self.complete_retrieval and \
+                        iteration_matching_assets >= settings.MIN_ASSETS_PER_ITERATION:
+                    logging.info(
+                        'Reached min iteration assets count. Stop iteration.')
+                    debug_info['finish_reason'] = 'min count reached'
+                    break
                 logging.info(
-                    'Reached min iteration assets count. Stop iteration.')
-                debug_info['finish_reason'] = 'min count reached'
-                break
-            url = join_url(self.primary_url, webroot_path)
-            logging.info(
-                'Regarding path %s used by %s versions with '
-                '%s different revisions', webroot_path, using_versions,
-                different_checksums)
-            asset_debug_info = {
-                'url': url,
-                'webroot_path': webroot_path,
-                'using_versions': using_versions,
-                'different_checksums': different_checksums,
-            }
-            if not self.dry_run:
-                asset = Asset(url, self._cache)
-                if asset in self.retrieved_resources:
-                    logging.info('asset already known, skipping')
-                    continue
-                success = False
-                if asset.success:
-                    status_codes[asset.status_code] += 1
-                    success = True
-                found_in_index = False
-                if asset.using_versions:
-                    iteration_matching_assets += 1
-                    found_in_index = True
-                self.retrieved_resources.add(asset)
-                asset_debug_info['success'] = success
-                asset_debug_info['found_in_index'] = found_in_index
-            debug_info['retrieved_assets'].append(asset_debug_info)
+                    'Regarding path %s used by %s versions with '
+                    '%s different revisions', asset_debug_info['webroot_path'],
+                    asset_debug_info['using_versions'],
+                    asset_debug_info['different_checksums'])
+                if asset is not None:
+                    self._retrieve_ahead(
+                        candidates, retrievals, index, iteration_matching_assets)
+                    retrievals[index].result()
+                    success = False
+                    if asset.success:
+                        status_codes[asset.status_code] += 1
+                        success = True
+                    found_in_index = False
+                    if asset.using_bits:
+                        iteration_matching_assets += 1
+                        found_in_index = True
+                    self.retrieved_resources.add(asset)
+                    asset_debug_info['success'] = success
+                    asset_debug_info['found_in_index'] = found_in_index
+                debug_info['retrieved_assets'].append(asset_debug_info)
+        finally:
+            # retrievals which have been started already cannot be
+            # cancelled; they are awaited so that none of them writes to
+            # the cache after the iteration, and their responses are
+            # available to later iterations
+            for retrieval in retrievals:
+                retrieval.cancel()
+            wait(retrievals)
 
         debug_info['asset_count'] = len(debug_info['retrieved_assets'])
 
@@ -357,32 +374,53 @@ class WebsiteAnalyzer:
 
         return guesses
 
-    def _load_cache(self, cache_file: str):
-        self._cache_file = cache_file
-        if not os.path.isfile(self._cache_file):
-            return
-        with open(cache_file, 'rb') as ca:
-            self._cache = pickle.load(ca)
-            assert isinstance(self._cache, dict), 'invalid cache file'
-
-    def _map_retrieved_assets_to_versions(
-            self) -> Dict[SoftwareVersion, Tuple[Set[Asset], Set[Asset]]]:
+    def _map_retrieved_assets_to_versions(self) -> int:
         """
-        Create a dictionary mapping from every software version to the number
-        of retrieved assets which are in use and which are expected but not in
-        use by it.
+        Accumulate the strengths of the retrieved assets which are in use
+        and which are expected but not in use for every software version.
+        Returns the bitset of all versions any asset is mapped to.
+
+        The strengths are kept between calls, only assets retrieved since
+        the previous call are added to them.
         """
         # TODO: not only bare counts are interesting, but mutual matches etc.
         # Therefore, find a better modeling strategy
-        result = defaultdict(lambda: [set(), set()])
-        for asset in self.retrieved_assets:
-            for version in asset.expected_versions | asset.using_versions:
-                if version in asset.using_versions:
-                    result[version][0].add(asset)
-                else:
-                    # not actually using it but expected it
-                    result[version][1].add(asset)
-        return dict(result)
+        new_assets = self.retrieved_assets - self._mapped_assets
+        Asset.retrieve_versions(new_assets)
+        for asset in new_assets:
+            using_bits = asset.using_bits
+            # not actually using it but expected it
+            expected_bits = asset.expected_bits & ~using_bits
+            missing = len(version_space) - len(self._positive_strengths)
+            if missing > 0:
+                self._positive_strengths.extend([0] * missing)
+                self._negative_strengths.extend([0] * missing)
+            weight = asset.idf_weight
+            for bit in iterate_bits(using_bits):
+                self._positive_strengths[bit] += weight
+            for bit in iterate_bits(expected_bits):
+                self._negative_strengths[bit] += weight
+            self._mapped_versions |= using_bits | expected_bits
+        self._mapped_assets.update(new_assets)
+        return self._mapped_versions
+
+    def _materialize_guess(self, bit: int) -> Guess:
+        """Create the guess of a mapped version with its matches."""
+        positive_matches = set()
+        negative_matches = set()
+        for asset in self._mapped_assets:
+            if asset.using_bits >> bit & 1:
+                positive_matches.add(asset)
+            elif asset.expected_bits >> bit & 1:
+                negative_matches.add(asset)
+        return Guess(version_space.version(bit), positive_matches, negative_matches)
+
+    def _version_strength(self, bit: int) -> float:
+        """The strength of the guess of a mapped version."""
+        return (
+            settings.POSITIVE_MATCH_WEIGHT * self._positive_strengths[bit] +
+            settings.NEGATIVE_MATCH_WEIGHT * self._negative_strengths[bit]
+        )
 
     @property
     def _matchable_retrieved_assets(self) -> FrozenSet[Asset]:
@@ -390,17 +428,59 @@ class WebsiteAnalyzer:
         return frozenset(
             asset
             for asset in self.retrieved_resources
-            if isinstance(asset, Asset) and asset.using_versions)
-
-    def _persist_cache(self):
-        with open(self._cache_file, 'wb') as ca:
-            pickle.dump(self._cache, ca)
+            if isinstance(asset, Asset) and asset.using_bits)
 
     def _persist_resources(self):
         os.makedirs(self.persist_resources, exist_ok=True)
         for resource in self.retrieved_resources:
             resource.persist(self.persist_resources)
 
+    def _candidate_assets(
+            self, candidates: Iterable[Tuple[str, int, int]]
+    ) -> List[Tuple[Optional[Asset], dict]]:
+        """
+        Create the assets (None for a dry run) for candidate webroot paths
+        along with their debug info. Assets which are already known are
+        skipped.
+        """
+        result = []
+        for webroot_path, using_versions, different_checksums in candidates:
+            url = join_url(self.primary_url, webroot_path)
+            asset_debug_info = {
+                'url': url,
+                'webroot_path': webroot_path,
+                'using_versions': using_versions,
+                'different_checksums': different_checksums,
+            }
+            asset = None
+            if not self.dry_run:
+                asset = Asset(url, self._cache)
+                if asset in self.retrieved_resources:
+                    logging.info('asset %s already known, skipping', url)
+                    continue
+            result.append((asset, asset_debug_info))
+        return result
+
+    def _retrieve_ahead(
+            self, candidates: List[Tuple[Asset, dict]],
+            retrievals: List[Future], index: int, matching_assets: int):
+        """
+        Schedule the retrieval of the candidates following index.
+
+        Every asset can increase the count of matching assets by at most
+        one. Retrieving as many assets as are still required thus never
+        exceeds the assets which would be retrieved sequentially. Up to
+        PREFETCH_CANDIDATES further assets are retrieved speculatively.
+        """
+        ahead = max(
+            settings.MIN_ASSETS_PER_ITERATION - matching_assets,
+            1) + settings.PREFETCH_CANDIDATES
+        if self.complete_retrieval:
+            ahead = len(candidates)
+        retrievals.extend(get_retrieval_engine().submit(
+            asset
+            for asset, _ in candidates[len(retrievals):index + ahead]))
+
     def _retrieve_included_assets(self, resource: Resource):
         """Retrieve the assets referenced from resource."""
         parsed = BeautifulSoup(
@@ -410,6 +490,7 @@ class WebsiteAnalyzer:
                 HTML_RELEVANT_ELEMENTS))
 
         referenced_urls = set()
+        assets = set()
 
         for elem in parsed:
             href = elem.get('href')
@@ -445,8 +526,11 @@ class WebsiteAnalyzer:
                 # url is relative.
                 # TODO: relative to webroot?
                 referenced_url = join_url(resource.url, referenced_url)
-            asset = Asset(referenced_url, self._cache)
-            self.retrieved_resources.add(asset)
+            assets.add(Asset(referenced_url, self._cache))
+
+        # the assets are added before their retrieval as their hash changes
+        self.retrieved_resources.update(assets)
+        get_retrieval_engine().retrieve(assets)
 
     @staticmethod
     def _guess_decisiveness(guesses: List[Guess]) -> float:
@@ -7,6 +7,8 @@ from argparse import ArgumentParser, Namespace
 from fnmatch import fnmatch
 
 import settings
+from analysis.replay import ReplayEngine
+from analysis.retrieval import set_retrieval_engine
 from analysis.website_analyzer import WebsiteAnalyzer
 from base.json import CustomJSONEncoder
 from definitions import definitions
@@ -14,9 +16,12 @@ from definitions import definitions
 
 def analyze(arguments: Namespace):
     """Analyse a site to infer its used software package(s) and versions."""
+    if arguments.replay:
+        set_retrieval_engine(ReplayEngine(arguments.replay))
+
     analyzer = WebsiteAnalyzer(
         primary_url=arguments.primary_url,
-        cache_file=arguments.cache_file)
+        cache_dir=arguments.cache_dir)
 
     if arguments.persist_resources:
         assert os.path.isdir(arguments.persist_resources) or \
@@ -107,15 +112,21 @@ if __name__ == '__main__':
         help='Write JSON output to specified file.')
 
     parser.add_argument(
+        '--cache-dir',
         '--cache-file',
         '-s',
-        help='Use specified file as a cache to store retrieved assets.')
+        help='Use specified directory as a cache to store retrieved resources (--cache-file is a deprecated alias).')
 
     parser.add_argument(
         '--persist-resources',
         '-p',
         help='Persist retrieved resources within the specified path for debugging purposes.')
 
+    parser.add_argument(
+        '--replay',
+        '-r',
+        help='Replay the resources persisted within the specified path or resource cache directory instead of retrieving them.')
+
     parser.add_argument(
         '--debug-json-file',
         '-d',
@@ -125,5 +136,10 @@ if __name__ == '__main__':
 
     if arguments.dry_run and not arguments.complete_index_retrieval_for:
         raise ValueError('dry run is only valid for complete index retrieval!')
+    if arguments.cache_dir and os.path.isfile(arguments.cache_dir):
+        # --cache-file used to be a pickled cache file
+        parser.error(
+            'the resource cache is a directory now, {} is a cache file of '
+            'a previous version'.format(arguments.cache_dir))
 
     analyze(arguments)
@@ -1,5 +1,5 @@
 from abc import abstractmethod, ABCMeta
-from typing import Iterable, List, Set, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from backends.model import Model
 from backends.software_package import SoftwarePackage
@@ -16,6 +16,17 @@ class Backend(metaclass=ABCMeta):
         Clear the result cache.
         """
 
+    @abstractmethod
+    def copy_static_file_uses(
+            self, source: SoftwareVersion, target: SoftwareVersion,
+            exclude_src_paths: Iterable[str] = ()) -> int:
+        """
+        Copy the static file uses of source to target, except for the
+        static files with one of exclude_src_paths.
+
+        Returns the number of copied uses.
+        """
+
     @abstractmethod
     def delete(self, element: Model) -> bool:
         """Delete an instance of a Model subclass."""
@@ -28,7 +39,6 @@ class Backend(metaclass=ABCMeta):
     def reopen_connection(self):
         """Open a new connection to the backend store."""
 
-    # TODO: Provide a method allowing idf retrieval for several static files at once (db access optimization)
     @abstractmethod
     def retrieve_static_file_idf_weight(
             self, checksum: bytes) -> float:
@@ -36,6 +46,13 @@ class Backend(metaclass=ABCMeta):
         Retrieve the IDF weight for a specific static file checksum.
         """
 
+    @abstractmethod
+    def retrieve_static_file_idf_weights(
+            self, checksums: Iterable[bytes]) -> Dict[bytes, float]:
+        """
+        Retrieve the IDF weights for multiple static file checksums at once.
+        """
+
     @abstractmethod
     def retrieve_packages(self) -> Set[SoftwarePackage]:
         """Retrieve all available packages."""
@@ -60,6 +77,18 @@ class Backend(metaclass=ABCMeta):
             self, webroot_path: str) -> Set[SoftwareVersion]:
         """Retrieve all versions providing a static file at the specified path."""
 
+    @abstractmethod
+    def retrieve_static_file_users_by_webroot_paths_and_checksums(
+            self, webroot_paths_and_checksums: Iterable[Tuple[str, Optional[bytes]]]
+    ) -> Dict[Tuple[str, Optional[bytes]], Tuple[Set[SoftwareVersion], Set[SoftwareVersion]]]:
+        """
+        Retrieve the users of multiple webroot paths and checksums at once.
+
+        A 2-tuple of all versions providing a static file at the webroot
+        path and all versions using a static file with the checksum is
+        returned for every pair. The checksum may be None.
+        """
+
     @abstractmethod
     def retrieve_static_files_almost_unique_to_version(
             self, version: SoftwareVersion,
@@ -116,6 +145,13 @@ class Backend(metaclass=ABCMeta):
     def store(self, element: Union[Model, List[Model]]):
         """Insert or update an instance of a Model subclass."""
 
+    @abstractmethod
+    def update_path_entropy(self, software_package: SoftwarePackage):
+        """
+        Precompute the webroot path entropy among the indexed versions
+        of a software package.
+        """
+
     @abstractmethod
     def version_delta(
             self,
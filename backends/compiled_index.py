@@ -0,0 +1,466 @@
+import re
+from array import array
+from collections import defaultdict
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from backends.backend import Backend, BackendException
+from backends.generic_db import GenericDatabaseBackend
+from backends.model import Model
+from backends.path_entropy import PathEntropy, evaluate_path_entropies
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from backends.static_file import StaticFile
+from base.bitset import bits_to_int, iterate_bits, popcount
+
+
+class CompiledIndexBackend(Backend):
+    """
+    A read-optimized backend which answers index lookups from an
+    in-memory compilation of the index of a database backend.
+
+    The index is loaded once on first access through the exports of the
+    wrapped backend. Versions are mapped to a dense bit space, and the
+    bits of the users of all static files are stored in one array, so
+    that the users of a static file take four bytes per use. Integer
+    bitsets of the users are built per lookup.
+    Writing operations are passed through to the wrapped backend and
+    invalidate the compiled index.
+    """
+    # backend: GenericDatabaseBackend
+
+    def __init__(self, backend: GenericDatabaseBackend):
+        self.backend = backend
+        self._compiled = False
+
+    def __getattr__(self, name: str):
+        # pass through backend-specific functionality (e.g., scan results)
+        if name == 'backend':
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def clear_result_cache(self):
+        """
+        Clear the result cache.
+        """
+        self.backend.clear_result_cache()
+
+    def copy_static_file_uses(
+            self, source: SoftwareVersion, target: SoftwareVersion,
+            exclude_src_paths: Iterable[str] = ()) -> int:
+        """
+        Copy the static file uses of source to target, except for the
+        static files with one of exclude_src_paths.
+        """
+        result = self.backend.copy_static_file_uses(
+            source, target, exclude_src_paths)
+        self.invalidate()
+        return result
+
+    def delete(self, element: Model) -> bool:
+        """Delete an instance of a Model subclass."""
+        result = self.backend.delete(element)
+        self.invalidate()
+        return result
+
+    def invalidate(self):
+        """Drop the compiled index. It is reloaded on next access."""
+        self._compiled = False
+
+    def mark_indexed(self, software_version: SoftwareVersion, indexed: bool = True) -> bool:
+        """Update a software version fully indexed flag."""
+        result = self.backend.mark_indexed(software_version, indexed)
+        self.invalidate()
+        return result
+
+    def reopen_connection(self):
+        """Open a new connection to the backend store."""
+        self.backend.reopen_connection()
+
+    def retrieve_static_file_idf_weight(
+            self, checksum: bytes) -> float:
+        """
+        Retrieve the IDF weight for a specific static file checksum.
+        Only the checksum of the file is used.
+        """
+        return self.retrieve_static_file_idf_weights((checksum,))[checksum]
+
+    def retrieve_static_file_idf_weights(
+            self, checksums: Iterable[bytes]) -> Dict[bytes, float]:
+        """
+        Retrieve the IDF weights for multiple static file checksums at once.
+        Only the checksums of the files are used.
+        """
+        self._compile()
+        return {
+            checksum: GenericDatabaseBackend._calculate_idf_weight(
+                len(self._versions),
+                popcount(self._users_by_checksum(checksum)))
+            for checksum in checksums
+        }
+
+    def retrieve_packages(self) -> Set[SoftwarePackage]:
+        """Retrieve all available packages."""
+        self._compile()
+        return set(self._packages)
+
+    def retrieve_packages_by_name(
+            self, name: str) -> Set[SoftwarePackage]:
+        """Retrieve all available packages whose names are likely to name."""
+        self._compile()
+        pattern = self._like_pattern(name)
+        return {
+            package
+            for package in self._packages
+            if pattern.match(package.name.lower())
+        }
+
+    def retrieve_static_files_almost_unique_to_version(
+            self, version: SoftwareVersion,
+            max_users: int) -> Set[Tuple[Set[SoftwareVersion], StaticFile]]:
+        """
+        Get all static files which are used by the specified version and
+        in total by max_users versions or less.
+
+        Return a set of using versions for every retrieved static file.
+        """
+        self._compile()
+        version_bit = self._version_bits.get(version)
+        if version_bit is None:
+            return set()
+        result = set()
+        for static_file in self._version_static_files[version_bit]:
+            users = self._static_file_users(static_file)
+            if len(users) <= max_users:
+                result.add((
+                    frozenset(self._versions[user] for user in users),
+                    self._materialize_static_file(static_file, version)))
+        return result
+
+    def retrieve_static_files_popular_to_versions(
+            self, versions: Iterable[SoftwareVersion],
+            limit: int) -> Set[Tuple[Set[SoftwareVersion], StaticFile]]:
+        """
+        Get the static files most popular for versions.
+
+        Return a set of using versions (of specified versions) for every
+        retrieved static file.
+        """
+        self._compile()
+        versions_bitset = self._versions_to_bitset(versions, strict=False)
+        counts = defaultdict(int)
+        for version_bit in iterate_bits(versions_bitset):
+            for static_file in self._version_static_files[version_bit]:
+                counts[static_file] += 1
+        popular = sorted(
+            counts, key=lambda static_file: (-counts[static_file], static_file))
+        popular = popular[:limit]
+        if len(popular) < limit:
+            # static files used by other versions only fill up the limit
+            popular.extend(islice((
+                static_file
+                for static_file in range(len(self._static_file_src_paths))
+                if static_file not in counts and
+                self._static_file_users(static_file)),
+                limit - len(popular)))
+        return {
+            (frozenset(
+                self._versions[user]
+                for user in self._static_file_users(static_file)
+                if versions_bitset >> user & 1),
+             self._materialize_static_file(static_file, None))
+            for static_file in popular}
+
+    def retrieve_static_files_unique_to_version(
+            self, version: SoftwareVersion) -> Set[StaticFile]:
+        """
+        Get all static files which are only used by the specified version.
+        """
+        return {
+            static_file
+            for users, static_file
+            in self.retrieve_static_files_almost_unique_to_version(version, 1)}
+
+    def retrieve_static_files_by_checksum(
+            self, checksum: bytes) -> Set[StaticFile]:
+        """Retrieve all static files with a specific checksum."""
+        self._compile()
+        return {
+            self._materialize_static_file(static_file, None)
+            for static_file in self._static_files_by_checksum.get(checksum, ())}
+
+    def retrieve_static_file_users_by_checksum(
+            self, checksum: bytes) -> Set[SoftwareVersion]:
+        """Retrieve all versions using a static file with a specific checksum."""
+        self._compile()
+        return self._materialize_versions(self._users_by_checksum(checksum))
+
+    def retrieve_static_file_users_by_webroot_paths(
+            self, webroot_path: str) -> Set[SoftwareVersion]:
+        """Retrieve all versions providing a static file at the specified path."""
+        self._compile()
+        return self._materialize_versions(self._users_by_webroot_path(webroot_path))
+
+    def retrieve_static_file_users_by_webroot_paths_and_checksums(
+            self, webroot_paths_and_checksums: Iterable[Tuple[str, Optional[bytes]]]
+    ) -> Dict[Tuple[str, Optional[bytes]], Tuple[Set[SoftwareVersion], Set[SoftwareVersion]]]:
+        """
+        Retrieve the users of multiple webroot paths and checksums at once.
+
+        A 2-tuple of all versions providing a static file at the webroot
+        path and all versions using a static file with the checksum is
+        returned for every pair. The checksum may be None.
+        """
+        self._compile()
+        return {
+            (webroot_path, checksum): (
+                self._materialize_versions(self._users_by_webroot_path(webroot_path)),
+                self._materialize_versions(self._users_by_checksum(checksum)))
+            for webroot_path, checksum in webroot_paths_and_checksums
+        }
+
+    def retrieve_versions(
+            self, software_package: SoftwarePackage,
+            indexed_only: bool = True) -> Set[SoftwareVersion]:
+        """Retrieve all available versions for specified software package."""
+        self._compile()
+        if software_package not in self._package_versions:
+            if software_package not in self._packages:
+                raise BackendException('software package not stored')
+            return set()
+        versions_bitset = self._package_versions[software_package]
+        if indexed_only:
+            versions_bitset &= self._indexed_versions
+        return self._materialize_versions(versions_bitset)
+
+    def retrieve_webroot_paths_with_high_entropy(
+            self, software_versions: Iterable[SoftwareVersion],
+            limit: Optional[int], exclude: Iterable[str] = '') -> List[Tuple[str, int, int]]:
+        """
+        Retrieve a list of webroot paths which have a high entropy
+        among the specified software versions.
+
+        A 3-tuple of the webroot path, the number of users within
+        the set of versions, and the number of different checksums
+        is returned.
+        """
+        self._compile()
+        versions_bitset = self._versions_to_bitset(software_versions)
+        if not versions_bitset:
+            # no versions to check.
+            return []
+
+        entropies = []
+        for software_package, package_versions in self._package_versions.items():
+            package_versions &= versions_bitset
+            if package_versions:
+                start, entropy = self._get_path_entropy(software_package)
+                entropies.append((entropy, package_versions >> start))
+        return evaluate_path_entropies(entropies, limit, exclude)
+
+    def static_file_count(self, software_version: SoftwareVersion) -> int:
+        """Get the count of static files used by a software version."""
+        self._compile()
+        version_bit = self._version_bits.get(software_version)
+        if version_bit is None:
+            raise BackendException('software version not stored')
+        return len(self._version_static_files[version_bit])
+
+    def store(self, element: Union[Model, List[Model]]) -> Union[bool, List[bool]]:
+        """Insert or update an instance of a Model subclass."""
+        result = self.backend.store(element)
+        self.invalidate()
+        return result
+
+    def update_path_entropy(self, software_package: SoftwarePackage):
+        """
+        Precompute the webroot path entropy among the indexed versions
+        of a software package.
+        """
+        self.backend.update_path_entropy(software_package)
+
+    def version_delta(
+            self,
+            a: SoftwareVersion,
+            b: SoftwareVersion) -> Set[
+        Tuple[
+            Union[None, StaticFile],
+            Union[None, StaticFile]]]:
+        """
+        Get the delta between the static files of two software versions.
+
+        A set of tuples is returned.
+        * None, StaticFile means that a static file was added at a path where none was used before
+        * StaticFile, None means that a static file was removed from a path
+        * StaticFile, StaticFile means that a static file at a specific path was changed
+        """
+        self._compile()
+        a_files = self._static_files_by_path_for_version(a)
+        b_files = self._static_files_by_path_for_version(b)
+        result = set()
+        for webroot_path, static_file in a_files.items():
+            if webroot_path not in b_files:
+                result.add((static_file, None))
+            elif static_file.checksum != b_files[webroot_path].checksum:
+                result.add((static_file, b_files[webroot_path]))
+        for webroot_path, static_file in b_files.items():
+            if webroot_path not in a_files:
+                result.add((None, static_file))
+            # no need to check for changed files that exist in both versions here
+        return result
+
+    def _compile(self):
+        """Load the index of the wrapped backend into memory."""
+        if self._compiled:
+            return
+
+        packages = self.backend.retrieve_packages()
+        versions = []
+        version_bits = {}
+        version_ids = {}
+        package_versions = defaultdict(int)
+        indexed_versions = 0
+        # the versions are ordered by package, which keeps the bits of a
+        # package close together
+        for version_id, version, indexed in self.backend.export_software_versions():
+            version_bit = len(versions)
+            versions.append(version)
+            version_bits[version] = version_bit
+            version_ids[version_id] = version_bit
+            package_versions[version.software_package] |= 1 << version_bit
+            if indexed:
+                indexed_versions |= 1 << version_bit
+
+        static_file_ids = {}
+        static_file_src_paths = []
+        static_file_webroot_paths = []
+        static_file_checksums = []
+        static_files_by_checksum = defaultdict(list)
+        static_files_by_webroot_path = defaultdict(list)
+        for static_file_id, src_path, webroot_path, checksum \
+                in self.backend.export_static_files():
+            static_file = len(static_file_src_paths)
+            static_file_ids[static_file_id] = static_file
+            static_file_src_paths.append(src_path)
+            static_file_webroot_paths.append(webroot_path)
+            static_file_checksums.append(checksum)
+            static_files_by_checksum[checksum].append(static_file)
+            static_files_by_webroot_path[webroot_path].append(static_file)
+
+        # the users of static file i are user_bits[user_offsets[i]:user_offsets[i + 1]]
+        user_offsets = array('Q', [0])
+        user_bits = array('I')
+        version_static_files = [array('I') for _ in versions]
+        # the uses are ordered by static file, as are the static files
+        for version_id, static_file_id in self.backend.export_static_file_uses():
+            version_bit = version_ids[version_id]
+            static_file = static_file_ids[static_file_id]
+            while len(user_offsets) <= static_file:
+                user_offsets.append(len(user_bits))
+            user_bits.append(version_bit)
+            version_static_files[version_bit].append(static_file)
+        while len(user_offsets) <= len(static_file_src_paths):
+            user_offsets.append(len(user_bits))
+
+        self._packages = packages
+        self._versions = versions
+        self._version_bits = version_bits
+        self._package_versions = dict(package_versions)
+        self._indexed_versions = indexed_versions
+        self._static_file_src_paths = static_file_src_paths
+        self._static_file_webroot_paths = static_file_webroot_paths
+        self._static_file_checksums = static_file_checksums
+        self._user_offsets = user_offsets
+        self._user_bits = user_bits
+        self._static_files_by_checksum = dict(static_files_by_checksum)
+        self._static_files_by_webroot_path = dict(static_files_by_webroot_path)
+        self._version_static_files = version_static_files
+        self._path_entropies = {}
+        self._compiled = True
+
+    def _get_path_entropy(
+            self, software_package: SoftwarePackage) -> Tuple[int, PathEntropy]:
+        """
+        Get the (lazily built) path entropy of a software package.
+
+        As the bits of a package are contiguous, the bits of its entropy
+        are shifted by the returned first bit of the package.
+        """
+        if software_package not in self._path_entropies:
+            package_versions = self._package_versions[software_package]
+            start = (package_versions & -package_versions).bit_length() - 1
+            end = package_versions.bit_length()
+            static_files = set()
+            for version_bit in iterate_bits(package_versions):
+                static_files.update(self._version_static_files[version_bit])
+            entropy = PathEntropy()
+            for static_file in static_files:
+                entropy.add(
+                    self._static_file_webroot_paths[static_file],
+                    self._static_file_checksums[static_file],
+                    bits_to_int(
+                        user - start
+                        for user in self._static_file_users(static_file)
+                        if start <= user < end))
+            self._path_entropies[software_package] = start, entropy
+        return self._path_entropies[software_package]
+
+    def _materialize_static_file(
+            self, static_file: int,
+            software_version: Optional[SoftwareVersion]) -> StaticFile:
+        return StaticFile(
+            software_version,
+            self._static_file_src_paths[static_file],
+            self._static_file_webroot_paths[static_file],
+            self._static_file_checksums[static_file])
+
+    def _materialize_versions(self, versions_bitset: int) -> Set[SoftwareVersion]:
+        return {
+            self._versions[version_bit]
+            for version_bit in iterate_bits(versions_bitset)
+        }
+
+    def _static_files_by_path_for_version(
+            self, version: SoftwareVersion) -> Dict[str, StaticFile]:
+        version_bit = self._version_bits.get(version)
+        if version_bit is None:
+            return {}
+        return {
+            self._static_file_webroot_paths[static_file]:
+                self._materialize_static_file(static_file, version)
+            for static_file in self._version_static_files[version_bit]
+        }
+
+    def _static_file_users(self, static_file: int) -> array:
+        """Get the bits of the versions using a static file."""
+        return self._user_bits[
+            self._user_offsets[static_file]:self._user_offsets[static_file + 1]]
+
+    def _users_by_checksum(self, checksum: bytes) -> int:
+        return bits_to_int(chain.from_iterable(
+            self._static_file_users(static_file)
+            for static_file in self._static_files_by_checksum.get(checksum, ())))
+
+    def _users_by_webroot_path(self, webroot_path: str) -> int:
+        return bits_to_int(chain.from_iterable(
+            self._static_file_users(static_file)
+            for static_file in self._static_files_by_webroot_path.get(webroot_path, ())))
+
+    def _versions_to_bitset(
+            self, versions: Iterable[SoftwareVersion], strict: bool = True) -> int:
+        versions_bitset = 0
+        for version in versions:
+            version_bit = self._version_bits.get(version)
+            if version_bit is None:
+                if strict:
+                    raise BackendException('software version not found')
+                continue
+            versions_bitset |= 1 << version_bit
+        return versions_bitset
+
+    @staticmethod
+    def _like_pattern(expression: str):
+        """Translate a (case-insensitive) SQL LIKE expression to a regex."""
+        return re.compile('^{}$'.format(''.join(
+            '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+            for char in expression.lower())), re.DOTALL)
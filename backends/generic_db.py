@@ -1,25 +1,32 @@
 from abc import abstractmethod, abstractstaticmethod
-from contextlib import closing
+from collections import defaultdict
+from contextlib import closing, contextmanager
 from datetime import datetime
+from itertools import groupby
 from math import log
-from typing import Iterable, List, Optional, Set, Tuple, Union
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 from backends.backend import Backend, BackendException
 from backends.model import Model
+from backends.path_entropy import PathEntropy, evaluate_path_entropies, \
+    pack_bits, unpack_bits
 from backends.software_package import SoftwarePackage
 from backends.software_version import SoftwareVersion
 from backends.static_file import StaticFile
+from base.bitset import bits_to_int
+from base.cache import LRUCache, MISSING
 
 
 def use_cache(f):
     def decorated(*args, **kwargs):
         self = args[0]
         element = args[1]
-        if element in self._cache:
-            return self._cache[element]
+        elem_id = self._cache.get(element.key)
+        if elem_id is not MISSING:
+            return elem_id
         elem_id = f(*args, **kwargs)
         if elem_id is not None:
-            self._cache[element] = elem_id
+            self._cache.put(element.key, elem_id)
         return elem_id
 
     return decorated
@@ -27,26 +34,50 @@ def use_cache(f):
 
 def use_result_cache(f):
     def decorated(self, *args, **kwargs):
-        signature = f.__name__ + str(args) + str(kwargs)
-        if signature in self._result_cache:
-            return self._result_cache[signature]
+        signature = (f.__name__,) + tuple(
+            _result_cache_key(arg) for arg in args) + tuple(
+            (name, _result_cache_key(value))
+            for name, value in sorted(kwargs.items()))
+        result = self._result_cache.get(signature)
+        if result is not MISSING:
+            return result
         result = f(self, *args, **kwargs)
-        self._result_cache[signature] = result
+        self._result_cache.put(signature, result)
         return result
 
     return decorated
 
 
+def _result_cache_key(value: object) -> Hashable:
+    """Get a stable cache key for an argument of a cached method."""
+    if isinstance(value, Model):
+        return value.key
+    if isinstance(value, (list, tuple)):
+        return tuple(_result_cache_key(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_result_cache_key(item) for item in value)
+    return value
+
+
 class GenericDatabaseBackend(Backend):
     """The backend handling the SQLite communication."""
     _operator = '%s'
+    _max_list_params = 500
+    id_cache_size = 200000
+    result_cache_size = 1000
 
     # _operator: str
     # _true_value: str
 
     def __init__(self, *args, **kwargs):
-        self._cache = {}
-        self._result_cache = {}
+        self._cache = LRUCache(self.id_cache_size)
+        self._result_cache = LRUCache(self.result_cache_size)
+        self._total_version_count = None
+        self._path_entropies = {}
+        # the identity map of the models by their ids
+        self._software_packages = {}
+        self._software_versions = {}
+        self._transaction_depth = 0
 
         self._args, self._kwargs = args, kwargs
         self._open_connection(*args, **kwargs)
@@ -57,18 +88,81 @@ class GenericDatabaseBackend(Backend):
     def __del__(self):
         self._connection.close()
 
+    def cache_statistics(self) -> dict:
+        """Get the sizes and hit/miss counters of the caches."""
+        return {
+            'ids': self._cache.statistics(),
+            'results': self._result_cache.statistics(),
+        }
+
     def clear_result_cache(self):
         """
         Clear the result cache.
         """
-        self._result_cache = {}
+        self._result_cache.clear()
+        self._total_version_count = None
+        self._path_entropies.clear()
+
+    def copy_static_file_uses(
+            self, source: SoftwareVersion, target: SoftwareVersion,
+            exclude_src_paths: Iterable[str] = ()) -> int:
+        """
+        Copy the static file uses of source to target, except for the
+        static files with one of exclude_src_paths.
+
+        Returns the number of copied uses.
+        """
+        source_id = self._get_id(source)
+        target_id = self._get_id(target)
+        if source_id is None or target_id is None:
+            raise BackendException('software version does not exist in database')
+        with self.transaction(), closing(self._connection.cursor()) as cursor:
+            # the excluded paths are staged as they are too many for a list
+            cursor.execute('''
+            CREATE TEMPORARY TABLE IF NOT EXISTS excluded_src_path (
+                src_path TEXT NOT NULL
+            )
+            ''')
+            cursor.execute('DELETE FROM excluded_src_path')
+            cursor.executemany('''
+            INSERT
+            INTO excluded_src_path (
+                src_path)
+            VALUES (''' + self._operator + ''')
+            ''', ((src_path,) for src_path in set(exclude_src_paths)))
+            cursor.execute('''
+            INSERT
+            INTO static_file_use (
+                software_version_id,
+                static_file_id)
+            SELECT
+                ''' + self._operator + ''',
+                u.static_file_id
+            FROM
+                static_file_use u
+            JOIN
+                static_file f
+            ON
+                f.id = u.static_file_id
+            WHERE
+                u.software_version_id = ''' + self._operator + ''' AND
+                f.src_path NOT IN (
+                    SELECT
+                        src_path
+                    FROM
+                        excluded_src_path)
+            ON CONFLICT DO NOTHING
+            ''', (target_id, source_id))
+            return cursor.rowcount
 
     def delete(self, element: Model) -> bool:
         """Delete an instance of a Model subclass."""
         if isinstance(element, SoftwareVersion):
+            self._invalidate(element)
             id = self._get_id(element)
             if id is None:
                 return False
+            self._software_versions.pop(id, None)
             with closing(self._connection.cursor()) as cursor:
                 # Check whether element exists
                 cursor.execute('''
@@ -77,15 +171,89 @@ class GenericDatabaseBackend(Backend):
                 WHERE
                     id = ''' + self._operator + '''
                 ''', (id,))
-                return True
+            self._cache.invalidate(element.key)
+            return True
         raise BackendException('unsupported model type for deletion')
 
+    def export_software_versions(self) -> Iterator[Tuple[int, SoftwareVersion, bool]]:
+        """
+        Export all software versions along with their ids and whether
+        they are indexed, ordered by software package.
+
+        The exports allow to compile the index in memory (see
+        CompiledIndexBackend).
+        """
+        with closing(self._connection.cursor()) as cursor:
+            cursor.execute('''
+            SELECT
+                p.id,
+                p.name,
+                p.vendor,
+                p.alternative_names,
+                v.id,
+                v.name,
+                v.internal_identifier,
+                v.release_date,
+                v.indexed
+            FROM
+                software_package p,
+                software_version v
+            WHERE
+                v.software_package_id = p.id
+            ORDER BY
+                v.software_package_id,
+                v.id
+            ''')
+            for row in cursor.fetchall():
+                yield row[4], self._get_software_version_from_raw(*row[:8]), \
+                    row[8] is not None
+
+    def export_static_files(self) -> Iterator[Tuple[int, str, str, bytes]]:
+        """
+        Export the id, src path, webroot path and checksum of all static
+        files, ordered by id.
+        """
+        with closing(self._streaming_cursor()) as cursor:
+            cursor.execute('''
+            SELECT
+                id,
+                src_path,
+                webroot_path,
+                checksum
+            FROM
+                static_file
+            ORDER BY
+                id
+            ''')
+            for static_file_id, src_path, webroot_path, checksum in cursor:
+                yield static_file_id, src_path, webroot_path, \
+                    self._unpack_binary(checksum)
+
+    def export_static_file_uses(self) -> Iterator[Tuple[int, int]]:
+        """
+        Export the software version id and static file id of all static
+        file uses, ordered by static file.
+        """
+        with closing(self._streaming_cursor()) as cursor:
+            cursor.execute('''
+            SELECT
+                software_version_id,
+                static_file_id
+            FROM
+                static_file_use
+            ORDER BY
+                static_file_id,
+                software_version_id
+            ''')
+            yield from cursor
+
     def mark_indexed(self, software_version: SoftwareVersion, indexed: bool = True):
         """Mark a software version as fully indexed. """
         software_version_id = self._get_id(software_version)
         if software_version_id is None:
             raise BackendException(
                 'software version does not exist in database')
+        self._invalidate(software_version)
         with closing(self._connection.cursor()) as cursor:
             # Insert new element
             cursor.execute('''
@@ -99,6 +267,7 @@ class GenericDatabaseBackend(Backend):
 
     def reopen_connection(self):
         """Open a new connection to the backend store."""
+        self._transaction_depth = 0
         self._open_connection(*self._args, **self._kwargs)
 
     def retrieve_static_file_idf_weight(
@@ -107,32 +276,45 @@ class GenericDatabaseBackend(Backend):
         Retrieve the IDF weight for a specific static file checksum.
         Only the checksum of the file is used.
         """
+        return self.retrieve_static_file_idf_weights((checksum,))[checksum]
+
+    def retrieve_static_file_idf_weights(
+            self, checksums: Iterable[bytes]) -> Dict[bytes, float]:
+        """
+        Retrieve the IDF weights for multiple static file checksums at once.
+        Only the checksums of the files are used.
+        """
+        checksums = list(set(checksums))
+        total_version_count = self._get_total_version_count()
+        global_using_versions_counts = {}
         with closing(self._connection.cursor()) as cursor:
-            cursor.execute('''
-                SELECT
-                    (
-                        SELECT
-                            COUNT(id)
-                        FROM
-                            software_version
-                    ) total_version_count,
-                    COUNT(DISTINCT us.software_version_id) global_using_versions_count
-                FROM
-                    static_file sf
-                JOIN
-                    static_file_use us
-                ON
-                    us.static_file_id = sf.id
-                WHERE sf.checksum = ''' + self._operator,
-                           (checksum,))
-            total_version_count, global_using_versions_count = cursor.fetchone()
-        # TODO: use packages instead of versions to prevent higher weight of packages with a higher number of released versions?
-        if not global_using_versions_count:
-            # this static file is not used at all (probably a negative match).
-            return 1
-        return log(
-            total_version_count /
-            global_using_versions_count, 10)
+            for start in range(0, len(checksums), self._max_list_params):
+                operators, params = self._expand_list_operators(
+                    checksums[start:start + self._max_list_params])
+                cursor.execute('''
+                    SELECT
+                        sf.checksum,
+                        COUNT(DISTINCT us.software_version_id) global_using_versions_count
+                    FROM
+                        static_file sf
+                    JOIN
+                        static_file_use us
+                    ON
+                        us.static_file_id = sf.id
+                    WHERE
+                        sf.checksum IN ''' + operators + '''
+                    GROUP BY
+                        sf.checksum
+                    ''', tuple(params))
+                for checksum, global_using_versions_count in cursor.fetchall():
+                    global_using_versions_counts[self._unpack_binary(checksum)] = \
+                        global_using_versions_count
+        return {
+            checksum: self._calculate_idf_weight(
+                total_version_count,
+                global_using_versions_counts.get(checksum, 0))
+            for checksum in checksums
+        }
 
     @use_result_cache
     def retrieve_packages(self) -> Set[SoftwarePackage]:
@@ -140,6 +322,7 @@ class GenericDatabaseBackend(Backend):
         with closing(self._connection.cursor()) as cursor:
             cursor.execute('''
             SELECT
+                id,
                 name,
                 vendor,
                 alternative_names
@@ -147,10 +330,8 @@ class GenericDatabaseBackend(Backend):
                 software_package
             ''', ())
             return {
-                SoftwarePackage(
-                    name=name, vendor=vendor,
-                    alternative_names=self._unpack_list(alternative_names))
-                for name, vendor, alternative_names in cursor.fetchall()}
+                self._get_software_package_from_raw(*row)
+                for row in cursor.fetchall()}
 
     def retrieve_packages_by_name(
             self, name: str) -> Set[SoftwarePackage]:
@@ -158,6 +339,7 @@ class GenericDatabaseBackend(Backend):
         with closing(self._connection.cursor()) as cursor:
             cursor.execute('''
             SELECT
+                id,
                 name,
                 vendor,
                 alternative_names
@@ -167,10 +349,8 @@ class GenericDatabaseBackend(Backend):
                 LOWER(name) LIKE LOWER(''' + self._operator + ''')
             ''', (name,))
             return {
-                SoftwarePackage(
-                    name=name, vendor=vendor,
-                    alternative_names=self._unpack_list(alternative_names))
-                for name, vendor, alternative_names in cursor.fetchall()}
+                self._get_software_package_from_raw(*row)
+                for row in cursor.fetchall()}
 
     def retrieve_static_files_almost_unique_to_version(
             self, version: SoftwareVersion,
@@ -282,9 +462,11 @@ class GenericDatabaseBackend(Backend):
         with closing(self._connection.cursor()) as cursor:
             cursor.execute('''
             SELECT
+                p.id,
                 p.name,
                 p.vendor,
                 p.alternative_names,
+                v.id,
                 v.name,
                 v.internal_identifier,
                 v.release_date
@@ -315,9 +497,11 @@ class GenericDatabaseBackend(Backend):
         with closing(self._connection.cursor()) as cursor:
             cursor.execute('''
             SELECT
+                p.id,
                 p.name,
                 p.vendor,
                 p.alternative_names,
+                v.id,
                 v.name,
                 v.internal_identifier,
                 v.release_date
@@ -342,6 +526,76 @@ class GenericDatabaseBackend(Backend):
             ''', (webroot_path,))
             return self._get_software_versions_from_raw(cursor.fetchall())
 
+    def retrieve_static_file_users_by_webroot_paths_and_checksums(
+            self, webroot_paths_and_checksums: Iterable[Tuple[str, Optional[bytes]]]
+    ) -> Dict[Tuple[str, Optional[bytes]], Tuple[Set[SoftwareVersion], Set[SoftwareVersion]]]:
+        """
+        Retrieve the users of multiple webroot paths and checksums at once.
+
+        A 2-tuple of all versions providing a static file at the webroot
+        path and all versions using a static file with the checksum is
+        returned for every pair. The checksum may be None.
+        """
+        webroot_paths_and_checksums = list(set(webroot_paths_and_checksums))
+        expected_versions = defaultdict(set)
+        using_versions = defaultdict(set)
+        # every pair requires two list parameters
+        chunk_size = self._max_list_params // 2
+        with closing(self._connection.cursor()) as cursor:
+            for start in range(0, len(webroot_paths_and_checksums), chunk_size):
+                chunk = webroot_paths_and_checksums[start:start + chunk_size]
+                webroot_paths = {webroot_path for webroot_path, checksum in chunk}
+                checksums = {checksum for webroot_path, checksum in chunk if checksum is not None}
+                path_operators, params = self._expand_list_operators(webroot_paths)
+                query = '''
+                SELECT DISTINCT
+                    sf.webroot_path,
+                    sf.checksum,
+                    p.id,
+                    p.name,
+                    p.vendor,
+                    p.alternative_names,
+                    v.id,
+                    v.name,
+                    v.internal_identifier,
+                    v.release_date
+                FROM
+                    static_file sf
+                JOIN
+                    static_file_use us
+                ON
+                    us.static_file_id = sf.id
+                JOIN
+                    software_version v
+                ON
+                    v.id = us.software_version_id
+                JOIN
+                    software_package p
+                ON
+                    p.id = v.software_package_id
+                WHERE
+                    sf.webroot_path IN ''' + path_operators
+                if checksums:
+                    checksum_operators, checksum_params = self._expand_list_operators(checksums)
+                    query += ''' OR
+                    sf.checksum IN ''' + checksum_operators
+                    params.extend(checksum_params)
+                cursor.execute(query, tuple(params))
+
+                for row in cursor.fetchall():
+                    webroot_path, checksum = row[0], self._unpack_binary(row[1])
+                    version = self._get_software_version_from_raw(*row[2:])
+                    if webroot_path in webroot_paths:
+                        expected_versions[webroot_path].add(version)
+                    if checksum in checksums:
+                        using_versions[checksum].add(version)
+        return {
+            (webroot_path, checksum): (
+                set(expected_versions.get(webroot_path, ())),
+                set(using_versions.get(checksum, ())))
+            for webroot_path, checksum in webroot_paths_and_checksums
+        }
+
     @use_result_cache
     def retrieve_versions(
             self, software_package: SoftwarePackage,
@@ -354,6 +608,7 @@ class GenericDatabaseBackend(Backend):
         with closing(self._connection.cursor()) as cursor:
             query = '''
             SELECT
+                id,
                 name,
                 internal_identifier,
                 release_date
@@ -365,13 +620,11 @@ class GenericDatabaseBackend(Backend):
                 query += 'AND indexed IS NOT NULL'
             cursor.execute(query, (software_package_id,))
 
+            software_package = self._software_packages.get(
+                software_package_id, software_package)
             return {
-                SoftwareVersion(
-                    software_package,
-                    name=name,
-                    internal_identifier=internal_identifier,
-                    release_date=release_date)
-                for name, internal_identifier, release_date in cursor.fetchall()}
+                self._intern_software_version(software_package, *row)
+                for row in cursor.fetchall()}
 
     def retrieve_webroot_paths_with_high_entropy(
             self, software_versions: Iterable[SoftwareVersion],
@@ -385,20 +638,129 @@ class GenericDatabaseBackend(Backend):
         is returned.
         """
         software_version_ids = set()
+        versions_by_package = defaultdict(set)
         for version in software_versions:
             version_id = self._get_id(version)
             if version_id is None:
                 raise BackendException('software version not found')
             software_version_ids.add(version_id)
+            versions_by_package[version.software_package].add(version_id)
 
         if not software_version_ids:
             # no versions to check.
             return []
 
+        result = self._evaluate_path_entropy(versions_by_package, limit, exclude)
+        if result is not None:
+            return result
+
+        query, params = self._high_entropy_query(
+            tuple(software_version_ids), limit, tuple(exclude))
         with closing(self._connection.cursor()) as cursor:
-            software_version_ids = tuple(software_version_ids)
-            list_operators, params = self._expand_list_operators(software_version_ids)
-            query = '''
+            cursor.execute(query, params)
+
+            return cursor.fetchall()
+
+    def _evaluate_path_entropy(
+            self, versions_by_package: Dict[SoftwarePackage, Set[int]],
+            limit: Optional[int],
+            exclude: Iterable[str]) -> Optional[List[Tuple[str, int, int]]]:
+        """
+        Rank the webroot paths by their entropy using the precomputed
+        path entropy of the software packages.
+
+        Returns None if the precomputed path entropy is missing or does
+        not cover all versions (i.e., some were indexed afterwards).
+        """
+        entropies = []
+        for software_package, version_ids in versions_by_package.items():
+            path_entropy = self._get_path_entropy(self._get_id(software_package))
+            if path_entropy is None:
+                return None
+            positions, entropy = path_entropy
+            if not version_ids.issubset(positions):
+                return None
+            entropies.append((
+                entropy,
+                bits_to_int(positions[version_id] for version_id in version_ids)))
+        return evaluate_path_entropies(entropies, limit, exclude)
+
+    def _get_path_entropy(
+            self, software_package_id: int) -> Optional[Tuple[Dict[int, int], PathEntropy]]:
+        """
+        Load the (cached) precomputed path entropy of a software package.
+
+        The bits of the loaded entropy are the positions of the covered
+        versions, which are returned by version id.
+        """
+        if software_package_id in self._path_entropies:
+            return self._path_entropies[software_package_id]
+        result = None
+        with closing(self._connection.cursor()) as cursor:
+            cursor.execute('''
+            SELECT
+                versions_offset,
+                versions
+            FROM
+                path_entropy_package
+            WHERE
+                software_package_id=''' + self._operator + '''
+            ''', (software_package_id,))
+            row = cursor.fetchone()
+            if row is not None:
+                positions = {
+                    version_id: position
+                    for position, version_id in enumerate(
+                        unpack_bits(row[0], self._unpack_binary(row[1])))
+                }
+                entropy = PathEntropy()
+                cursor.execute('''
+                SELECT
+                    webroot_path,
+                    checksum,
+                    users_offset,
+                    users
+                FROM
+                    path_entropy
+                WHERE
+                    software_package_id=''' + self._operator + '''
+                ''', (software_package_id,))
+                for webroot_path, checksum, users_offset, users in cursor:
+                    users = bits_to_int(
+                        positions[version_id]
+                        for version_id in unpack_bits(
+                            users_offset, self._unpack_binary(users))
+                        if version_id in positions)
+                    if users:
+                        entropy.add(
+                            webroot_path, self._unpack_binary(checksum), users)
+                result = positions, entropy
+        self._path_entropies[software_package_id] = result
+        return result
+
+    def _high_entropy_query(
+            self, software_version_ids: tuple, limit: Optional[int],
+            exclude: tuple) -> Tuple[str, tuple]:
+        """
+        Build the query retrieving webroot paths with a high entropy.
+
+        The uses of the versions are joined with their static files (as
+        covered by static_file_covering) in this order, as scanning all
+        static files by webroot path is slow for large indexes. The
+        excluded webroot paths are provided as a VALUES list which is
+        anti-joined using a hashed (non-correlated) subquery.
+        """
+        list_operators, params = self._expand_list_operators(software_version_ids)
+        query = ''
+        if exclude:
+            query += '''
+            WITH excluded (webroot_path) AS (
+                VALUES ''' + ', '.join(
+                '(' + self._operator + ')' for _ in exclude) + '''
+            )
+            '''
+            params = list(exclude) + params
+        query += '''
             SELECT
                 subquery.webroot_path,
                 subquery.version_count,
@@ -409,40 +771,40 @@ class GenericDatabaseBackend(Backend):
                     COUNT(DISTINCT us.software_version_id) version_count,
                     COUNT(DISTINCT sf.checksum) checksum_count
                 FROM
-                    static_file sf
-                JOIN
                     static_file_use us
-                ON
-                    us.static_file_id=sf.id
+                CROSS JOIN
+                    static_file sf
                 WHERE
+                    sf.id=us.static_file_id AND
                     us.software_version_id IN ''' + list_operators
-            exclude = tuple(exclude)
-            if exclude:
-                operators, new_params = self._expand_list_operators(exclude)
-                query += 'AND sf.webroot_path NOT IN ' + operators
-                params.extend(new_params)
+        if exclude:
             query += '''
+                    AND sf.webroot_path NOT IN (
+                        SELECT
+                            webroot_path
+                        FROM
+                            excluded)
+            '''
+        query += '''
                 GROUP BY
                     sf.webroot_path) subquery
             '''
-            if len(software_version_ids) > 1:
-                query += '''
-                    WHERE
-                        NOT (
-                            subquery.version_count = ''' + str(int(len(software_version_ids))) + ''' AND
-                            subquery.checksum_count = 1)
-                '''
+        if len(software_version_ids) > 1:
             query += '''
+                WHERE
+                    NOT (
+                        subquery.version_count = ''' + str(int(len(software_version_ids))) + ''' AND
+                        subquery.checksum_count = 1)
+            '''
+        query += '''
             ORDER BY
                 (subquery.version_count + subquery.checksum_count) DESC
             '''
 
-            if limit:
-                query += 'LIMIT ' + str(int(limit))
+        if limit:
+            query += 'LIMIT ' + str(int(limit))
 
-            cursor.execute(query, tuple(params))
-
-            return cursor.fetchall()
+        return query, tuple(params)
 
     def static_file_count(self, software_version: SoftwareVersion) -> int:
         """Get the count of static files used by a software version. """
@@ -477,6 +839,7 @@ class GenericDatabaseBackend(Backend):
                 self.store(elem)
                 for elem in element
             ]
+        self._invalidate(element)
         if isinstance(element, SoftwarePackage):
             if self._get_id(element) is not None:
                 # software package exists already
@@ -574,6 +937,141 @@ class GenericDatabaseBackend(Backend):
                 return True
         raise BackendException('unsupported model type')
 
+    def update_path_entropy(self, software_package: SoftwarePackage):
+        """
+        Precompute the webroot path entropy among the indexed versions
+        of a software package.
+
+        For every webroot path and checksum, the ids of the versions
+        using it are stored as a bitmap. Queries for versions indexed
+        afterwards fall back to retrieving the entropy from the static
+        file uses until the entropy is updated again.
+        """
+        software_package_id = self._get_id(software_package)
+        if software_package_id is None:
+            raise BackendException('software package not stored')
+        self._path_entropies.pop(software_package_id, None)
+        with self.transaction():
+            with closing(self._connection.cursor()) as cursor:
+                cursor.execute('''
+                DELETE
+                FROM path_entropy
+                WHERE
+                    software_package_id=''' + self._operator + '''
+                ''', (software_package_id,))
+                cursor.execute('''
+                DELETE
+                FROM path_entropy_package
+                WHERE
+                    software_package_id=''' + self._operator + '''
+                ''', (software_package_id,))
+                cursor.execute('''
+                SELECT
+                    id
+                FROM
+                    software_version
+                WHERE
+                    software_package_id=''' + self._operator + ''' AND
+                    indexed IS NOT NULL
+                ''', (software_package_id,))
+                versions = pack_bits(row[0] for row in cursor.fetchall())
+
+            with closing(self._streaming_cursor()) as cursor:
+                cursor.execute('''
+                SELECT
+                    sf.webroot_path,
+                    sf.checksum,
+                    us.software_version_id
+                FROM
+                    software_version sv
+                JOIN
+                    static_file_use us
+                ON
+                    us.software_version_id=sv.id
+                JOIN
+                    static_file sf
+                ON
+                    sf.id=us.static_file_id
+                WHERE
+                    sv.software_package_id=''' + self._operator + ''' AND
+                    sv.indexed IS NOT NULL
+                ORDER BY
+                    sf.webroot_path,
+                    sf.checksum
+                ''', (software_package_id,))
+                # the uses are packed while streaming them, as they are many
+                rows = [
+                    (software_package_id, webroot_path, checksum) + pack_bits(
+                        row[2] for row in uses)
+                    for (webroot_path, checksum), uses in groupby(
+                        cursor, key=lambda row: (row[0], row[1]))
+                ]
+
+            with closing(self._connection.cursor()) as cursor:
+                cursor.executemany('''
+                INSERT
+                INTO path_entropy (
+                    software_package_id,
+                    webroot_path,
+                    checksum,
+                    users_offset,
+                    users)
+                VALUES (
+                    ''' + self._operator + ''',
+                    ''' + self._operator + ''',
+                    ''' + self._operator + ''',
+                    ''' + self._operator + ''',
+                    ''' + self._operator + ''')
+                ''', rows)
+                cursor.execute('''
+                INSERT
+                INTO path_entropy_package (
+                    software_package_id,
+                    versions_offset,
+                    versions)
+                VALUES (
+                    ''' + self._operator + ''',
+                    ''' + self._operator + ''',
+                    ''' + self._operator + ''')
+                ''', (software_package_id,) + versions)
+
+    def _streaming_cursor(self):
+        """
+        Open a cursor fetching the rows of its query while iterating over
+        them rather than all at once.
+        """
+        return self._connection.cursor()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Execute all statements within the context in a single transaction.
+
+        Nested transactions are merged into the outermost one. If an
+        exception occurs, the transaction is rolled back and the caches
+        are cleared, as they might contain ids of rolled back elements.
+        """
+        self._transaction_depth += 1
+        if self._transaction_depth == 1:
+            with closing(self._connection.cursor()) as cursor:
+                cursor.execute('BEGIN')
+        try:
+            yield
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                with closing(self._connection.cursor()) as cursor:
+                    cursor.execute('ROLLBACK')
+                self._cache.clear()
+                self._software_packages.clear()
+                self._software_versions.clear()
+                self.clear_result_cache()
+            raise
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            with closing(self._connection.cursor()) as cursor:
+                cursor.execute('COMMIT')
+
     def version_delta(
             self,
             a: SoftwareVersion,
@@ -677,6 +1175,30 @@ class GenericDatabaseBackend(Backend):
         raise BackendException(
             'unsupported model type for id lookup: {}'.format(type(element)))
 
+    def _invalidate(self, element: Model):
+        """Drop all cached results depending on element."""
+        if isinstance(element, SoftwarePackage):
+            self._result_cache.invalidate_matching(
+                lambda key: key[0] == 'retrieve_packages')
+        elif isinstance(element, SoftwareVersion):
+            self._total_version_count = None
+            package_key = element.software_package.key
+            self._result_cache.invalidate_matching(
+                lambda key: key[0] == 'retrieve_versions' and key[1] == package_key)
+
+    def _get_total_version_count(self) -> int:
+        """Get the (cached) total number of software versions."""
+        if self._total_version_count is None:
+            with closing(self._connection.cursor()) as cursor:
+                cursor.execute('''
+                SELECT
+                    COUNT(id)
+                FROM
+                    software_version
+                ''')
+                self._total_version_count = cursor.fetchone()[0]
+        return self._total_version_count
+
     def _get_or_create_static_file(self, static_file: StaticFile) -> id:
         """Get or create a static file element an return its id."""
         static_file_id = self._get_id(static_file)
@@ -705,9 +1227,11 @@ class GenericDatabaseBackend(Backend):
         with closing(self._connection.cursor()) as cursor:
             cursor.execute('''
             SELECT
+                p.id,
                 p.name,
                 p.vendor,
                 p.alternative_names,
+                v.id,
                 v.name,
                 v.internal_identifier,
                 v.release_date
@@ -758,21 +1282,69 @@ class GenericDatabaseBackend(Backend):
             return cursor.fetchall()
 
     @staticmethod
+    def _calculate_idf_weight(
+            total_version_count: int, global_using_versions_count: int) -> float:
+        # TODO: use packages instead of versions to prevent higher weight of packages with a higher number of released versions?
+        if not global_using_versions_count:
+            # this static file is not used at all (probably a negative match).
+            return 1
+        return log(
+            total_version_count /
+            global_using_versions_count, 10)
+
+    def _get_software_package_from_raw(
+            self, p_id: int, p_name: str, p_vendor: str,
+            p_alternative_names: object) -> SoftwarePackage:
+        """Get the interned software package of a row."""
+        software_package = self._software_packages.get(p_id)
+        if software_package is None:
+            software_package = SoftwarePackage(
+                name=p_name,
+                vendor=p_vendor,
+                alternative_names=self._unpack_list(p_alternative_names))
+            self._software_packages[p_id] = software_package
+            self._cache.put(software_package.key, p_id)
+        return software_package
+
+    def _get_software_version_from_raw(
+            self, p_id: int, p_name: str, p_vendor: str,
+            p_alternative_names: object, v_id: int, v_name: str,
+            v_internal_identifier: str,
+            v_release_date: datetime) -> SoftwareVersion:
+        """Get the interned software version of a row."""
+        software_version = self._software_versions.get(v_id)
+        if software_version is None:
+            software_version = self._intern_software_version(
+                self._get_software_package_from_raw(
+                    p_id, p_name, p_vendor, p_alternative_names),
+                v_id, v_name, v_internal_identifier, v_release_date)
+        return software_version
+
     def _get_software_versions_from_raw(
-            raw: Iterable) -> Set[SoftwareVersion]:
+            self, raw: Iterable) -> Set[SoftwareVersion]:
         return {
-            SoftwareVersion(
-                software_package=SoftwarePackage(
-                    name=p_name,
-                    vendor=p_vendor,
-                    alternative_names=GenericDatabaseBackend._unpack_list(p_alternative_names)),
+            self._get_software_version_from_raw(*row)
+            for row in raw
+        }
+
+    def _intern_software_version(
+            self, software_package: SoftwarePackage, v_id: int, v_name: str,
+            v_internal_identifier: str,
+            v_release_date: datetime) -> SoftwareVersion:
+        """
+        Get the interned software version with an id, creating it if it
+        is not interned yet.
+        """
+        software_version = self._software_versions.get(v_id)
+        if software_version is None:
+            software_version = SoftwareVersion(
+                software_package=software_package,
                 name=v_name,
                 internal_identifier=v_internal_identifier,
                 release_date=v_release_date)
-            for p_name, p_vendor, p_alternative_names, v_name, \
-                v_internal_identifier, v_release_date
-            in raw
-        }
+            self._software_versions[v_id] = software_version
+            self._cache.put(software_version.key, v_id)
+        return software_version
 
     @abstractmethod
     def _migrate(self):
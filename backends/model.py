@@ -1,8 +1,28 @@
-from abc import ABCMeta
+from abc import ABCMeta, abstractmethod
 
 
 class Model(metaclass=ABCMeta):
-    """An abstract superclass of all objects storable in the backend."""
+    """
+    An abstract superclass of all objects storable in the backend.
+
+    Models are slotted and cache their hash in _hash, which is computed
+    on first use. As string hashes differ between processes, models are
+    pickled as the arguments to create them (see __reduce__) without the
+    cached hash.
+    """
+    __slots__ = ('_hash',)
+
+    def __setstate__(self, state: dict):
+        # pickles of models from before they were slotted carry their
+        # instance dict as state
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._hash = None
 
     def __repr__(self) -> str:
         return "<{} '{}'>".format(str(self.__class__.__name__), str(self))
+
+    @property
+    @abstractmethod
+    def key(self) -> tuple:
+        """A stable key identifying the stored database record."""
@@ -0,0 +1,108 @@
+from typing import Iterable, List, Optional, Tuple
+
+from base.bitset import popcount
+
+
+class PathEntropy:
+    """
+    An in-memory evaluator of the entropy of webroot paths.
+
+    For every webroot path, the versions providing a static file at the
+    path are partitioned by the checksum of the static file. Versions are
+    integer bitsets, so that the entropy of the paths among any set of
+    versions is determined by intersecting the partitions with it.
+    """
+    # _partitions: Dict[str, Dict[bytes, int]]
+    # _users: Dict[str, int]
+
+    def __init__(self):
+        self._partitions = {}
+        self._users = {}
+
+    def __len__(self) -> int:
+        return len(self._partitions)
+
+    def add(self, webroot_path: str, checksum: bytes, users: int):
+        """Add the users of a static file at webroot_path."""
+        partitions = self._partitions.setdefault(webroot_path, {})
+        partitions[checksum] = partitions.get(checksum, 0) | users
+        self._users[webroot_path] = self._users.get(webroot_path, 0) | users
+
+    def evaluate(
+            self, versions: int, limit: Optional[int],
+            exclude: Iterable[str] = ()) -> List[Tuple[str, int, int]]:
+        """Rank the webroot paths by their entropy among versions."""
+        return evaluate_path_entropies(((self, versions),), limit, exclude)
+
+
+def evaluate_path_entropies(
+        entropies: Iterable[Tuple[PathEntropy, int]], limit: Optional[int],
+        exclude: Iterable[str] = ()) -> List[Tuple[str, int, int]]:
+    """
+    Rank the webroot paths by their entropy among the versions of
+    multiple entropies (as retrieve_webroot_paths_with_high_entropy of
+    the backends does). Every entropy is given with the bitset of its
+    versions to evaluate; the versions of different entropies are
+    distinct.
+
+    A 3-tuple of the webroot path, the number of users within the
+    versions and the number of different checksums is returned.
+    """
+    exclude = set(exclude)
+    version_count = 0
+    users_counts = {}
+    checksums = {}
+    for entropy, versions in entropies:
+        if not versions:
+            continue
+        version_count += popcount(versions)
+        for webroot_path, users in entropy._users.items():
+            users &= versions
+            if not users or webroot_path in exclude:
+                continue
+            users_counts[webroot_path] = \
+                users_counts.get(webroot_path, 0) + popcount(users)
+            checksums.setdefault(webroot_path, set()).update(
+                checksum
+                for checksum, checksum_users
+                in entropy._partitions[webroot_path].items()
+                if checksum_users & versions)
+
+    result = []
+    for webroot_path, users_count in users_counts.items():
+        checksum_count = len(checksums[webroot_path])
+        if version_count > 1 and users_count == version_count and checksum_count == 1:
+            continue
+        result.append((webroot_path, users_count, checksum_count))
+    result.sort(key=lambda row: row[1] + row[2], reverse=True)
+
+    if limit:
+        return result[:int(limit)]
+    return result
+
+
+def pack_bits(bits: Iterable[int]) -> Tuple[int, bytes]:
+    """
+    Pack bit positions (e.g., version ids) for storage as the offset of
+    the lowest byte and a little-endian bitmap from there on.
+    """
+    bits = list(bits)
+    if not bits:
+        return 0, b''
+    offset = min(bits) // 8 * 8
+    packed = bytearray((max(bits) - offset) // 8 + 1)
+    for bit in bits:
+        bit -= offset
+        packed[bit >> 3] |= 1 << (bit & 7)
+    return offset, bytes(packed)
+
+
+def unpack_bits(offset: int, packed: bytes) -> List[int]:
+    """Unpack the bit positions packed by pack_bits."""
+    return [
+        offset + index * 8 + bit
+        for index, byte in enumerate(packed)
+        if byte
+        for bit in range(8)
+        if byte & (1 << bit)
+    ]
@@ -1,8 +1,11 @@
+import csv
 import json
 from contextlib import closing
 from datetime import datetime
+from io import StringIO
 from string import ascii_letters, digits
 from typing import Iterable, List, Optional, Tuple, Union
+from uuid import uuid4
 
 import psycopg2
 
@@ -127,8 +130,12 @@ class PostgresqlBackend(GenericDatabaseBackend):
         For postgres, return value is not always accurate.
         """
         if isinstance(element, list):
+            for elem in element:
+                self._invalidate(elem)
             return self._store_many(element)
 
+        self._invalidate(element)
+
         if isinstance(element, SoftwarePackage):
             self._insert_software_package(element)
             return True
@@ -238,6 +245,18 @@ class PostgresqlBackend(GenericDatabaseBackend):
         self._connection = psycopg2.connect(*args, **kwargs)
         self._connection.set_session(autocommit=True)
 
+    def _streaming_cursor(self):
+        """
+        Open a server-side cursor, as client-side cursors fetch all rows
+        of their query at once.
+        """
+        # named cursors have to be held to be used in autocommit mode, and
+        # their names have to be unique as exports might be interleaved
+        cursor = self._connection.cursor(
+            name='streaming_{}'.format(uuid4().hex), withhold=True)
+        cursor.itersize = 10000
+        return cursor
+
     def _migrate(self):
         """Create the database tables if they do not exist."""
         with closing(self._connection.cursor()) as cursor:
@@ -285,6 +304,12 @@ class PostgresqlBackend(GenericDatabaseBackend):
                 static_file_webroot_path
             ON static_file(webroot_path)
             ''')
+            # covers the static file lookups of joins with static_file_use
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS
+                static_file_covering
+            ON static_file(id, webroot_path, checksum)
+            ''')
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS static_file_use (
                 software_version_id INTEGER NOT NULL,
@@ -299,6 +324,26 @@ class PostgresqlBackend(GenericDatabaseBackend):
                 static_file_use_static_file_id
             ON static_file_use(static_file_id)
             ''')
+            # the precomputed path entropy (see update_path_entropy)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS path_entropy_package (
+                software_package_id INTEGER PRIMARY KEY NOT NULL,
+                versions_offset INTEGER NOT NULL,
+                versions BYTEA NOT NULL,
+                FOREIGN KEY(software_package_id) REFERENCES software_package(id) ON DELETE CASCADE
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS path_entropy (
+                software_package_id INTEGER NOT NULL,
+                webroot_path TEXT NOT NULL,
+                checksum BYTEA NOT NULL,
+                users_offset INTEGER NOT NULL,
+                users BYTEA NOT NULL,
+                FOREIGN KEY(software_package_id) REFERENCES software_package(id) ON DELETE CASCADE,
+                PRIMARY KEY(software_package_id, webroot_path, checksum)
+            )
+            ''')
 
     def _store_many(self, elements: List[Model]) -> Optional[List[bool]]:
         if not elements:
@@ -313,10 +358,11 @@ class PostgresqlBackend(GenericDatabaseBackend):
             # inspection does not notice that this is indeed a List[SoftwareVersion]
             # noinspection PyTypeChecker
             self._store_many_software_versions(elements)
+            return [True] * len(elements)
         elif model == StaticFile:
             # inspection does not notice that this is indeed a List[StaticFile]
             # noinspection PyTypeChecker
-            self._store_many_static_files(elements)
+            return self._store_many_static_files(elements)
         else:
             # implement actual bulk insertion for other model types
             return [
@@ -354,59 +400,136 @@ class PostgresqlBackend(GenericDatabaseBackend):
                         name=EXCLUDED.name
                 RETURNING id
                 ''')
-            for software_package, id in zip(versions, cursor.fetchall()):
-                self._cache[software_package] = id
-
-    def _store_many_static_files(self, static_files: List[StaticFile]):
-        with closing(self._connection.cursor()) as cursor:
-            query_values = []
+            for software_version, (id,) in zip(versions, cursor.fetchall()):
+                self._cache.put(software_version.key, id)
 
-            # add all static file objects to cache
-            self._insert_raw_static_files(static_files)
+    def _store_many_static_files(self, static_files: List[StaticFile]) -> List[bool]:
+        """
+        Store multiple static files and get whether a new use has been
+        stored for each of them.
 
-            for static_file in static_files:
-                software_version_id = self._insert_software_version(
-                    static_file.software_version)
-                static_file_id = self._get_or_create_static_file(static_file)
-                query_values.append(
-                    cursor.mogrify('(%s, %s)',
-                                   (software_version_id, static_file_id)))
-            cursor.execute(b'''
-                INSERT
-                INTO static_file_use (
-                    software_version_id,
-                    static_file_id)
-                VALUES ''' + b','.join(query_values) + b'''
-                ON CONFLICT DO NOTHING
-                ''')
+        The static files are copied into a temporary staging table along
+        with the ids of their software versions. The static files and their
+        uses are then upserted by set-based statements within a single
+        transaction.
+        """
+        software_version_ids = {
+            software_version: self._insert_software_version(software_version)
+            for software_version in {
+                static_file.software_version
+                for static_file in static_files
+            }
+        }
+
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for static_file in static_files:
+            writer.writerow((
+                software_version_ids[static_file.software_version],
+                static_file.src_path,
+                static_file.webroot_path,
+                '\\x' + static_file.checksum.hex()))
+        buffer.seek(0)
 
-    def _insert_raw_static_files(self, static_files: List[StaticFile]) -> List[int]:
-        """Get or insert multiple static files and get their ids."""
-        with closing(self._connection.cursor()) as cursor:
-            query_values = []
-            for static_file in static_files:
-                query_values.append(cursor.mogrify('(%s, %s, %s)', (
-                    static_file.src_path,
-                    static_file.webroot_path,
-                    static_file.checksum)))
-            cursor.execute(b'''
+        with self.transaction(), closing(self._connection.cursor()) as cursor:
+            cursor.execute('''
+            CREATE TEMPORARY TABLE IF NOT EXISTS static_file_staging (
+                software_version_id INTEGER NOT NULL,
+                src_path TEXT NOT NULL,
+                webroot_path TEXT NOT NULL,
+                checksum BYTEA NOT NULL
+            ) ON COMMIT DELETE ROWS
+            ''')
+            # the rows are only deleted on commit, while this might be
+            # nested within a larger transaction (e.g., of the writer)
+            cursor.execute('TRUNCATE static_file_staging')
+            cursor.copy_expert('''
+            COPY static_file_staging (
+                software_version_id,
+                src_path,
+                webroot_path,
+                checksum)
+            FROM STDIN WITH (FORMAT csv)
+            ''', buffer)
+            # a consistent order prevents deadlocks between concurrent writers
+            cursor.execute('''
             INSERT
             INTO static_file (
                 src_path,
                 webroot_path,
                 checksum)
-            VALUES ''' + b','.join(query_values) + b'''
+            SELECT DISTINCT
+                src_path,
+                webroot_path,
+                checksum
+            FROM static_file_staging
+            ORDER BY
+                src_path,
+                webroot_path,
+                checksum
             ON CONFLICT
                 (src_path, webroot_path, checksum)
-                DO UPDATE
-                SET "src_path"="static_file"."src_path"
-            RETURNING id
+                DO NOTHING
+            ''')
+            cursor.execute('''
+            WITH staged AS (
+                SELECT
+                    s.software_version_id,
+                    f.id,
+                    f.src_path,
+                    f.webroot_path,
+                    f.checksum
+                FROM static_file_staging s
+                JOIN static_file f ON
+                    f.src_path = s.src_path AND
+                    f.webroot_path = s.webroot_path AND
+                    f.checksum = s.checksum
+            ), uses AS (
+                INSERT
+                INTO static_file_use (
+                    software_version_id,
+                    static_file_id)
+                SELECT DISTINCT
+                    software_version_id,
+                    id
+                FROM staged
+                ON CONFLICT DO NOTHING
+                RETURNING
+                    software_version_id,
+                    static_file_id
+            )
+            SELECT DISTINCT
+                s.software_version_id,
+                s.id,
+                s.src_path,
+                s.webroot_path,
+                s.checksum,
+                u.static_file_id IS NOT NULL
+            FROM staged s
+            LEFT JOIN uses u ON
+                u.software_version_id = s.software_version_id AND
+                u.static_file_id = s.id
             ''')
-            result = []
-            for static_file, id in zip(static_files, cursor.fetchall()):
-                self._cache[static_file] = id
-                result.append(id)
-            return result
+            staged = {}
+            for (software_version_id, id, src_path, webroot_path, checksum,
+                    new_use) in cursor.fetchall():
+                staged[software_version_id, src_path, webroot_path, bytes(checksum)] = \
+                    id, new_use
+
+        result = []
+        new_uses = set()
+        for static_file in static_files:
+            id, new_use = staged[
+                software_version_ids[static_file.software_version],
+                static_file.src_path, static_file.webroot_path,
+                static_file.checksum]
+            self._cache.put(static_file.key, id)
+            # only the first of duplicate static files adds the use
+            use = software_version_ids[static_file.software_version], id
+            result.append(new_use and use not in new_uses)
+            if new_use:
+                new_uses.add(use)
+        return result
 
     @staticmethod
     def _pack_list(unpacked: list) -> object:
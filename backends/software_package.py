@@ -6,6 +6,7 @@ from backends.model import Model
 
 class SoftwarePackage(Model):
     """A software package."""
+    __slots__ = ('name', 'vendor', 'alternative_names')
 
     # name: str
     # vendor: str
@@ -17,6 +18,11 @@ class SoftwarePackage(Model):
         self.alternative_names = alternative_names
         if not alternative_names:
             self.alternative_names = []
+        self._hash = None
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (
+            self.name, self.vendor, self.alternative_names)
 
     def __str__(self) -> str:
         return self.name
@@ -25,7 +31,9 @@ class SoftwarePackage(Model):
         return self.name == other.name and self.vendor == other.vendor
 
     def __hash__(self) -> int:
-        return hash(self.name) ^ hash(self.vendor)
+        if self._hash is None:
+            self._hash = hash(self.name) ^ hash(self.vendor)
+        return self._hash
 
     @property
     def cache_directory(self) -> str:
@@ -36,6 +44,11 @@ class SoftwarePackage(Model):
             CACHE_DIR,
             self.name.lower())
 
+    @property
+    def key(self) -> tuple:
+        """A stable key identifying the stored database record."""
+        return 'SoftwarePackage', self.name, self.vendor
+
     def serialize(self) -> dict:
         """Serialize into a dict."""
         return {
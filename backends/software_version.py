@@ -1,7 +1,4 @@
-import os
-import pickle
 from datetime import datetime
-from subprocess import call
 
 from backends.model import Model
 from backends.software_package import SoftwarePackage
@@ -9,6 +6,8 @@ from backends.software_package import SoftwarePackage
 
 class SoftwareVersion(Model):
     """A specific version of a software package."""
+    __slots__ = ('software_package', 'name', 'internal_identifier', 'release_date')
+
     # software_package: SoftwarePackage
     # name: str
     # internal_identifier: str
@@ -20,6 +19,12 @@ class SoftwareVersion(Model):
         self.name = name
         self.internal_identifier = internal_identifier
         self.release_date = release_date
+        self._hash = None
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (
+            self.software_package, self.name, self.internal_identifier,
+            self.release_date)
 
     def __str__(self) -> str:
         return '{} {}'.format(str(self.software_package), self.name)
@@ -29,7 +34,18 @@ class SoftwareVersion(Model):
                 self.internal_identifier == other.internal_identifier)
 
     def __hash__(self) -> int:
-        return hash(self.software_package) ^ hash(self.internal_identifier)
+        if self._hash is None:
+            self._hash = hash(self.software_package) ^ hash(self.internal_identifier)
+        return self._hash
+
+    @property
+    def key(self) -> tuple:
+        """A stable key identifying the stored database record."""
+        return (
+            'SoftwareVersion',
+            self.software_package.name,
+            self.software_package.vendor,
+            self.internal_identifier)
 
     def serialize(self) -> dict:
         """Serialize into a dict."""
@@ -43,9 +59,6 @@ class SoftwareVersion(Model):
     @property
     def vulnerable(self) -> bool:
         """Check whether the version has known vulnerabilities."""
-        from settings import CVE_STATISTICS_FILE
-        if not os.path.isfile(CVE_STATISTICS_FILE):
-            call(['vendor/update'])
-        with open(CVE_STATISTICS_FILE, 'rb') as fh:
-            cve_statistics = pickle.load(fh)
-        return bool(cve_statistics.get(self))
+        # the statistics module depends on this one
+        from cve.statistics import get_cve_statistics
+        return get_cve_statistics().is_vulnerable(self)
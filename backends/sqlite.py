@@ -1,9 +1,12 @@
 import json
 import sqlite3
+from collections import OrderedDict
 from contextlib import closing
-from typing import Iterable, Tuple
+from typing import Iterable, List, Tuple, Union
 
 from backends.generic_db import GenericDatabaseBackend
+from backends.model import Model
+from backends.static_file import StaticFile
 
 
 class SqliteBackend(GenericDatabaseBackend):
@@ -11,9 +14,23 @@ class SqliteBackend(GenericDatabaseBackend):
     _operator = '?'
     _true_value = '1'
 
+    def store(self, element: Union[Model, List[Model]]) -> Union[bool, List[bool]]:
+        """
+        Insert or update an instance or multiple instances of a Model
+        subclass.
+
+        Returns whether a change has been made.
+        """
+        if isinstance(element, list) and element and all(
+                isinstance(elem, StaticFile) for elem in element):
+            return self._store_many_static_files(element)
+        return super().store(element)
+
     def _open_connection(self, *args, **kwargs):
         """Open a connection to the database."""
         kwargs['detect_types'] = sqlite3.PARSE_DECLTYPES
+        # transactions are controlled explicitly (see transaction)
+        kwargs['isolation_level'] = None
 
         self._connection = sqlite3.connect(*args, **kwargs)
 
@@ -58,6 +75,12 @@ class SqliteBackend(GenericDatabaseBackend):
                 static_file_webroot_path
             ON static_file(webroot_path)
             ''')
+            # covers the static file lookups of joins with static_file_use
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS
+                static_file_covering
+            ON static_file(id, webroot_path, checksum)
+            ''')
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS static_file_use (
                 software_version_id INTEGER NOT NULL,
@@ -72,6 +95,95 @@ class SqliteBackend(GenericDatabaseBackend):
                 static_file_use_static_file_id
             ON static_file_use(static_file_id)
             ''')
+            cursor.execute('''
+            SELECT 1
+            FROM sqlite_master
+            WHERE
+                type = 'index' AND
+                name = 'static_file_unique'
+            ''')
+            if cursor.fetchone() is None:
+                # static files are unique since the bulk store relies on it
+                with self.transaction():
+                    self._deduplicate_static_files(cursor)
+                    cursor.execute('''
+                    CREATE UNIQUE INDEX
+                        static_file_unique
+                    ON static_file(src_path, webroot_path, checksum)
+                    ''')
+            # the precomputed path entropy (see update_path_entropy)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS path_entropy_package (
+                software_package_id INTEGER PRIMARY KEY NOT NULL,
+                versions_offset INTEGER NOT NULL,
+                versions BINARY NOT NULL,
+                FOREIGN KEY(software_package_id) REFERENCES software_package(id)
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS path_entropy (
+                software_package_id INTEGER NOT NULL,
+                webroot_path TEXT NOT NULL,
+                checksum BINARY NOT NULL,
+                users_offset INTEGER NOT NULL,
+                users BINARY NOT NULL,
+                FOREIGN KEY(software_package_id) REFERENCES software_package(id),
+                PRIMARY KEY(software_package_id, webroot_path, checksum)
+            )
+            ''')
+
+    @staticmethod
+    def _deduplicate_static_files(cursor: sqlite3.Cursor):
+        """
+        Merge the static files stored multiple times (by databases from
+        before static files were unique) into the one stored first.
+        """
+        cursor.execute('''
+        CREATE TEMP TABLE static_file_duplicate AS
+        SELECT
+            f.id AS id,
+            k.keep_id AS keep_id
+        FROM static_file f
+        JOIN (
+            SELECT
+                src_path,
+                webroot_path,
+                checksum,
+                MIN(id) AS keep_id
+            FROM static_file
+            GROUP BY
+                src_path,
+                webroot_path,
+                checksum
+            HAVING COUNT(*) > 1
+        ) k ON
+            f.src_path = k.src_path AND
+            f.webroot_path = k.webroot_path AND
+            f.checksum = k.checksum
+        WHERE f.id <> k.keep_id
+        ''')
+        cursor.execute('''
+        INSERT OR IGNORE
+        INTO static_file_use (
+            software_version_id,
+            static_file_id)
+        SELECT
+            u.software_version_id,
+            d.keep_id
+        FROM static_file_use u
+        JOIN static_file_duplicate d ON d.id = u.static_file_id
+        ''')
+        cursor.execute('''
+        DELETE
+        FROM static_file_use
+        WHERE static_file_id IN (SELECT id FROM static_file_duplicate)
+        ''')
+        cursor.execute('''
+        DELETE
+        FROM static_file
+        WHERE id IN (SELECT id FROM static_file_duplicate)
+        ''')
+        cursor.execute('DROP TABLE static_file_duplicate')
 
     @staticmethod
     def _pack_list(unpacked: list) -> object:
@@ -89,3 +201,89 @@ class SqliteBackend(GenericDatabaseBackend):
         params = list(params)
         operators = ', '.join([self._operator] * len(params))
         return '(' + operators + ')', list(params)
+
+    def _store_many_static_files(self, static_files: List[StaticFile]) -> List[bool]:
+        """
+        Store multiple static files using set-based statements.
+
+        The static files are staged within a temporary table, from which
+        the missing static files and their uses are inserted. The static
+        files of every software version are stored in a single transaction.
+        """
+        by_version = OrderedDict()
+        for position, static_file in enumerate(static_files):
+            by_version.setdefault(static_file.software_version, []).append(
+                (position, static_file))
+
+        result = [False] * len(static_files)
+        for software_version, version_files in by_version.items():
+            with self.transaction(), closing(self._connection.cursor()) as cursor:
+                software_version_id = self._get_id(software_version)
+                if software_version_id is None:
+                    # Software version not yet stored.
+                    super().store(software_version)
+                    software_version_id = self._get_id(software_version)
+
+                cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS static_file_staging (
+                    position INTEGER PRIMARY KEY NOT NULL,
+                    src_path TEXT NOT NULL,
+                    webroot_path TEXT NOT NULL,
+                    checksum BINARY NOT NULL
+                )
+                ''')
+                cursor.execute('DELETE FROM static_file_staging')
+                cursor.executemany('''
+                INSERT
+                INTO static_file_staging (
+                    position,
+                    src_path,
+                    webroot_path,
+                    checksum)
+                VALUES (?, ?, ?, ?)
+                ''', (
+                    (position, static_file.src_path,
+                     static_file.webroot_path, static_file.checksum)
+                    for position, static_file in version_files))
+                cursor.execute('''
+                INSERT OR IGNORE
+                INTO static_file (
+                    src_path,
+                    webroot_path,
+                    checksum)
+                SELECT
+                    src_path,
+                    webroot_path,
+                    checksum
+                FROM static_file_staging
+                ORDER BY position
+                ''')
+                cursor.execute('''
+                SELECT
+                    s.position,
+                    f.id,
+                    u.static_file_id IS NULL
+                FROM static_file_staging s
+                JOIN static_file f ON
+                    f.src_path = s.src_path AND
+                    f.webroot_path = s.webroot_path AND
+                    f.checksum = s.checksum
+                LEFT JOIN static_file_use u ON
+                    u.software_version_id = ? AND
+                    u.static_file_id = f.id
+                ORDER BY s.position
+                ''', (software_version_id,))
+                new_uses = set()
+                for position, static_file_id, missing in cursor.fetchall():
+                    if missing and static_file_id not in new_uses:
+                        new_uses.add(static_file_id)
+                        result[position] = True
+                cursor.executemany('''
+                INSERT
+                INTO static_file_use (
+                    software_version_id,
+                    static_file_id)
+                VALUES (?, ?)
+                ''', ((software_version_id, static_file_id)
+                      for static_file_id in new_uses))
+        return result
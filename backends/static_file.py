@@ -6,6 +6,8 @@ from backends.software_version import SoftwareVersion
 
 class StaticFile(Model):
     """A (maybe not so) static file."""
+    __slots__ = ('software_version', 'src_path', 'webroot_path', 'checksum')
+
     # software_version: SoftwareVersion
     # src_path: str
     # webroot_path: str
@@ -17,6 +19,12 @@ class StaticFile(Model):
         self.src_path = src_path
         self.webroot_path = webroot_path
         self.checksum = checksum
+        self._hash = None
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (
+            self.software_version, self.src_path, self.webroot_path,
+            self.checksum)
 
     def __str__(self) -> str:
         return '{} -> {}'.format(self.webroot_path, self.src_path)
@@ -28,5 +36,16 @@ class StaticFile(Model):
                 self.checksum == other.checksum)
 
     def __hash__(self) -> int:
-        return hash(self.software_version) ^ hash(self.src_path) ^ \
-            hash(self.webroot_path) ^ hash(self.checksum)
+        if self._hash is None:
+            self._hash = hash(self.software_version) ^ hash(self.src_path) ^ \
+                hash(self.webroot_path) ^ hash(self.checksum)
+        return self._hash
+
+    @property
+    def key(self) -> tuple:
+        """
+        A stable key identifying the stored database record.
+
+        Static files are stored independently of the versions using them.
+        """
+        return 'StaticFile', self.src_path, self.webroot_path, self.checksum
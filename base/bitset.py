@@ -0,0 +1,25 @@
+from typing import Iterable, Iterator
+
+
+def bits_to_int(bits: Iterable[int]) -> int:
+    """Build an integer bitset from an iterable of bit positions."""
+    result = 0
+    for bit in bits:
+        result |= 1 << bit
+    return result
+
+
+def iterate_bits(bitset: int) -> Iterator[int]:
+    """Iterate over the positions of all set bits of an integer bitset."""
+    # the bytes are scanned once, as clearing bits copies large integers
+    packed = bitset.to_bytes((bitset.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(packed):
+        while byte:
+            lowest = byte & -byte
+            yield index * 8 + lowest.bit_length() - 1
+            byte ^= lowest
+
+
+def popcount(bitset: int) -> int:
+    """Count the set bits of an integer bitset."""
+    return bin(bitset).count('1')
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A bounded cache evicting the least recently used entries.
+
+    It counts hits and misses of lookups.
+    """
+    # max_size: int
+    # hits: int
+    # misses: int
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+    def get(self, key: Hashable, default: object = MISSING) -> object:
+        """
+        Get the value for key and mark it as recently used.
+
+        default (MISSING unless specified) is returned for unknown keys.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def invalidate(self, key: Hashable):
+        """Remove the entry for key if it exists."""
+        self._entries.pop(key, None)
+
+    def invalidate_matching(self, predicate: Callable[[Hashable], bool]):
+        """Remove all entries whose keys match predicate."""
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def put(self, key: Hashable, value: object):
+        """Store value for key, evicting the least recently used entry if full."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def statistics(self) -> dict:
+        """Get the size and the hit/miss counters of the cache."""
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Compare the query plans and timings of the query retrieving webroot
+paths with a high entropy before and after the covering indexes and the
+anti-join rewrite on an SQLite index.
+
+Opening the index applies the schema migration. The plan before is
+determined within a transaction dropping the covering index, which is
+rolled back afterwards.
+"""
+from argparse import ArgumentParser, Namespace
+from contextlib import closing
+from statistics import median
+from time import perf_counter
+from typing import List, Tuple
+
+from backends.sqlite import SqliteBackend
+
+
+def legacy_query(
+        backend: SqliteBackend, software_version_ids: tuple, limit: int,
+        exclude: tuple) -> Tuple[str, tuple]:
+    """Build the query as it was before the anti-join rewrite."""
+    list_operators, params = backend._expand_list_operators(software_version_ids)
+    query = '''
+    SELECT
+        subquery.webroot_path,
+        subquery.version_count,
+        subquery.checksum_count
+    FROM (
+        SELECT
+            sf.webroot_path,
+            COUNT(DISTINCT us.software_version_id) version_count,
+            COUNT(DISTINCT sf.checksum) checksum_count
+        FROM
+            static_file sf
+        JOIN
+            static_file_use us
+        ON
+            us.static_file_id=sf.id
+        WHERE
+            us.software_version_id IN ''' + list_operators
+    if exclude:
+        operators, new_params = backend._expand_list_operators(exclude)
+        query += 'AND sf.webroot_path NOT IN ' + operators
+        params.extend(new_params)
+    query += '''
+        GROUP BY
+            sf.webroot_path) subquery
+    '''
+    if len(software_version_ids) > 1:
+        query += '''
+        WHERE
+            NOT (
+                subquery.version_count = ''' + str(len(software_version_ids)) + ''' AND
+                subquery.checksum_count = 1)
+        '''
+    query += '''
+    ORDER BY
+        (subquery.version_count + subquery.checksum_count) DESC
+    LIMIT ''' + str(int(limit))
+    return query, tuple(params)
+
+
+def measure(
+        backend: SqliteBackend, query: str, params: tuple,
+        repetitions: int) -> Tuple[List[str], float, list]:
+    """Get the query plan, the median time and the result of query."""
+    with closing(backend._connection.cursor()) as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + query, params)
+        plan = [row[-1] for row in cursor.fetchall()]
+        timings = []
+        for _ in range(repetitions):
+            start = perf_counter()
+            cursor.execute(query, params)
+            result = cursor.fetchall()
+            timings.append(perf_counter() - start)
+    return plan, median(timings), result
+
+
+def select_versions(backend: SqliteBackend, package: str) -> tuple:
+    """Select the ids of the indexed versions of a software package."""
+    with closing(backend._connection.cursor()) as cursor:
+        query = '''
+        SELECT
+            sv.id
+        FROM
+            software_version sv
+        JOIN
+            software_package sp
+        ON
+            sp.id=sv.software_package_id
+        WHERE
+            sv.indexed IS NOT NULL AND
+        '''
+        if package:
+            cursor.execute(query + 'sp.name=?', (package,))
+        else:
+            # the software package with the most versions
+            cursor.execute(query + '''
+            sp.id=(
+                SELECT
+                    software_package_id
+                FROM
+                    software_version
+                GROUP BY
+                    software_package_id
+                ORDER BY
+                    COUNT(*) DESC
+                LIMIT 1)
+            ''')
+        return tuple(row[0] for row in cursor.fetchall())
+
+
+def benchmark(arguments: Namespace):
+    backend = SqliteBackend(arguments.index)
+    software_version_ids = select_versions(backend, arguments.package)
+    if not software_version_ids:
+        print('no indexed versions found.')
+        return
+
+    # exclude the paths ranked highest as the analysis does for
+    # webroot paths already retrieved
+    exclude = ()
+    if arguments.exclude:
+        query, params = backend._high_entropy_query(
+            software_version_ids, arguments.exclude, ())
+        exclude = tuple(row[0] for row in measure(backend, query, params, 1)[2])
+
+    with closing(backend._connection.cursor()) as cursor:
+        cursor.execute('BEGIN')
+        cursor.execute('DROP INDEX IF EXISTS static_file_covering')
+        try:
+            before = measure(
+                backend,
+                *legacy_query(
+                    backend, software_version_ids, arguments.limit, exclude),
+                repetitions=arguments.repetitions)
+        finally:
+            cursor.execute('ROLLBACK')
+    after = measure(
+        backend,
+        *backend._high_entropy_query(
+            software_version_ids, arguments.limit, exclude),
+        repetitions=arguments.repetitions)
+
+    print('{} versions, {} excluded webroot paths\n'.format(
+        len(software_version_ids), len(exclude)))
+    for title, (plan, timing, _) in (('before', before), ('after', after)):
+        print('{}: {:.1f} ms'.format(title, timing * 1000))
+        for line in plan:
+            print('  ' + line)
+        print()
+    if sorted(before[2]) != sorted(after[2]):
+        # paths with equal ranks might be limited differently
+        print('results differ!')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument(
+        'index', type=str,
+        help='The SQLite index database to benchmark',
+    )
+    parser.add_argument(
+        '-p', '--package', type=str,
+        help='The software package to use the versions of (defaults to the one with most versions)',
+    )
+    parser.add_argument(
+        '-e', '--exclude', type=int, default=20,
+        help='The number of webroot paths to exclude',
+    )
+    parser.add_argument(
+        '-l', '--limit', type=int, default=10,
+    )
+    parser.add_argument(
+        '-r', '--repetitions', type=int, default=5,
+    )
+    benchmark(parser.parse_args())
@@ -5,7 +5,6 @@ counts for software versions.
 """
 import json
 import logging
-import pickle
 from collections import defaultdict
 from datetime import date
 from gzip import decompress
@@ -15,7 +14,8 @@ import requests
 
 from backends.software_version import SoftwareVersion
 from base.utils import match_str_to_software_version
-from settings import CVE_STATISTICS_FILE
+from cve.statistics import CveStatistics
+from settings import CVE_STATISTICS_DATABASE
 
 
 FIRST_CVE_YEAR = 2002
@@ -61,8 +61,7 @@ def update_cve_statistics():
         _join_statistics(
             statistics,
             cve_stats_for_year(year))
-    with open(CVE_STATISTICS_FILE, 'wb') as fh:
-        pickle.dump(statistics, fh)
+    CveStatistics.write(CVE_STATISTICS_DATABASE, statistics)
 
 
 def _join_statistics(target: dict, join: dict):
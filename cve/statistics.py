@@ -0,0 +1,140 @@
+"""
+This module provides the CVE statistics to the analysis.
+
+The statistics are stored in an SQLite database keyed by the software
+package and the internal identifier of the affected versions. The keys
+of all vulnerable versions are loaded once per process on first use.
+"""
+import os
+import pickle
+import sqlite3
+from contextlib import closing
+from subprocess import call
+from typing import Dict, FrozenSet, Iterable, Set, Tuple
+
+from backends.software_version import SoftwareVersion
+
+
+# the statistics of this process (see get_cve_statistics)
+_statistics = None
+
+
+class CveStatistics:
+    """The CVE statistics of the software versions."""
+    # path: str
+    # _vulnerable: Optional[FrozenSet[Tuple[str, str, str]]]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._vulnerable = None
+
+    def cves(self, version: SoftwareVersion) -> Set[str]:
+        """Get the ids of the CVEs affecting version."""
+        with closing(sqlite3.connect(self.path)) as connection:
+            return {
+                row[0]
+                for row in connection.execute('''
+                SELECT
+                    cve_id
+                FROM
+                    cve_statistics
+                WHERE
+                    package_name=? AND
+                    package_vendor=? AND
+                    internal_identifier=?
+                ''', _version_key(version))
+            }
+
+    def is_vulnerable(self, version: SoftwareVersion) -> bool:
+        """Check whether a version has known vulnerabilities."""
+        return _version_key(version) in self._load()
+
+    def vulnerable(self, versions: Iterable[SoftwareVersion]) -> Dict[SoftwareVersion, bool]:
+        """Check whether multiple versions have known vulnerabilities."""
+        vulnerable = self._load()
+        return {
+            version: _version_key(version) in vulnerable
+            for version in versions
+        }
+
+    @staticmethod
+    def write(path: str, statistics: Dict[SoftwareVersion, Set[str]]):
+        """
+        Write the CVE ids of versions to a new statistics database,
+        replacing the one at path.
+        """
+        temporary_path = path + '.tmp'
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        with closing(sqlite3.connect(temporary_path)) as connection:
+            connection.execute('''
+            CREATE TABLE cve_statistics (
+                package_name TEXT NOT NULL,
+                package_vendor TEXT NOT NULL,
+                internal_identifier TEXT NOT NULL,
+                cve_id TEXT NOT NULL,
+                PRIMARY KEY(package_name, package_vendor, internal_identifier, cve_id)
+            ) WITHOUT ROWID
+            ''')
+            connection.executemany('''
+            INSERT OR IGNORE
+            INTO cve_statistics (
+                package_name,
+                package_vendor,
+                internal_identifier,
+                cve_id)
+            VALUES (?, ?, ?, ?)
+            ''', (
+                _version_key(version) + (cve_id,)
+                for version, cve_ids in statistics.items()
+                for cve_id in cve_ids))
+            connection.commit()
+        os.replace(temporary_path, path)
+
+    def _load(self) -> FrozenSet[Tuple[str, str, str]]:
+        if self._vulnerable is None:
+            with closing(sqlite3.connect(self.path)) as connection:
+                self._vulnerable = frozenset(
+                    tuple(row)
+                    for row in connection.execute('''
+                    SELECT DISTINCT
+                        package_name,
+                        package_vendor,
+                        internal_identifier
+                    FROM
+                        cve_statistics
+                    '''))
+        return self._vulnerable
+
+
+def convert_legacy_statistics(pickle_path: str, path: str):
+    """Convert pickled CVE statistics to a statistics database."""
+    with open(pickle_path, 'rb') as fh:
+        CveStatistics.write(path, pickle.load(fh))
+
+
+def get_cve_statistics() -> CveStatistics:
+    """
+    Get the CVE statistics of this process.
+
+    Missing statistics are converted from the legacy pickle if it
+    exists or fetched otherwise.
+    """
+    global _statistics
+    if _statistics is None:
+        from settings import CVE_STATISTICS_DATABASE, CVE_STATISTICS_FILE
+        if not os.path.isfile(CVE_STATISTICS_DATABASE):
+            if os.path.isfile(CVE_STATISTICS_FILE):
+                convert_legacy_statistics(
+                    CVE_STATISTICS_FILE, CVE_STATISTICS_DATABASE)
+            else:
+                call(['vendor/update'])
+        _statistics = CveStatistics(CVE_STATISTICS_DATABASE)
+    return _statistics
+
+
+def _version_key(version: SoftwareVersion) -> Tuple[str, str, str]:
+    return (
+        version.software_package.name,
+        version.software_package.vendor,
+        version.internal_identifier)
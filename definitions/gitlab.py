@@ -11,7 +11,8 @@ class GitlabEnterpriseEdition(SoftwareDefinition):
         software_package=software_package,
         repo_base_url='https://packages.gitlab.com/gitlab/gitlab-ee/ubuntu/',
         repo_packages_path='dists/xenial/main/binary-amd64/Packages',
-        repo_package='gitlab-ee'
+        repo_package='gitlab-ee',
+        streaming=True,
     )
     path_map = {
         '/': '/opt/gitlab/embedded/service/gitlab-rails/public/',
@@ -26,7 +27,8 @@ class GitlabCommunityEdition(SoftwareDefinition):
         software_package=software_package,
         repo_base_url='https://packages.gitlab.com/gitlab/gitlab-ce/ubuntu/',
         repo_packages_path='dists/xenial/main/binary-amd64/Packages',
-        repo_package='gitlab-ce'
+        repo_package='gitlab-ce',
+        streaming=True,
     )
     path_map = {
         '/': '/opt/gitlab/embedded/service/gitlab-rails/public/',
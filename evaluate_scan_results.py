@@ -8,6 +8,7 @@ from typing import Dict
 from tqdm import tqdm
 
 from base.utils import match_str_to_software_version, most_recent_version
+from cve.statistics import get_cve_statistics
 from settings import BACKEND
 
 
@@ -179,14 +180,14 @@ def vulnerable_versions(arguments: Namespace) -> Dict[str, int]:
 
         total_with_guess += 1
 
-        most_recent = most_recent_version(versions)
-        if most_recent.vulnerable:
+        vulnerable = get_cve_statistics().vulnerable(versions)
+        if vulnerable[most_recent_version(versions)]:
             most_recent_vulnerable += 1
 
-        if all(version.vulnerable for version in versions):
+        if all(vulnerable.values()):
             all_vulnerable += 1
 
-        if any(version.vulnerable for version in versions):
+        if any(vulnerable.values()):
             any_vulnerable += 1
 
     return {
@@ -231,14 +232,14 @@ def vulnerable_versions_by_package(arguments: Namespace) -> Dict[str, Dict[str,
                 guess['software_version']['name'])
         }
 
-        most_recent = most_recent_version(versions)
-        if most_recent.vulnerable:
+        vulnerable = get_cve_statistics().vulnerable(versions)
+        if vulnerable[most_recent_version(versions)]:
             agg[package]['most_recent_vulnerable'] += 1
 
-        if all(version.vulnerable for version in versions):
+        if all(vulnerable.values()):
             agg[package]['all_vulnerable'] += 1
 
-        if any(version.vulnerable for version in versions):
+        if any(vulnerable.values()):
             agg[package]['any_vulnerable'] += 1
 
     return dict(agg)
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+from contextlib import closing
+from typing import Optional, Union
+
+from base.cache import MISSING
+from settings import CHECKSUM_CACHE_FILE
+
+
+class ChecksumCache:
+    """
+    A persistent cache of the checksums of static files.
+
+    The checksums are keyed by a key identifying the raw content of a
+    file (see Provider.get_file_key) and the file name, as the file
+    name determines the file type and thereby the normalization. A
+    checksum of None denotes a file which is not a static file of any
+    type.
+
+    VERSION has to be increased whenever the normalization of any file
+    type changes, which invalidates all cached checksums.
+    """
+    VERSION = 1
+    flush_size = 10000
+
+    # path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pending = {}
+        self._pid = os.getpid()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._migrate()
+
+    def __del__(self):
+        # the connection must not be used by forked processes
+        if hasattr(self, '_connection') and self._pid == os.getpid():
+            self.flush()
+            self._connection.close()
+
+    def flush(self):
+        """Persist the pending checksums."""
+        if not self._pending:
+            return
+        with closing(self._connection.cursor()) as cursor:
+            cursor.execute('BEGIN')
+            cursor.executemany('''
+            INSERT OR REPLACE
+            INTO checksum (
+                file_key,
+                file_name,
+                checksum)
+            VALUES (?, ?, ?)
+            ''', (
+                (file_key, file_name, checksum)
+                for (file_key, file_name), checksum in self._pending.items()))
+            cursor.execute('COMMIT')
+        self._pending.clear()
+
+    def get(self, file_key: str, file_name: str) -> Union[bytes, None, object]:
+        """
+        Get the checksum of a file.
+
+        MISSING is returned if the file is not cached.
+        """
+        pending = self._pending.get((file_key, file_name), MISSING)
+        if pending is not MISSING:
+            return pending
+        with closing(self._connection.cursor()) as cursor:
+            cursor.execute('''
+            SELECT
+                checksum
+            FROM checksum
+            WHERE
+                file_key = ? AND
+                file_name = ?
+            ''', (file_key, file_name))
+            row = cursor.fetchone()
+        if row is None:
+            return MISSING
+        return row[0]
+
+    def put(self, file_key: str, file_name: str, checksum: Optional[bytes]):
+        """Store the checksum of a file."""
+        self._pending[file_key, file_name] = checksum
+        if len(self._pending) >= self.flush_size:
+            self.flush()
+
+    def _migrate(self):
+        with closing(self._connection.cursor()) as cursor:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS checksum (
+                file_key TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                checksum BINARY,
+                PRIMARY KEY(file_key, file_name)
+            )
+            ''')
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] != self.VERSION:
+                cursor.execute('DELETE FROM checksum')
+                cursor.execute('PRAGMA user_version = {:d}'.format(self.VERSION))
+
+
+# caches by process id, inherited caches of parent processes are kept
+# untouched as their connections must not be used by forked processes
+_caches = {}
+
+
+def get_checksum_cache() -> Optional[ChecksumCache]:
+    """
+    Get the checksum cache of the current process. None is returned if
+    the cache is disabled.
+    """
+    if CHECKSUM_CACHE_FILE is None:
+        return None
+    pid = os.getpid()
+    if pid not in _caches:
+        _caches[pid] = ChecksumCache(CHECKSUM_CACHE_FILE)
+    return _caches[pid]
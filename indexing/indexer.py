@@ -1,24 +1,53 @@
 import logging
 import os
-from concurrent.futures import ProcessPoolExecutor
-from copy import deepcopy
-from typing import Iterable, List, Set, Union
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    # the progress line is optional
+    tqdm = None
 
 from backends.model import Model
+from backends.software_package import SoftwarePackage
 from backends.software_version import SoftwareVersion
 from backends.static_file import StaticFile
+from base.cache import MISSING
+from base.checksum import calculate_checksum
 from base.utils import join_paths
 from definitions import definitions
 from definitions.definition import SoftwareDefinition
 from files import file_types_for_index
-from providers.provider import Provider
+from indexing.checksum_cache import get_checksum_cache
+from indexing.metrics import Metrics, merge_metrics
+from indexing.writer import IndexWriter, connect_writer, pop_store_metrics, write_result
 from settings import BACKEND
 
 
 class Indexer:
     """
     This class handles the indexing process.
+
+    In incremental mode, the missing versions are indexed in the order of
+    their release dates. If the provider can determine the files changed
+    from the most recent indexed version, only those are indexed and the
+    static file uses of all other files are copied.
+
+    The metrics of the indexing are collected by software package names
+    within metrics. A progress line is shown if progress is enabled and
+    tqdm is available.
     """
+    incremental = False
+    progress = False
+
+    # metrics: Dict[str, Metrics]
+    # elapsed: float
+
+    def __init__(self):
+        self.metrics = {}
+        self.elapsed = 0.0
 
     def gc_all(self):
         """Garbage collect all definitions."""
@@ -58,27 +87,75 @@ class Indexer:
 
     def index_all(self, max_workers: int = 16,
             limit_definitions: Union[None, List[str]] = None):
-        """Index for all definitions."""
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            futures = set()
-            tasks = []
-            for definition in definitions:
-                if limit_definitions is not None and definition not in limit_definitions:
-                    # this definition is to be skipped
-                    continue
-                # Ensure that software package is in the database
-                self._store_to_backend(definition.software_package)
-                indexed_versions = BACKEND.retrieve_versions(
-                    definition.software_package)
-
-                worker = deepcopy(self)
-                tasks.append((worker.index_definition, definition, indexed_versions))
-            for task in tasks:
-                futures.add(
-                    executor.submit(*task))
-            for future in futures:
-                # await all the futures
-                future.result()
+        """
+        Index for all definitions.
+
+        The missing versions of all definitions are split into work units
+        which are balanced across the worker processes. The results of
+        the workers are stored by a single writer process.
+        """
+        start = perf_counter()
+        changed_packages = []
+        writer = IndexWriter(max_pending=4 * max_workers)
+        writer.start()
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=max_workers, initializer=connect_writer,
+                    initargs=(writer.queue, writer.failed)) as executor:
+                futures = []
+                for definition in definitions:
+                    if limit_definitions is not None and definition not in limit_definitions:
+                        # this definition is to be skipped
+                        continue
+                    # Ensure that software package is in the database
+                    self._store_to_backend(definition.software_package)
+                    indexed_versions = BACKEND.retrieve_versions(
+                        definition.software_package)
+                    futures.append((
+                        definition, indexed_versions,
+                        executor.submit(
+                            self._get_missing_versions_with_metrics,
+                            definition, indexed_versions)))
+
+                units = []
+                for definition, indexed_versions, future in futures:
+                    missing_versions, metrics = future.result()
+                    merge_metrics(self.metrics, metrics)
+                    self._store_to_backend(list(missing_versions))
+                    if missing_versions:
+                        changed_packages.append(definition.software_package)
+                    units.append(self._get_work_units(
+                        definition, indexed_versions, missing_versions))
+
+                self._run_work_units(
+                    executor, self._schedule_work_units(units), max_workers,
+                    writer)
+        finally:
+            writer.stop()
+            merge_metrics(self.metrics, writer.metrics)
+            self.elapsed += perf_counter() - start
+        if writer.failed.is_set():
+            raise IndexerException('writing indexing results failed')
+
+        start = perf_counter()
+        for software_package in changed_packages:
+            self._update_path_entropy(software_package)
+        self.elapsed += perf_counter() - start
+
+    def get_missing_versions(
+            self, definition: SoftwareDefinition,
+            indexed_versions: Set[SoftwareVersion]) -> Set[SoftwareVersion]:
+        """Get the versions available through provider not yet indexed."""
+        logging.info('handling software package %s', definition.software_package)
+
+        with definition.provider.metrics.time('get_versions'):
+            missing_versions = definition.provider.get_versions() - indexed_versions
+
+        logging.info(
+            '%d versions not yet indexed for %s',
+            len(missing_versions),
+            str(definition.software_package))
+        return missing_versions
 
     def index_definition(
             self, definition: SoftwareDefinition,
@@ -89,46 +166,227 @@ class Indexer:
         """
         BACKEND.reopen_connection()
 
+        start = perf_counter()
+        missing_versions = self.get_missing_versions(definition, indexed_versions)
+        self._store_to_backend(list(missing_versions))
+
         changed = False
+        for unit in self._get_work_units(
+                definition, indexed_versions, missing_versions):
+            merge_metrics(self.metrics, self.index_work_unit(*unit))
+            changed = True
+        merge_metrics(self.metrics, self._pop_metrics(definition))
+        merge_metrics(self.metrics, pop_store_metrics())
+        if changed:
+            self._update_path_entropy(definition.software_package)
+        self.elapsed += perf_counter() - start
+        return changed
 
-        logging.info('handling software package %s', definition.software_package)
+    def metrics_summary(self) -> dict:
+        """
+        Summarize the metrics of all software packages, including the
+        throughput relative to the elapsed time.
+        """
+        total = Metrics()
+        for metrics in self.metrics.values():
+            total.merge(metrics)
+        summary = {
+            'elapsed': self.elapsed,
+            'total': total.serialize(),
+            'software_packages': {
+                name: metrics.serialize()
+                for name, metrics in sorted(self.metrics.items())
+            },
+        }
+        if self.elapsed:
+            summary['total']['rates'] = {
+                'files_per_second': total.counters['files'] / self.elapsed,
+                'bytes_read_per_second':
+                    total.counters['bytes_read'] / self.elapsed,
+                'stored_static_files_per_second':
+                    total.counters['stored_static_files'] / self.elapsed,
+            }
+        return summary
 
-        available_versions = definition.provider.get_versions()
+    def index_work_unit(
+            self, definition: SoftwareDefinition,
+            versions: List[SoftwareVersion],
+            indexed_versions: Set[SoftwareVersion]) -> Dict[str, Metrics]:
+        """
+        Index the versions of a work unit in order.
 
-        missing_versions = available_versions - indexed_versions
-        self._store_to_backend(list(missing_versions))
+        The results are written through the writer process if this is a
+        worker process. Returns the metrics of the work unit.
+        """
+        indexed_versions = set(indexed_versions)
+        for version in versions:
+            base_version = None
+            diff = None
+            if self.incremental and definition.provider.can_diff:
+                base_version = self._get_base_version(version, indexed_versions)
+            if base_version is not None:
+                diff = definition.provider.diff_files(base_version, version)
+            if diff is not None:
+                base_paths, paths = diff
+                logging.info(
+                    'indexing %d changed files relative to %s',
+                    len(paths), str(base_version))
+                static_files = self.index_version(definition, version, paths)
+                copy_from = base_version, base_paths | paths
+            else:
+                static_files = self.index_version(definition, version)
+                copy_from = None
 
-        logging.info(
-            '%d versions not yet indexed for %s',
-            len(missing_versions),
-            str(definition.software_package))
-        for version in missing_versions:
-            static_files = self.index_version(definition, version)
-            logging.info('indexing %d static files', len(static_files))
-            changed = True
-            self._store_to_backend(static_files)
+            checksum_cache = get_checksum_cache()
+            if checksum_cache is not None:
+                checksum_cache.flush()
+            write_result(version, static_files, copy_from)
+            indexed_versions.add(version)
+        return self._pop_metrics(definition)
 
-            self._mark_version_indexed(version)
-            logging.info('indexed %d static files', len(static_files))
+    def _update_path_entropy(self, software_package: SoftwarePackage):
+        """Precompute the path entropy of a software package."""
+        logging.info('updating path entropy of %s', str(software_package))
+        metrics = self.metrics.setdefault(software_package.name, Metrics())
+        with metrics.time('path_entropy'):
+            BACKEND.update_path_entropy(software_package)
 
-        return changed
+    def _get_missing_versions_with_metrics(
+            self, definition: SoftwareDefinition,
+            indexed_versions: Set[SoftwareVersion]
+    ) -> Tuple[Set[SoftwareVersion], Dict[str, Metrics]]:
+        missing_versions = self.get_missing_versions(definition, indexed_versions)
+        return missing_versions, self._pop_metrics(definition)
+
+    @staticmethod
+    def _pop_metrics(definition: SoftwareDefinition) -> Dict[str, Metrics]:
+        """Get the metrics collected by the provider of definition."""
+        return {
+            definition.software_package.name: definition.provider.metrics.pop(),
+        }
+
+    def _get_work_units(
+            self, definition: SoftwareDefinition,
+            indexed_versions: Set[SoftwareVersion],
+            missing_versions: Set[SoftwareVersion]) -> List[tuple]:
+        """
+        Split the missing versions of definition into work units.
+
+        Every version is a work unit of its own, unless versions are
+        indexed incrementally by a provider able to diff them, as these
+        depend on the preceding versions.
+        """
+        if not missing_versions:
+            return []
+        if self.incremental and definition.provider.can_diff:
+            return [(
+                definition,
+                sorted(missing_versions, key=self._release_order),
+                indexed_versions)]
+        return [
+            (definition, [version], set())
+            for version in missing_versions
+        ]
+
+    @staticmethod
+    def _schedule_work_units(units: List[List[tuple]]) -> List[tuple]:
+        """
+        Order the work units of all definitions for balancing.
+
+        The largest work units are scheduled first, the other ones
+        alternate between the definitions, so that the versions of a
+        single large definition are indexed in parallel.
+        """
+        units = [list(definition_units) for definition_units in units]
+        schedule = sorted(
+            (unit for definition_units in units for unit in definition_units
+             if len(unit[1]) > 1),
+            key=lambda unit: len(unit[1]), reverse=True)
+        singles = [
+            [unit for unit in definition_units if len(unit[1]) <= 1]
+            for definition_units in units
+        ]
+        for index in range(max((len(single) for single in singles), default=0)):
+            schedule.extend(
+                single[index] for single in singles if index < len(single))
+        return schedule
+
+    def _run_work_units(
+            self, executor: ProcessPoolExecutor, units: List[tuple],
+            max_workers: int, writer: IndexWriter):
+        """
+        Index the work units using executor.
+
+        No further work units are submitted once the writer failed,
+        which is checked periodically as its process might have ended.
+        """
+        progress = None
+        if self.progress and tqdm is not None:
+            progress = tqdm(
+                total=sum(len(unit[1]) for unit in units),
+                unit='version', desc='indexing')
+        start = perf_counter()
+        files = 0
+        units = iter(units)
+        pending = {}
+        try:
+            while True:
+                if not writer.is_failed():
+                    for unit in units:
+                        pending[executor.submit(self.index_work_unit, *unit)] = unit
+                        if len(pending) >= 2 * max_workers:
+                            break
+                if not pending:
+                    return
+                done, _ = wait(
+                    pending, timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = pending.pop(future)
+                    metrics = future.result()
+                    merge_metrics(self.metrics, metrics)
+                    if progress is not None:
+                        files += sum(
+                            unit_metrics.counters['files']
+                            for unit_metrics in metrics.values())
+                        progress.update(len(unit[1]))
+                        progress.set_postfix(
+                            package=unit[0].software_package.name,
+                            files='{:.0f}/s'.format(
+                                files / (perf_counter() - start)))
+        finally:
+            if progress is not None:
+                progress.close()
 
     def index_version(
             self, definition: SoftwareDefinition,
-            version: SoftwareVersion) -> List[StaticFile]:
-        """Index a missing version."""
-        file_paths = definition.provider.list_files(version)
+            version: SoftwareVersion,
+            file_paths: Optional[Iterable[str]] = None) -> List[StaticFile]:
+        """
+        Index a missing version.
 
-        # Generate list of static files
+        Only the files at file_paths are indexed if specified.
+        """
+        metrics = definition.provider.metrics
+        metrics.count('versions')
+
+        # Generate list of static files, every file is handled as it is
+        # yielded as providers may read their files as a stream
         static_files = []
-        for webroot_path, src_path in definition.path_map.items():
-            static_files.extend(
-                self.iterate_static_file_paths(
-                    definition.provider,
-                    version,
-                    file_paths,
-                    webroot_path,
-                    src_path))
+        files = definition.provider.iterate_files(version, file_paths)
+        while True:
+            with metrics.time('list'):
+                file = next(files, None)
+            if file is None:
+                break
+            metrics.count('files')
+            for webroot_path, src_path in definition.path_map.items():
+                static_files.extend(
+                    self.iterate_static_file_paths(
+                        version,
+                        [file],
+                        webroot_path,
+                        src_path,
+                        metrics))
         return [
             static_file
             for static_file in static_files
@@ -138,13 +396,19 @@ class Indexer:
 
     @staticmethod
     def iterate_static_file_paths(
-            provider: Provider, version: SoftwareVersion,
-            file_paths: list, webroot_path: str, src_path: str
-    ) -> Iterable[StaticFile]:
+            version: SoftwareVersion,
+            files: List[Tuple[str, Optional[str], Callable[[], bytes]]],
+            webroot_path: str, src_path: str,
+            metrics: Optional[Metrics] = None) -> Iterable[StaticFile]:
         """
         Add all static files underneath src_path and resolve their
         webroot path.
+
+        files contains the files of version as yielded by
+        Provider.iterate_files.
         """
+        if metrics is None:
+            metrics = Metrics()
         if src_path.startswith('/'):
             # remove leading slash
             src_path = src_path[1:]
@@ -152,50 +416,100 @@ class Indexer:
             # remove leading slash
             webroot_path = webroot_path[1:]
 
-        for full_path in file_paths:
+        checksum_cache = get_checksum_cache()
+        for full_path, file_key, read in files:
             if not full_path.startswith(src_path):
                 # file path is not relevant
                 continue
-            raw_content = provider.get_file_data(version, full_path)
             path = full_path.replace(src_path, '', 1)
+            file_name = os.path.basename(path)
 
-            file = None
-            for file_type in file_types_for_index:
-                try:
-                    file = file_type(os.path.basename(path), raw_content)
-                except ValueError:
-                    continue
-            if file is None:
+            # unchanged files do not need to be read and normalized again
+            checksum = MISSING
+            if checksum_cache is not None and file_key is not None:
+                with metrics.time('cache'):
+                    checksum = checksum_cache.get(file_key, file_name)
+            if checksum is MISSING:
+                with metrics.time('read'):
+                    raw_content = read()
+                metrics.count('bytes_read', len(raw_content))
+                checksum = Indexer.calculate_checksum(
+                    file_name, raw_content, metrics)
+                if checksum_cache is not None and file_key is not None:
+                    checksum_cache.put(file_key, file_name, checksum)
+            else:
+                metrics.count('cached_checksums')
+            if checksum is None:
                 # Not a file of any matching type.
                 continue
 
+            metrics.count('static_files')
+
             yield StaticFile(
                 software_version=version,
                 src_path=full_path,
                 webroot_path=join_paths(
                     webroot_path,
                     path),
-                checksum=file.checksum)
+                checksum=checksum)
 
     @staticmethod
-    def _delete_from_backend(obj: Model):
-        """Store an object to the database."""
-        # TODO: re-implement fallback for backends not capable of multi-threading
-        #       (i.e., using mark_indexed as hook or similar)
+    def calculate_checksum(
+            file_name: str, raw_content: bytes,
+            metrics: Optional[Metrics] = None) -> Optional[bytes]:
+        """
+        Calculate the checksum of a static file. None is returned if it is
+        not a file of any matching type.
+        """
+        if metrics is None:
+            metrics = Metrics()
+        file = None
+        with metrics.time('detect'):
+            for file_type in file_types_for_index:
+                try:
+                    file = file_type(file_name, raw_content)
+                except ValueError:
+                    continue
+        if file is None:
+            return None
+        with metrics.time('normalize'):
+            normalized_content = file.normalized_content
+        with metrics.time('checksum'):
+            return calculate_checksum(normalized_content)
+
+    def _get_base_version(
+            self, version: SoftwareVersion,
+            indexed_versions: Set[SoftwareVersion]) -> Optional[SoftwareVersion]:
+        """Get the most recent indexed version released before version."""
+        release_order = self._release_order(version)
+        preceding = [
+            indexed_version
+            for indexed_version in indexed_versions
+            if self._release_order(indexed_version) <= release_order
+        ]
+        if not preceding:
+            return None
+        return max(preceding, key=self._release_order)
+
+    @staticmethod
+    def _release_order(version: SoftwareVersion) -> float:
+        """Get a sort key ordering versions by their release dates."""
+        try:
+            return version.release_date.timestamp()
+        except (AttributeError, OverflowError, ValueError):
+            # release date unknown
+            return float('-inf')
 
+    @staticmethod
+    def _delete_from_backend(obj: Model):
+        """Delete an object from the database."""
         BACKEND.delete(obj)
 
     @staticmethod
     def _store_to_backend(obj: Union[Model, List[Model]]):
         """Store an object to the database."""
-        # TODO: re-implement fallback for backends not capable of multi-threading
-        #       (i.e., using mark_indexed as hook or similar)
-
         BACKEND.store(obj)
 
-    @staticmethod
-    def _mark_version_indexed(version: SoftwareVersion):
-        """Store an object to the database."""
-        # TODO: re-implement fallback for backends not capable of multi-threading
 
-        BACKEND.mark_indexed(version)
+class IndexerException(Exception):
+    """An indexer exception."""
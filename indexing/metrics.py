@@ -0,0 +1,63 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict
+
+
+class Metrics:
+    """
+    Timers and counters of the phases of the indexing.
+
+    The timers accumulate the seconds spent within every phase, the
+    counters accumulate arbitrary amounts (e.g., files or bytes).
+    """
+    # timers: Dict[str, float]
+    # counters: Dict[str, int]
+
+    def __init__(self):
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+
+    def __repr__(self) -> str:
+        return '<Metrics {}>'.format(self.serialize())
+
+    @contextmanager
+    def time(self, phase: str):
+        """Add the time spent within the context to the timer of phase."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[phase] += perf_counter() - start
+
+    def count(self, counter: str, amount: int = 1):
+        """Increase a counter."""
+        self.counters[counter] += amount
+
+    def merge(self, other: 'Metrics'):
+        """Add the timers and counters of other."""
+        for phase, seconds in other.timers.items():
+            self.timers[phase] += seconds
+        for counter, amount in other.counters.items():
+            self.counters[counter] += amount
+
+    def pop(self) -> 'Metrics':
+        """Get the current metrics and reset them."""
+        metrics = Metrics()
+        metrics.merge(self)
+        self.timers.clear()
+        self.counters.clear()
+        return metrics
+
+    def serialize(self) -> dict:
+        return {
+            'timers': dict(sorted(self.timers.items())),
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+
+def merge_metrics(
+        target: Dict[str, Metrics], source: Dict[str, Metrics]):
+    """Merge metrics keyed by software package names."""
+    for name, metrics in source.items():
+        target.setdefault(name, Metrics()).merge(metrics)
@@ -0,0 +1,211 @@
+import logging
+from multiprocessing import Event, Process, Queue
+from queue import Empty, Full
+from typing import Dict, List, Optional, Set, Tuple
+
+from backends.software_version import SoftwareVersion
+from backends.static_file import StaticFile
+from indexing.metrics import Metrics
+from settings import BACKEND
+
+
+# the maximum number of static files per message and per transaction
+BATCH_SIZE = 10000
+TRANSACTION_SIZE = 100000
+
+# the queue and failure event of the writer process in worker processes
+_queue = None
+_failed = None
+
+# the metrics of storing by software package names
+_metrics = {}
+
+
+class IndexWriter:
+    """
+    A dedicated process storing the results of the indexing workers.
+
+    The workers push batches of static files and indexed versions onto
+    the queue of the writer, which applies them within large
+    transactions. If applying fails, the writer keeps consuming the
+    queue (discarding all messages) so that no worker is blocked. If the
+    writer process ends unexpectedly, the workers discard their results
+    once the failure is noticed (see is_failed).
+
+    The metrics of storing are available once the writer is stopped.
+    """
+    # queue: Queue
+    # failed: Event
+    # metrics: Dict[str, Metrics]
+
+    def __init__(self, max_pending: int = 64):
+        self.queue = Queue(maxsize=max_pending)
+        self.failed = Event()
+        self.metrics = {}
+        self._results = Queue()
+        self._process = Process(
+            target=self._run, args=(self.queue, self.failed, self._results),
+            daemon=True)
+
+    def start(self):
+        """Start the writer process."""
+        self._process.start()
+
+    def is_failed(self) -> bool:
+        """
+        Check whether the writer failed, which includes its process having
+        ended before it was stopped.
+        """
+        if not self.failed.is_set() and not self._process.is_alive():
+            self.failed.set()
+        return self.failed.is_set()
+
+    def stop(self):
+        """Wait for the writer process to apply all pending messages."""
+        while True:
+            try:
+                self.queue.put(None, timeout=1)
+                break
+            except Full:
+                if not self._process.is_alive():
+                    break
+        while True:
+            # the metrics have to be received before joining the process
+            try:
+                self.metrics = self._results.get(timeout=1)
+                break
+            except Empty:
+                if not self._process.is_alive():
+                    break
+        self._process.join()
+        if self._process.exitcode:
+            self.failed.set()
+
+    @staticmethod
+    def _run(queue: Queue, failed: Event, results: Queue):
+        running = True
+        try:
+            BACKEND.reopen_connection()
+            while running:
+                messages = [queue.get()]
+                size = _message_size(messages[0])
+                while messages[-1] is not None and size < TRANSACTION_SIZE:
+                    try:
+                        messages.append(queue.get_nowait())
+                    except Empty:
+                        break
+                    size += _message_size(messages[-1])
+                if messages[-1] is None:
+                    running = False
+                    messages.pop()
+                if failed.is_set():
+                    continue
+                try:
+                    with BACKEND.transaction():
+                        for message in messages:
+                            _apply(*message)
+                except Exception:
+                    logging.exception('writing indexing results failed')
+                    failed.set()
+            results.put(pop_store_metrics())
+        finally:
+            # the writer stops consuming the queue before being stopped
+            # only if something (e.g., unpickling a message) went wrong
+            if running:
+                logging.error('the writer process ended unexpectedly')
+                failed.set()
+
+
+def connect_writer(queue: Queue, failed: Event):
+    """Connect a worker process to the queue of a writer process."""
+    global _queue, _failed
+    _queue = queue
+    _failed = failed
+
+
+def write_result(
+        version: SoftwareVersion, static_files: List[StaticFile],
+        copy_from: Optional[Tuple[SoftwareVersion, Set[str]]] = None):
+    """
+    Write the static files of version and mark it as indexed afterwards.
+
+    The result is written through the writer process if connected, or
+    directly otherwise. It is discarded if the writer failed.
+    """
+    if _queue is None:
+        store_result(version, static_files, copy_from)
+        return
+    for start in range(0, len(static_files), BATCH_SIZE):
+        if not _put(('store', static_files[start:start + BATCH_SIZE])):
+            return
+    _put(('indexed', version, len(static_files), copy_from))
+
+
+def _put(message: tuple) -> bool:
+    # the writer might not consume the queue anymore if it failed
+    while not _failed.is_set():
+        try:
+            _queue.put(message, timeout=1)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def store_result(
+        version: SoftwareVersion, static_files: List[StaticFile],
+        copy_from: Optional[Tuple[SoftwareVersion, Set[str]]] = None):
+    """Store the static files of version and mark it as indexed."""
+    logging.info('indexing %d static files', len(static_files))
+    _store(static_files)
+    _mark_indexed(version, len(static_files), copy_from)
+
+
+def _store(static_files: List[StaticFile]):
+    if not static_files:
+        return
+    metrics = _get_metrics(static_files[0].software_version)
+    with metrics.time('store'):
+        BACKEND.store(static_files)
+    metrics.count('stored_static_files', len(static_files))
+
+
+def pop_store_metrics() -> Dict[str, Metrics]:
+    """Get the metrics of storing of this process and reset them."""
+    metrics = dict(_metrics)
+    _metrics.clear()
+    return metrics
+
+
+def _get_metrics(version: SoftwareVersion) -> Metrics:
+    return _metrics.setdefault(version.software_package.name, Metrics())
+
+
+def _apply(kind: str, *args):
+    if kind == 'store':
+        static_files, = args
+        _store(static_files)
+    elif kind == 'indexed':
+        _mark_indexed(*args)
+
+
+def _mark_indexed(
+        version: SoftwareVersion, static_file_count: int,
+        copy_from: Optional[Tuple[SoftwareVersion, Set[str]]]):
+    metrics = _get_metrics(version)
+    with metrics.time('store'):
+        if copy_from is not None:
+            base_version, exclude_src_paths = copy_from
+            copied = BACKEND.copy_static_file_uses(
+                base_version, version, exclude_src_paths)
+            metrics.count('copied_static_file_uses', copied)
+            logging.info('copied %d unchanged static files', copied)
+        BACKEND.mark_indexed(version)
+    metrics.count('indexed_versions')
+    logging.info('indexed %d static files', static_file_count)
+
+
+def _message_size(message: Optional[tuple]) -> int:
+    if message is not None and message[0] == 'store':
+        return len(message[1])
+    return 1
@@ -1,10 +1,11 @@
+import hashlib
+import json
 import os
-import re
+import shutil
 import tarfile
 from datetime import datetime
 from pathlib import Path
-from subprocess import check_call, check_output
-from typing import Callable, Set, Union
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Set, Tuple, Union
 
 import requests
 
@@ -12,23 +13,28 @@ from backends.software_package import SoftwarePackage
 from backends.software_version import SoftwareVersion
 from providers.provider import Provider
 
-PACKAGE_PATTERN = re.compile(
-    r'Package:\s*(?P<name>[\w-]+).*?Version:\s*(?P<version>.*?)\n.*?\s*Filename:\s*(?P<filename>.*?)\n',
-    re.DOTALL)
+AR_MAGIC = b'!<arch>\n'
+AR_HEADER_SIZE = 60
 
 
 class DebRepositoryProvider(Provider):
     """
     A provider for a DEB (debian) repository.
+
+    In streaming mode, the files of a version are read from the data
+    archive while the DEB file is downloaded instead of extracting it to
+    the cache directory first.
     """
 
     def __init__(self, software_package: SoftwarePackage,
                  repo_base_url: str, repo_packages_path: str, repo_package: str,
-                 version_name_derivator: Union[Callable[[str], str], None] = None):
+                 version_name_derivator: Union[Callable[[str], str], None] = None,
+                 streaming: bool = False):
         super().__init__(software_package, version_name_derivator)
         self.repo_base_url = repo_base_url
         self.repo_packages_path = repo_packages_path
         self.repo_package = repo_package
+        self.streaming = streaming
 
     def get_versions(self) -> Set[SoftwareVersion]:
         packages = self._read_packages()
@@ -43,6 +49,9 @@ class DebRepositoryProvider(Provider):
         }
 
     def list_files(self, version: SoftwareVersion):
+        if self.streaming:
+            return [path for path, _, _ in self.iterate_files(version)]
+
         self._download_deb_data(version)
         cache_data_dir = self._cache_data_dir_path(version)
 
@@ -60,21 +69,143 @@ class DebRepositoryProvider(Provider):
         with file_path.open('rb') as file:
             return file.read()
 
+    def get_file_key(self, version: SoftwareVersion, path: str) -> str:
+        """
+        Get a key of the extracted file at path from its size and mtime.
+
+        The mtimes are kept from the data archive when extracting it, so
+        that an unchanged file has the same key within all versions.
+        """
+        self._download_deb_data(version)
+
+        stat = (self._cache_data_dir_path(version) / path).stat()
+        return _file_key(path, stat.st_size, int(stat.st_mtime))
+
+    def iterate_files(
+            self, version: SoftwareVersion,
+            file_paths: Optional[Iterable[str]] = None
+    ) -> Iterator[Tuple[str, Optional[str], Callable[[], bytes]]]:
+        """
+        Iterate over the files available within version (or the files at
+        file_paths only if specified).
+
+        In streaming mode, the readers are only valid until the next file
+        is yielded, as the data archive is read as a stream.
+        """
+        if not self.streaming:
+            yield from super().iterate_files(version, file_paths)
+            return
+
+        if file_paths is not None:
+            file_paths = set(file_paths)
+        package = self._get_package(version)
+        with requests.get(self._deb_url(version), stream=True) as deb_stream:
+            deb_stream.raise_for_status()
+            deb_stream.raw.decode_content = True
+            deb_file = _HashingReader(deb_stream.raw)
+            found = False
+            for name, member in iterate_ar_members(deb_file):
+                if not name.startswith('data.tar'):
+                    continue
+                found = True
+                with tarfile.open(fileobj=member, mode='r|*') as data_file:
+                    for tar_member in data_file:
+                        if not tar_member.isfile():
+                            continue
+                        path = tar_member.name
+                        if path.startswith('./'):
+                            path = path[2:]
+                        if file_paths is not None and path not in file_paths:
+                            continue
+                        yield path, \
+                            _file_key(path, tar_member.size, tar_member.mtime), \
+                            _TarMemberReader(data_file, tar_member)
+            # the files are yielded before the DEB file is verified, but
+            # the version is not indexed as the iteration fails
+            self.metrics.count('bytes_downloaded', deb_file.size)
+            if not self._verify_digest(package, deb_file.size, deb_file.sha256):
+                raise DebException('DEB file of version {} is corrupt'.format(
+                    version.internal_identifier))
+        if not found:
+            raise DebException('data archive missing for version {}'.format(
+                version.internal_identifier))
+
     def _read_packages(self) -> dict:
-        if not hasattr(self, '_cached_packages'):
-            response = requests.get(self.repo_packages_url)
-            self._cached_packages = {}
-            for package in PACKAGE_PATTERN.finditer(response.text):
-                package = package.groupdict()
-                if package['name'] != self.repo_package:
+        """
+        Get the filename, size and SHA256 checksum of the DEB file of
+        every version of the package.
+
+        The parsed packages are cached on disk and only retrieved again if
+        the PACKAGES file has changed.
+        """
+        if hasattr(self, '_cached_packages'):
+            return self._cached_packages
+
+        cache_path = self._cache_packages_path()
+        cached = None
+        headers = {}
+        if cache_path.exists():
+            with cache_path.open() as cache_file:
+                cached = json.load(cache_file)
+            if cached.get('url') != self.repo_packages_url:
+                cached = None
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        with requests.get(self.repo_packages_url, headers=headers, stream=True) as response:
+            if cached is not None and response.status_code == 304:
+                self.metrics.count('packages_not_modified')
+                self._cached_packages = cached['packages']
+                return self._cached_packages
+            response.raise_for_status()
+            if response.encoding is None:
+                response.encoding = 'utf-8'
+            packages = {}
+            for stanza in iterate_package_stanzas(
+                    response.iter_lines(decode_unicode=True)):
+                if stanza.get('Package') != self.repo_package:
                     continue
-                self._cached_packages[package['version']] = package['filename']
-        return self._cached_packages
+                packages[stanza['Version']] = {
+                    'filename': stanza['Filename'],
+                    'size': int(stanza['Size']) if 'Size' in stanza else None,
+                    'sha256': stanza.get('SHA256'),
+                }
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        if etag or last_modified:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # replace atomically as the cache is shared by processes
+            temporary_path = cache_path.with_name(
+                '{}.{}'.format(cache_path.name, os.getpid()))
+            with temporary_path.open('w') as cache_file:
+                json.dump({
+                    'url': self.repo_packages_url,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'packages': packages,
+                }, cache_file)
+            os.replace(temporary_path.as_posix(), cache_path.as_posix())
+
+        self._cached_packages = packages
+        return packages
 
     @property
     def repo_packages_url(self):
         return os.path.join(self.repo_base_url + self.repo_packages_path)
 
+    def _get_package(self, version: SoftwareVersion) -> dict:
+        packages = self._read_packages()
+        package = packages.get(version.internal_identifier)
+        assert package, 'version %s not known in repo PACKAGES file' % version.internal_identifier
+        return package
+
+    def _deb_url(self, version: SoftwareVersion) -> str:
+        return self.repo_base_url + self._get_package(version)['filename']
+
     def _download_deb_data(self, version: SoftwareVersion):
         """
         Download version's DEB file and extract data.tar.* if it does not exist in cache.
@@ -84,42 +215,38 @@ class DebRepositoryProvider(Provider):
         """
         cache_deb_path = self._cache_deb_path(version)
         cache_data_path = self._cache_data_path(version)
-        cache_data_path_xz = self._cache_data_path(version)
         cache_data_dir_path = self._cache_data_dir_path(version)
 
         if cache_data_dir_path.exists():
             return
 
-        if not cache_deb_path.exists():
-            packages = self._read_packages()
-            deb_path = packages.get(version.internal_identifier)
-            assert deb_path, 'version %s not known in repo PACKAGES file' % version.internal_identifier
-            deb_url = self.repo_base_url + deb_path
+        package = self._get_package(version)
+        if not cache_deb_path.exists() or not self._verify_deb_file(
+                package, cache_deb_path):
             cache_deb_path.parent.mkdir(parents=True, exist_ok=True)
-            with cache_deb_path.open('wb') as deb_file, requests.get(deb_url, stream=True) as deb_stream:
+            with self.metrics.time('download'), cache_deb_path.open('wb') as deb_file, requests.get(self._deb_url(version), stream=True) as deb_stream:
                 deb_stream.raise_for_status()
                 for chunk in deb_stream.iter_content(chunk_size=10000):
                     deb_file.write(chunk)
+            self.metrics.count('bytes_downloaded', cache_deb_path.stat().st_size)
+            if not self._verify_deb_file(package, cache_deb_path):
+                cache_deb_path.unlink()
+                raise DebException('DEB file of version {} is corrupt'.format(
+                    version.internal_identifier))
 
-        if not cache_data_path.exists() and not cache_data_path_xz.exists():
-            data_file_name = 'data.tar.gz'
-            file_list = check_output((
-                'ar',
-                't',
-                cache_deb_path.as_posix()
-            )).decode().splitlines()
-            if 'data.tar.xz' in file_list:
-                cache_data_path = cache_data_path_xz
-                data_file_name = 'data.tar.xz'
-            with cache_data_path.open('wb') as data_file:
-                check_call((
-                    'ar',
-                    'p',
-                    cache_deb_path.as_posix(),
-                    data_file_name,
-                ), stdout=data_file)
-
-        with tarfile.open(cache_data_path) as data_file:
+        if not cache_data_path.exists():
+            # the compression of the data archive is detected by tarfile
+            with cache_deb_path.open('rb') as deb_file:
+                for name, member in iterate_ar_members(deb_file):
+                    if name.startswith('data.tar'):
+                        with cache_data_path.open('wb') as data_file:
+                            shutil.copyfileobj(member, data_file)
+                        break
+                else:
+                    raise DebException('data archive missing in {}'.format(
+                        cache_deb_path))
+
+        with self.metrics.time('extract'), tarfile.open(cache_data_path) as data_file:
             def is_within_directory(directory, target):
                 
                 abs_directory = os.path.abspath(directory)
@@ -145,6 +272,26 @@ class DebRepositoryProvider(Provider):
         cache_deb_path.unlink()
         cache_data_path.unlink()
 
+    def _verify_deb_file(self, package: dict, path: Path) -> bool:
+        """Verify the DEB file at path against its size and checksum."""
+        if package['size'] is not None and path.stat().st_size != package['size']:
+            return False
+        sha256 = hashlib.sha256()
+        with path.open('rb') as deb_file:
+            for chunk in iter(lambda: deb_file.read(1 << 16), b''):
+                sha256.update(chunk)
+        return self._verify_digest(package, path.stat().st_size, sha256)
+
+    @staticmethod
+    def _verify_digest(package: dict, size: int, sha256) -> bool:
+        """Verify size and checksum if they are known."""
+        if package['size'] is not None and size != package['size']:
+            return False
+        return package['sha256'] is None or sha256.hexdigest() == package['sha256']
+
+    def _cache_packages_path(self) -> Path:
+        return Path(self.cache_directory) / '.packages.json'
+
     def _cache_deb_path(self, version) -> Path:
         # TODO: remove unsafe characters from internal identifier
         return Path(self.cache_directory) / (version.internal_identifier + '.deb')
@@ -153,10 +300,119 @@ class DebRepositoryProvider(Provider):
         # TODO: remove unsafe characters from internal identifier
         return Path(self.cache_directory) / (version.internal_identifier + '.tar.gz')
 
-    def _cache_data_path_xz(self, version) -> Path:
-        # TODO: remove unsafe characters from internal identifier
-        return Path(self.cache_directory) / (version.internal_identifier + '.tar.xz')
-
     def _cache_data_dir_path(self, version) -> Path:
         # TODO: remove unsafe characters from internal identifier
         return Path(self.cache_directory) / version.internal_identifier
+
+
+class _ArMember:
+    """A file-like object reading the data of a member of an ar archive."""
+    def __init__(self, file: BinaryIO, size: int):
+        self._file = file
+        self.remaining = size
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._file.read(size)
+        if len(data) < size:
+            raise DebException('unexpected end of ar archive')
+        self.remaining -= len(data)
+        return data
+
+
+class _HashingReader:
+    """A file-like object calculating size and checksum of the data read."""
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self.size += len(data)
+        self.sha256.update(data)
+        return data
+
+
+class _TarMemberReader:
+    """Read the data of a member of a tar archive read as a stream once."""
+    def __init__(self, tar_file: tarfile.TarFile, member: tarfile.TarInfo):
+        self._tar_file = tar_file
+        self._member = member
+        self._data = None
+
+    def __call__(self) -> bytes:
+        if self._data is None:
+            self._data = self._tar_file.extractfile(self._member).read()
+        return self._data
+
+
+def _file_key(path: str, size: int, mtime: int) -> str:
+    """
+    Get the key of a file of a data archive (see Provider.get_file_key).
+
+    It is assumed that files with the same path, size and mtime have the
+    same content, as the data archives of different versions are not
+    related otherwise.
+    """
+    return 'deb:{}:{}:{}'.format(path, size, mtime)
+
+
+def iterate_package_stanzas(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Parse the stanzas of a PACKAGES file from its lines.
+
+    Continuation lines of multiline fields are joined.
+    """
+    stanza = {}
+    field = None
+    for line in lines:
+        if not line.strip():
+            if stanza:
+                yield stanza
+            stanza = {}
+            field = None
+            continue
+        if line[0] in ' \t':
+            if field is not None:
+                stanza[field] += '\n' + line.strip()
+            continue
+        field, _, value = line.partition(':')
+        field = field.strip()
+        stanza[field] = value.strip()
+    if stanza:
+        yield stanza
+
+
+def iterate_ar_members(file: BinaryIO) -> Iterator[Tuple[str, _ArMember]]:
+    """
+    Iterate over the members of an ar archive (as used for DEB files)
+    read from file sequentially.
+
+    Every member has to be read before advancing to the next one (or is
+    skipped otherwise).
+    """
+    if file.read(len(AR_MAGIC)) != AR_MAGIC:
+        raise DebException('not an ar archive')
+    while True:
+        header = file.read(AR_HEADER_SIZE)
+        if not header:
+            return
+        if len(header) < AR_HEADER_SIZE or header[58:60] != b'`\n':
+            raise DebException('invalid ar member header')
+        # GNU ar terminates names with a slash
+        name = header[:16].decode().rstrip(' ').rstrip('/')
+        size = int(header[48:58])
+        member = _ArMember(file, size)
+        yield name, member
+
+        # skip the unread data and the padding to an even offset
+        while member.remaining:
+            member.read(min(member.remaining, 1 << 16))
+        if size % 2:
+            file.read(1)
+
+
+class DebException(Exception):
+    """A DEB repository exception."""
@@ -1,22 +1,37 @@
 import os
 import re
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from subprocess import call
-from typing import Callable, Pattern, Set, Union
+from typing import Callable, Iterable, Iterator, Optional, Pattern, Set, Tuple, Union
 
-from pygit2 import Commit, GIT_FETCH_PRUNE, Index, Tag, clone_repository
+from pygit2 import Commit, Tag, clone_repository
 from pygit2.repository import Repository
 
+try:
+    from pygit2 import GIT_FETCH_PRUNE
+except ImportError:
+    # newer pygit2 versions only provide the enum
+    from pygit2.enums import FetchPrune
+    GIT_FETCH_PRUNE = FetchPrune.PRUNE
+
 from backends.software_package import SoftwarePackage
 from backends.software_version import SoftwareVersion
 from providers.provider import Provider
 
 
+# the file modes of subtree and submodule entries within trees
+GIT_FILEMODE_TREE = 0o040000
+GIT_FILEMODE_COMMIT = 0o160000
+
+
 class GenericGitProvider(Provider):
     """
     This is a generic Git provider. It handles the repository retrieval.
     Version detection is handled in its subclasses.
     """
+    can_diff = True
+
     def __init__(
             self, software_package: SoftwarePackage, url: str,
             version_name_derivator: Union[Callable[[str], str], None] = None):
@@ -29,31 +44,94 @@ class GenericGitProvider(Provider):
     def __repr__(self) -> str:
         return "<{} '{}'>".format(str(self.__class__.__name__), str(self))
 
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # repository handles can not be shared with other processes
+        state.pop('_repository', None)
+        state.pop('_repository_pid', None)
+        return state
+
     def list_files(self, version: SoftwareVersion):
         """List all files available within version."""
-        commit = self._get_commit(version)
-        index = Index()
-        index.read_tree(commit.tree)
-        return [
-            entry.path
-            for entry in index
-            if entry.oid in self.repository
-        ]
+        return [path for path, _, _ in self.iterate_files(version)]
 
     def get_file_data(self, version: SoftwareVersion, path: str):
         """Get data of file at path as contained within version.."""
         commit = self._get_commit(version)
-        file_blob = self.repository.revparse_single('{}:{}'.format(
-            commit.hex,
-            path))
-        return file_blob.data
+        return self._read_blob(commit.tree[path].id)
+
+    def iterate_files(
+            self, version: SoftwareVersion,
+            file_paths: Optional[Iterable[str]] = None
+    ) -> Iterator[Tuple[str, str, Callable[[], bytes]]]:
+        """
+        Iterate over the files available within version (or the files at
+        file_paths only if specified) by walking its tree once.
+
+        Yields the path of every file, its key (see get_file_key) and a
+        callable reading its data. Submodules are skipped.
+        """
+        repository = self.repository
+        directories = None
+        if file_paths is not None:
+            file_paths = set(file_paths)
+            # only the trees containing any of the paths need to be walked
+            directories = {
+                path[:index + 1]
+                for path in file_paths
+                for index, char in enumerate(path)
+                if char == '/'
+            }
+        trees = [('', self._get_commit(version).tree)]
+        while trees:
+            prefix, tree = trees.pop()
+            self.metrics.count('trees')
+            for entry in tree:
+                path = prefix + entry.name
+                if entry.filemode == GIT_FILEMODE_TREE:
+                    if directories is None or path + '/' in directories:
+                        trees.append((path + '/', repository[entry.id]))
+                    continue
+                if entry.filemode == GIT_FILEMODE_COMMIT:
+                    continue
+                if file_paths is not None and path not in file_paths:
+                    continue
+                yield (
+                    path,
+                    'git:{}'.format(entry.id),
+                    partial(self._read_blob, entry.id))
+
+    def diff_files(
+            self, base_version: SoftwareVersion,
+            version: SoftwareVersion) -> Tuple[Set[str], Set[str]]:
+        """
+        Get the files changed from base_version to version using a
+        diff of their trees.
+        """
+        diff = self.repository.diff(
+            self._get_commit(base_version).tree,
+            self._get_commit(version).tree)
+        base_paths = set()
+        paths = set()
+        for delta in diff.deltas:
+            base_paths.add(delta.old_file.path)
+            if delta.new_file.mode not in (0, GIT_FILEMODE_COMMIT):
+                # neither deleted nor a submodule
+                paths.add(delta.new_file.path)
+        return base_paths, paths
+
+    def get_file_key(self, version: SoftwareVersion, path: str) -> str:
+        """Get the blob id of the file at path as contained within version."""
+        commit = self._get_commit(version)
+        return 'git:{}'.format(commit.tree[path].id)
 
     @property
-    def repository(self):
-        if hasattr(self, '_repository'):
-            return self._repository
-
-        return Repository(self.cache_directory)
+    def repository(self) -> Repository:
+        """The repository handle, which is cached per process."""
+        if getattr(self, '_repository_pid', None) != os.getpid():
+            self._repository = Repository(self.cache_directory)
+            self._repository_pid = os.getpid()
+        return self._repository
 
     def _check_cache_directory(self) -> bool:
         """Check whether a valid clone of the provided Git repository."""
@@ -68,6 +146,9 @@ class GenericGitProvider(Provider):
     def _get_commit(self, version: SoftwareVersion) -> Commit:
         return self.repository[version.internal_identifier]
 
+    def _read_blob(self, oid) -> bytes:
+        return self.repository[oid].data
+
     def _init_repository(self):
         if self._check_cache_directory():
             # Nothing to initialize
@@ -79,6 +160,7 @@ class GenericGitProvider(Provider):
             os.path.dirname(self.cache_directory),
             exist_ok=True)
         self._repository = clone_repository(self.url, self.cache_directory, bare=True)
+        self._repository_pid = os.getpid()
 
     def _refresh_repository(self):
         if not self._check_cache_directory():
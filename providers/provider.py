@@ -1,9 +1,11 @@
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
-from typing import Callable, Set, Union
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple, Union
 
 from backends.software_package import SoftwarePackage
 from backends.software_version import SoftwareVersion
+from indexing.metrics import Metrics
 
 
 class Provider(metaclass=ABCMeta):
@@ -11,8 +13,15 @@ class Provider(metaclass=ABCMeta):
     The abstract base class for any provider.
 
     A provider exposes functionality to retrieve code and versions.
+
+    The metrics of the indexing of its software package are collected
+    within metrics.
     """
     cache_directory: str
+    metrics: Metrics
+
+    # whether diff_files can determine changes between versions
+    can_diff: bool = False
 
     def __init__(
             self, software_package: SoftwarePackage,
@@ -20,6 +29,7 @@ class Provider(metaclass=ABCMeta):
         self.software_package = software_package
         self.cache_directory = software_package.cache_directory
         self.version_name_derivator = version_name_derivator
+        self.metrics = Metrics()
 
     @abstractmethod
     def get_versions(self) -> Set[SoftwareVersion]:
@@ -33,6 +43,50 @@ class Provider(metaclass=ABCMeta):
     def get_file_data(self, version: SoftwareVersion, path: str):
         """Get stream of file data at path as contained within version.."""
 
+    def diff_files(
+            self, base_version: SoftwareVersion,
+            version: SoftwareVersion) -> Optional[Tuple[Set[str], Set[str]]]:
+        """
+        Get the files changed from base_version to version.
+
+        Returns the paths of the files which are removed or modified
+        within base_version and the paths of the files which are added or
+        modified within version. None is returned if the provider cannot
+        determine changes without reading all files, which is always the
+        case unless can_diff is set.
+        """
+        return None
+
+    def get_file_key(self, version: SoftwareVersion, path: str) -> Optional[str]:
+        """
+        Get a key identifying the content of the file at path as contained
+        within version without reading it.
+
+        Files with the same key are required to have the same content.
+        None is returned if the provider cannot identify contents.
+        """
+        return None
+
+    def iterate_files(
+            self, version: SoftwareVersion,
+            file_paths: Optional[Iterable[str]] = None
+    ) -> Iterator[Tuple[str, Optional[str], Callable[[], bytes]]]:
+        """
+        Iterate over the files available within version (or the files at
+        file_paths only if specified).
+
+        Yields the path of every file, its key (see get_file_key) and a
+        callable reading its data. Subclasses reading files as a stream
+        may invalidate the callable once the next file is yielded.
+        """
+        if file_paths is None:
+            file_paths = self.list_files(version)
+        for path in file_paths:
+            yield (
+                path,
+                self.get_file_key(version, path),
+                partial(self.get_file_data, version, path))
+
     def _get_software_version(
             self, internal_identifier: str, name: str,
             release_date: datetime) -> Union[SoftwareVersion, None]:
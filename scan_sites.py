@@ -20,6 +20,9 @@ def scan(arguments: Namespace):
             format='%(asctime)-15s: %(message)s',
             level=logging.INFO)
 
+    if arguments.cache_dir:
+        scanner.cache_dir = arguments.cache_dir
+
     if arguments.persist_resources:
         # must not exist or be an existing *directory*
         assert os.path.isdir(arguments.persist_resources) or \
@@ -27,6 +30,9 @@ def scan(arguments: Namespace):
 
         scanner.persist_resources = arguments.persist_resources
 
+    if arguments.replay:
+        scanner.replay = arguments.replay
+
     urls = None
     if arguments.urls_from_file:
         with open(arguments.urls_from_file, 'r') as fh:
@@ -42,10 +48,17 @@ if __name__ == '__main__':
     parser.add_argument('--skip', '-s', type=int, default=0)
     parser.add_argument('--urls-from-file', type=str, help='Read newline-separated URLs from file instead of majestic million')
     parser.add_argument('--identifier', '-i', type=str, help='An identifier for this scan.', required=True)
+    parser.add_argument(
+        '--cache-dir',
+        help='Use specified directory as a cache shared by all scanned sites.')
     parser.add_argument(
         '--persist-resources',
         '-p',
         help='Persist retrieved resources within the specified path for debugging purposes.')
+    parser.add_argument(
+        '--replay',
+        '-r',
+        help='Replay the resources persisted by an earlier scan (i.e., the persist path joined with its identifier) instead of retrieving them.')
     parser.add_argument(
         '--log-dir',
         '-l',
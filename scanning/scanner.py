@@ -5,6 +5,8 @@ from hashlib import sha1
 from traceback import format_exc, print_exc
 from typing import List, Union
 
+from analysis.replay import ReplayEngine
+from analysis.retrieval import set_retrieval_engine
 from analysis.website_analyzer import WebsiteAnalyzer
 from backends.postgresql import PostgresqlBackend
 from base.output import colors, print_info
@@ -18,9 +20,11 @@ class Scanner:
     The scanner handles the automated scanning of multiple (many)
     sites.
     """
+    cache_dir = None
     concurrent = 80
     # scan_identifier: str
     persist_resources = None
+    replay = None
 
     def __init__(self, scan_identifier: str):
         self.scan_identifier = scan_identifier
@@ -68,18 +72,15 @@ class Scanner:
             '({:10d}) SCANNING'.format(index),
             url)
         analyzer = WebsiteAnalyzer(
-            primary_url=url)
+            primary_url=url,
+            cache_dir=self.cache_dir)
 
-        if self.persist_resources:
-            cleaned_url = clean_path_name(url)
-            hashed_url = sha1(cleaned_url.encode()).hexdigest()
+        if self.replay:
+            set_retrieval_engine(ReplayEngine(self._site_path(self.replay, url)))
 
-            analyzer.persist_resources = os.path.join(
-                self.persist_resources,
-                self.scan_identifier,
-                hashed_url[:2],
-                hashed_url[2:4],
-                cleaned_url)
+        if self.persist_resources:
+            analyzer.persist_resources = self._site_path(
+                os.path.join(self.persist_resources, self.scan_identifier), url)
 
         result = analyzer.analyze()
         if not result:
@@ -97,6 +98,18 @@ class Scanner:
             'COMPLETED',
             url)
 
+    @staticmethod
+    def _site_path(scan_path: str, url: str) -> str:
+        """Get the path of the resources of a site persisted by a scan."""
+        cleaned_url = clean_path_name(url)
+        hashed_url = sha1(cleaned_url.encode()).hexdigest()
+
+        return os.path.join(
+            scan_path,
+            hashed_url[:2],
+            hashed_url[2:4],
+            cleaned_url)
+
     def _monitor_scan_site(self, *args, **kwargs):
         """
         Execute the scan_site method and catch and print all exceptions.
@@ -5,9 +5,13 @@ import sys
 # General settings
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+CVE_STATISTICS_DATABASE = os.path.join(BASE_DIR, 'vendor/cve_statistics.sqlite3')
+# the legacy pickled statistics, which are converted on first use
 CVE_STATISTICS_FILE = os.path.join(BASE_DIR, 'vendor/cve_statistics')
 
 HTTP_TIMEOUT = 5
+MAX_CONCURRENT_REQUESTS = 16
+MAX_CONCURRENT_REQUESTS_PER_HOST = 6
 
 
 # Analysis
@@ -27,6 +31,7 @@ MAX_ITERATIONS = 15
 MAX_ITERATIONS_WITHOUT_IMPROVEMENT = 3 # The maximum number of consecutive iterations with improvement less than min
 MIN_ASSETS_PER_ITERATION = 2
 MAX_ASSETS_PER_ITERATION = 8
+PREFETCH_CANDIDATES = 4 # The number of candidate assets retrieved speculatively beyond the required ones (0 disables prefetching)
 MIN_ABSOLUTE_SUPPORT = 10
 MIN_SUPPORT = 0.2
 SUPPORTED_SCHEMES = [
@@ -45,6 +50,7 @@ BACKEND = SqliteBackend(os.path.join(BASE_DIR, 'db.sqlite3'))
 
 # Cache
 CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+CHECKSUM_CACHE_FILE = os.path.join(CACHE_DIR, 'checksums.sqlite3') # None disables caching checksums of indexed files
 
 
 OVERWRITABLE_SETTINGS = (
@@ -61,6 +67,7 @@ OVERWRITABLE_SETTINGS = (
     ('NEGATIVE_MATCH_WEIGHT', float),
     ('FAILED_ASSET_WEIGHT', float),
     ('MIN_ASSETS_PER_ITERATION', int),
+    ('PREFETCH_CANDIDATES', int),
 )
 
 
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Evaluate a grid of analysis settings over a set of sites.
+
+Every site is retrieved only once: it is analyzed with the default
+settings first, and all combinations of settings are evaluated
+in-process by replaying the responses of this analysis. Requests of
+responses it has not recorded (as they failed or were not made) are
+regarded as failed retrievals and counted as missed.
+
+When run as a script, the backend is wrapped in a compiled index, so
+that its lookups are memoized in memory as well.
+"""
+import json
+import logging
+from argparse import ArgumentParser, Namespace
+from itertools import product
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import settings
+from backends.compiled_index import CompiledIndexBackend
+
+
+def parse_grid(values: List[str]) -> List[Tuple[str, list]]:
+    """Parse grid arguments of the form SETTING=value1,value2."""
+    types = dict(settings.OVERWRITABLE_SETTINGS)
+    grid = []
+    for value in values:
+        setting, _, options = value.partition('=')
+        setting = setting.upper().replace('-', '_')
+        if setting not in types:
+            raise ValueError('{} is not an overwritable setting'.format(setting))
+        grid.append((setting, [types[setting](option) for option in options.split(',')]))
+    return grid
+
+
+def analyze(url: str, cache: dict) -> Tuple[object, float]:
+    """Analyze a site with the current settings and measure the time required."""
+    from analysis.website_analyzer import WebsiteAnalyzer
+
+    start = perf_counter()
+    analyzer = WebsiteAnalyzer(primary_url=url, cache=cache)
+    result = analyzer.analyze()
+    if result:
+        result = sorted(str(guess.software_version) for guess in result)
+    return result, perf_counter() - start
+
+
+def sweep(arguments: Namespace):
+    """Evaluate all combinations of the settings grid for all sites."""
+    # the analysis modules bind the backend on import
+    from analysis.replay import ReplayEngine
+    from analysis.retrieval import get_retrieval_engine, set_retrieval_engine
+
+    grid = parse_grid(arguments.grid)
+    combinations = [
+        dict(zip((setting for setting, _ in grid), values))
+        for values in product(*(options for _, options in grid))
+    ]
+    defaults = {setting: getattr(settings, setting) for setting, _ in grid}
+
+    with open(arguments.sites_file) as fh:
+        urls = [url for url in fh.read().splitlines() if url]
+
+    engine = get_retrieval_engine()
+    if arguments.replay:
+        engine = ReplayEngine(arguments.replay)
+
+    results = {url: [] for url in urls}
+    timings = [0.0 for _ in combinations]
+    missed = [0 for _ in combinations]
+    retrieval_time = 0
+    for url in urls:
+        # all combinations of a site replay its responses, so that their
+        # timings do not include any retrieval
+        cache = {}
+        set_retrieval_engine(engine)
+        _, duration = analyze(url, cache)
+        retrieval_time += duration
+        replay = ReplayEngine(responses=cache)
+        set_retrieval_engine(replay)
+        for index, combination in enumerate(combinations):
+            for setting, value in combination.items():
+                setattr(settings, setting, value)
+            unrecorded = len(replay.unrecorded)
+            result, duration = analyze(url, cache)
+            results[url].append(result)
+            timings[index] += duration
+            missed[index] += len(replay.unrecorded) - unrecorded
+        for setting, value in defaults.items():
+            setattr(settings, setting, value)
+        print('{} done'.format(url))
+
+    print_table(combinations, results, timings, missed)
+    print('Initial retrieval with default settings took {:.2f}s'.format(retrieval_time))
+
+    if arguments.json_file:
+        with open(arguments.json_file, 'w') as fh:
+            json.dump({
+                'combinations': combinations,
+                'timings': timings,
+                'missed': missed,
+                'results': results,
+            }, fh)
+
+
+def print_table(
+        combinations: List[Dict[str, object]],
+        results: Dict[str, list], timings: List[float], missed: List[int]):
+    """Print a comparison of the results of all combinations."""
+    settings_header = ' '.join(
+        '{:>12}'.format(setting[:12]) for setting in combinations[0])
+    print('{} {:>8} {:>8} {:>8} {:>10} {:>10}'.format(
+        settings_header, 'results', 'changed', 'missed', 'total [s]',
+        'site [ms]'))
+    site_count = max(len(results), 1)
+    for index, combination in enumerate(combinations):
+        values = ' '.join(
+            '{:>12}'.format(str(value)) for value in combination.values())
+        found = sum(
+            1 for site_results in results.values() if site_results[index])
+        changed = sum(
+            1 for site_results in results.values()
+            if site_results[index] != site_results[0])
+        print('{} {:8d} {:8d} {:8d} {:10.2f} {:10.1f}'.format(
+            values, found, changed, missed[index], timings[index],
+            1000 * timings[index] / site_count))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(
+        description='Evaluate combinations of analysis settings. The '
+                    'number of changed results is relative to the first '
+                    'combination.')
+    parser.add_argument(
+        'sites_file',
+        help='Read newline-separated URLs of the sites to analyze from file.')
+    parser.add_argument(
+        '--grid', '-g', action='append', required=True,
+        help='A setting and its values to evaluate, e.g. MIN_SUPPORT=0.1,0.2. '
+             'Can be specified multiple times.')
+    parser.add_argument(
+        '--replay',
+        '-r',
+        help='Replay the resources persisted within the specified path or resource cache directory instead of retrieving them.')
+    parser.add_argument(
+        '--json-file',
+        help='Write the results of all sites and combinations to specified file.')
+    parser.add_argument(
+        '--verbose', '-v', action='store_true',
+        help='Show the log of the analyses.')
+    arguments = parser.parse_args()
+
+    if not arguments.verbose:
+        logging.disable(logging.WARNING)
+
+    # wrap the backend before the analysis modules are imported
+    if not isinstance(settings.BACKEND, CompiledIndexBackend):
+        settings.BACKEND = CompiledIndexBackend(settings.BACKEND)
+
+    sweep(arguments)
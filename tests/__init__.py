@@ -0,0 +1,7 @@
+import sys
+from types import SimpleNamespace
+
+# the Wappalyzer apps are downloaded (see vendor/update) and matched
+# against the index on import, which tests of the analysis do not rely on
+sys.modules.setdefault(
+    'analysis.wappalyzer_apps', SimpleNamespace(wappalyzer_apps=frozenset()))
@@ -0,0 +1,73 @@
+from datetime import datetime
+from unittest import TestCase
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from backends.sqlite import SqliteBackend
+from base.cache import LRUCache, MISSING
+
+
+class TestLRUCache(TestCase):
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_counters(self):
+        cache = LRUCache(2)
+        cache.put('a', None)
+        self.assertIsNone(cache.get('a'))
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.statistics(), {
+            'size': 1,
+            'max_size': 2,
+            'hits': 1,
+            'misses': 1,
+        })
+
+    def test_invalidation(self):
+        cache = LRUCache(10)
+        cache.put(('foo', 1), 1)
+        cache.put(('foo', 2), 2)
+        cache.put(('bar', 1), 3)
+        cache.invalidate_matching(lambda key: key[0] == 'foo')
+        self.assertEqual(len(cache), 1)
+        cache.invalidate(('bar', 1))
+        self.assertEqual(len(cache), 0)
+
+
+class TestBackendResultCache(TestCase):
+    def setUp(self):
+        self.backend = SqliteBackend(':memory:')
+        self.package = SoftwarePackage('Foo', 'Foo Inc.')
+        self.backend.store(self.package)
+
+    def _store_version(self, name: str) -> SoftwareVersion:
+        version = SoftwareVersion(self.package, name, name, datetime(2000, 1, 1))
+        self.backend.store(version)
+        self.backend.mark_indexed(version)
+        return version
+
+    def test_cached_versions(self):
+        version = self._store_version('1.0')
+        self.assertEqual(self.backend.retrieve_versions(self.package), {version})
+        self.assertEqual(self.backend.retrieve_versions(self.package), {version})
+        self.assertEqual(self.backend.cache_statistics()['results']['hits'], 1)
+
+    def test_invalidation_on_store(self):
+        first = self._store_version('1.0')
+        self.assertEqual(self.backend.retrieve_versions(self.package), {first})
+        second = self._store_version('2.0')
+        self.assertEqual(
+            self.backend.retrieve_versions(self.package), {first, second})
+
+    def test_invalidation_on_packages(self):
+        self.assertEqual(self.backend.retrieve_packages(), {self.package})
+        other = SoftwarePackage('Bar', 'Bar Inc.')
+        self.backend.store(other)
+        self.assertEqual(self.backend.retrieve_packages(), {self.package, other})
@@ -0,0 +1,36 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from base.cache import MISSING
+from indexing.checksum_cache import ChecksumCache
+
+
+class TestChecksumCache(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checksums.sqlite3')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persistence(self):
+        cache = ChecksumCache(self.path)
+        cache.put('git:abc', 'app.js', b'checksum')
+        cache.put('git:abc', 'app', None)
+        self.assertEqual(cache.get('git:abc', 'app.js'), b'checksum')
+        cache.flush()
+        reopened = ChecksumCache(self.path)
+        self.assertEqual(reopened.get('git:abc', 'app.js'), b'checksum')
+        self.assertIsNone(reopened.get('git:abc', 'app'))
+        self.assertIs(reopened.get('git:abc', 'app.css'), MISSING)
+
+    def test_version_invalidates(self):
+        cache = ChecksumCache(self.path)
+        cache.put('git:abc', 'app.js', b'checksum')
+        cache.flush()
+
+        class NewerChecksumCache(ChecksumCache):
+            VERSION = ChecksumCache.VERSION + 1
+
+        self.assertIs(NewerChecksumCache(self.path).get('git:abc', 'app.js'), MISSING)
@@ -0,0 +1,122 @@
+from datetime import datetime
+from unittest import TestCase
+
+from backends.compiled_index import CompiledIndexBackend
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from backends.sqlite import SqliteBackend
+from backends.static_file import StaticFile
+
+
+class TestCompiledIndexBackend(TestCase):
+    def setUp(self):
+        self.database = SqliteBackend(':memory:')
+        self.package = SoftwarePackage('Foo', 'Foo Inc.', ['foocms'])
+        self.versions = [
+            SoftwareVersion(self.package, name, name, datetime(2000 + index, 1, 1))
+            for index, name in enumerate(('1.0', '1.1', '2.0'))
+        ]
+        self.database.store(self.package)
+        for version in self.versions:
+            self.database.store(version)
+            self.database.mark_indexed(version)
+        for version in self.versions:
+            self.database.store(StaticFile(version, 'core.js', '/core.js', b'core'))
+            self.database.store(StaticFile(
+                version, 'app.js', '/app.js', version.name.encode()))
+        self.database.store(StaticFile(self.versions[2], 'new.css', '/new.css', b'new'))
+        self.compiled = CompiledIndexBackend(self.database)
+
+    def test_users(self):
+        for checksum in (b'core', b'1.0', b'new', b'unknown'):
+            self.assertEqual(
+                self.compiled.retrieve_static_file_users_by_checksum(checksum),
+                self.database.retrieve_static_file_users_by_checksum(checksum))
+        for webroot_path in ('/core.js', '/app.js', '/new.css', '/unknown'):
+            self.assertEqual(
+                self.compiled.retrieve_static_file_users_by_webroot_paths(webroot_path),
+                self.database.retrieve_static_file_users_by_webroot_paths(webroot_path))
+
+    def test_users_by_webroot_paths_and_checksums(self):
+        pairs = [
+            ('/core.js', b'core'),
+            ('/app.js', b'1.1'),
+            ('/app.js', None),
+            ('/unknown', b'new'),
+        ]
+        result = self.database.retrieve_static_file_users_by_webroot_paths_and_checksums(pairs)
+        self.assertEqual(
+            result[('/app.js', b'1.1')],
+            (set(self.versions), {self.versions[1]}))
+        self.assertEqual(
+            result[('/app.js', None)],
+            (set(self.versions), set()))
+        self.assertEqual(
+            result[('/unknown', b'new')],
+            (set(), {self.versions[2]}))
+        self.assertEqual(
+            self.compiled.retrieve_static_file_users_by_webroot_paths_and_checksums(pairs),
+            result)
+
+    def test_idf_weight(self):
+        for checksum in (b'core', b'1.1', b'unknown'):
+            self.assertAlmostEqual(
+                self.compiled.retrieve_static_file_idf_weight(checksum),
+                self.database.retrieve_static_file_idf_weight(checksum))
+        checksums = (b'core', b'1.1', b'new', b'unknown')
+        self.assertEqual(
+            self.compiled.retrieve_static_file_idf_weights(checksums),
+            self.database.retrieve_static_file_idf_weights(checksums))
+
+    def test_packages_and_versions(self):
+        self.assertEqual(
+            self.compiled.retrieve_packages_by_name('fo%'),
+            {self.package})
+        self.assertEqual(
+            self.compiled.retrieve_versions(self.package),
+            set(self.versions))
+        self.assertEqual(
+            self.compiled.static_file_count(self.versions[2]), 3)
+
+    def test_static_files_of_versions(self):
+        self.assertEqual(
+            self.compiled.retrieve_static_files_almost_unique_to_version(
+                self.versions[2], 2),
+            self.database.retrieve_static_files_almost_unique_to_version(
+                self.versions[2], 2))
+        self.assertEqual(
+            self.compiled.retrieve_static_files_popular_to_versions(
+                self.versions[:2], 10),
+            self.database.retrieve_static_files_popular_to_versions(
+                self.versions[:2], 10))
+        self.assertEqual(
+            self.compiled.retrieve_static_files_popular_to_versions(
+                self.versions[1:], 1),
+            {(frozenset(self.versions[1:]),
+              StaticFile(None, 'core.js', '/core.js', b'core'))})
+
+    def test_webroot_paths_with_high_entropy(self):
+        self.assertEqual(
+            sorted(self.compiled.retrieve_webroot_paths_with_high_entropy(
+                self.versions, None)),
+            sorted(self.database.retrieve_webroot_paths_with_high_entropy(
+                self.versions, None)))
+        self.assertEqual(
+            self.compiled.retrieve_webroot_paths_with_high_entropy(
+                self.versions, None, exclude=['/app.js']),
+            [('/new.css', 1, 1)])
+        self.assertEqual(
+            self.database.retrieve_webroot_paths_with_high_entropy(
+                self.versions, None, exclude=['/app.js', '/unknown']),
+            [('/new.css', 1, 1)])
+
+    def test_version_delta(self):
+        self.assertEqual(
+            self.compiled.version_delta(self.versions[0], self.versions[2]),
+            self.database.version_delta(self.versions[0], self.versions[2]))
+
+    def test_store_invalidates(self):
+        self.compiled.store(StaticFile(self.versions[0], 'old.css', '/old.css', b'old'))
+        self.assertEqual(
+            self.compiled.retrieve_static_file_users_by_checksum(b'old'),
+            {self.versions[0]})
@@ -0,0 +1,48 @@
+import os
+import pickle
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from cve.statistics import CveStatistics, convert_legacy_statistics
+
+
+class TestCveStatistics(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cve_statistics.sqlite3')
+        package = SoftwarePackage('Foo', 'Foo Inc.')
+        self.versions = [
+            SoftwareVersion(package, name, name, datetime(2000, 1, 1))
+            for name in ('1.0', '1.1', '2.0')
+        ]
+        self.statistics = {
+            self.versions[0]: {'CVE-2000-0001', 'CVE-2000-0002'},
+            self.versions[1]: {'CVE-2000-0002'},
+        }
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_vulnerable(self):
+        CveStatistics.write(self.path, self.statistics)
+        statistics = CveStatistics(self.path)
+        self.assertEqual(
+            statistics.vulnerable(self.versions),
+            dict(zip(self.versions, (True, True, False))))
+        self.assertTrue(statistics.is_vulnerable(self.versions[1]))
+        self.assertEqual(
+            statistics.cves(self.versions[0]),
+            {'CVE-2000-0001', 'CVE-2000-0002'})
+        self.assertEqual(statistics.cves(self.versions[2]), set())
+
+    def test_convert_legacy_statistics(self):
+        pickle_path = os.path.join(self.directory.name, 'cve_statistics')
+        with open(pickle_path, 'wb') as fh:
+            pickle.dump(self.statistics, fh)
+        convert_legacy_statistics(pickle_path, self.path)
+        self.assertEqual(
+            CveStatistics(self.path).vulnerable(self.versions),
+            dict(zip(self.versions, (True, True, False))))
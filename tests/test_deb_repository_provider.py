@@ -0,0 +1,186 @@
+import hashlib
+import os
+import tarfile
+from datetime import datetime
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from typing import Dict
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from indexing.indexer import Indexer
+from indexing.metrics import Metrics
+from providers.DebRepositoryProvider import DebException, \
+    DebRepositoryProvider, iterate_ar_members, iterate_package_stanzas
+
+
+def ar_member(name: str, data: bytes) -> bytes:
+    header = '{:<16}{:<12}{:<6}{:<6}{:<8}{:<10}'.format(
+        name + '/', 0, 0, 0, 100644, len(data)).encode() + b'`\n'
+    return header + data + b'\n' * (len(data) % 2)
+
+
+def deb_file(files: Dict[str, bytes], data_archive: bool = True) -> bytes:
+    data = BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as data_file:
+        directory = tarfile.TarInfo('./static')
+        directory.type = tarfile.DIRTYPE
+        data_file.addfile(directory)
+        for path, content in files.items():
+            info = tarfile.TarInfo(path)
+            info.size = len(content)
+            data_file.addfile(info, BytesIO(content))
+    return (
+        b'!<arch>\n' +
+        ar_member('debian-binary', b'2.0\n') +
+        ar_member('control.tar.gz', b'control') +
+        (ar_member('data.tar.gz', data.getvalue()) if data_archive else b''))
+
+
+class TestIterateArMembers(TestCase):
+    def test_members(self):
+        archive = BytesIO(
+            b'!<arch>\n' +
+            ar_member('debian-binary', b'2.0\n') +
+            ar_member('control.tar.gz', b'abc') +
+            ar_member('data.tar.xz', b'data'))
+        members = []
+        for name, member in iterate_ar_members(archive):
+            if name != 'control.tar.gz':
+                # unread members are skipped
+                members.append((name, member.read()))
+        self.assertEqual(members, [
+            ('debian-binary', b'2.0\n'),
+            ('data.tar.xz', b'data'),
+        ])
+
+    def test_invalid_archive(self):
+        with self.assertRaises(DebException):
+            list(iterate_ar_members(BytesIO(b'PK\x03\x04')))
+
+
+class TestIteratePackageStanzas(TestCase):
+    def test_stanzas(self):
+        lines = [
+            'Package: foo',
+            'Version: 1.0-1',
+            'Description: short',
+            ' long',
+            'Filename: pool/foo_1.0-1.deb',
+            '',
+            '',
+            'Package: bar',
+            'SHA256: abc',
+        ]
+        self.assertEqual(list(iterate_package_stanzas(lines)), [{
+            'Package': 'foo',
+            'Version': '1.0-1',
+            'Description': 'short\nlong',
+            'Filename': 'pool/foo_1.0-1.deb',
+        }, {
+            'Package': 'bar',
+            'SHA256': 'abc',
+        }])
+
+
+class TestDebRepositoryProviderStreaming(TestCase):
+    def setUp(self):
+        self.provider = DebRepositoryProvider(
+            SoftwarePackage('foo', 'Foo'), 'http://deb.example.com/',
+            'dists/stable/main/binary-all/Packages', 'foo', streaming=True)
+        self.version = SoftwareVersion(
+            self.provider.software_package, '1.0', '1.0', datetime.min)
+
+    def serve(self, deb: bytes, sha256: str = None, version: str = '1.0'):
+        """Serve deb as the DEB file of the version."""
+        self.provider._cached_packages = {
+            version: {
+                'filename': 'pool/foo_{}.deb'.format(version),
+                'size': len(deb),
+                'sha256': sha256 or hashlib.sha256(deb).hexdigest(),
+            },
+        }
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.raw = BytesIO(deb)
+        return patch(
+            'providers.DebRepositoryProvider.requests.get',
+            return_value=response)
+
+    def iterate_files(self, deb: bytes, sha256: str = None, **kwargs) -> list:
+        with self.serve(deb, sha256) as get:
+            files = [
+                (path, key, reader())
+                for path, key, reader
+                in self.provider.iterate_files(self.version, **kwargs)
+            ]
+        get.assert_called_once_with(
+            'http://deb.example.com/pool/foo_1.0.deb', stream=True)
+        return files
+
+    def test_files(self):
+        deb = deb_file({
+            './static/a.js': b'a',
+            './static/b.css': b'b',
+        })
+        self.assertEqual(self.iterate_files(deb), [
+            ('static/a.js', 'deb:static/a.js:1:0', b'a'),
+            ('static/b.css', 'deb:static/b.css:1:0', b'b'),
+        ])
+        self.assertEqual(
+            self.provider.metrics.counters['bytes_downloaded'], len(deb))
+
+    def test_file_paths(self):
+        deb = deb_file({
+            './static/a.js': b'a',
+            './static/b.css': b'b',
+        })
+        self.assertEqual(
+            self.iterate_files(deb, file_paths=['static/b.css', 'c.js']),
+            [('static/b.css', 'deb:static/b.css:1:0', b'b')])
+
+    def test_readers_are_invalidated(self):
+        deb = deb_file({
+            './static/a.js': b'a',
+            './static/b.css': b'b',
+        })
+        with self.serve(deb):
+            files = self.provider.iterate_files(self.version)
+            _, _, first_reader = next(files)
+            _, _, second_reader = next(files)
+            self.assertEqual(second_reader(), b'b')
+            with self.assertRaises(tarfile.StreamError):
+                first_reader()
+            files.close()
+
+    def test_corrupt_deb_file(self):
+        deb = deb_file({'./static/a.js': b'a'})
+        with self.assertRaises(DebException):
+            self.iterate_files(deb, sha256=hashlib.sha256(b'other').hexdigest())
+
+    def test_missing_data_archive(self):
+        with self.assertRaises(DebException):
+            self.iterate_files(deb_file({}, data_archive=False))
+
+    def test_unchanged_files_hit_checksum_cache(self):
+        metrics = Metrics()
+        with TemporaryDirectory() as directory, \
+                patch('indexing.checksum_cache.CHECKSUM_CACHE_FILE',
+                      os.path.join(directory, 'checksums.sqlite3')), \
+                patch.dict('indexing.checksum_cache._caches', clear=True):
+            for name, content in (('1.0', b'var b;'), ('1.1', b'var bc;')):
+                version = SoftwareVersion(
+                    self.provider.software_package, name, name, datetime.min)
+                deb = deb_file({
+                    './static/a.js': b'var a;',
+                    './static/b.js': content,
+                })
+                with self.serve(deb, version=name):
+                    list(Indexer.iterate_static_file_paths(
+                        version, self.provider.iterate_files(version),
+                        '/', '/static', metrics))
+                if name == '1.0':
+                    self.assertNotIn('cached_checksums', metrics.counters)
+        self.assertEqual(metrics.counters['cached_checksums'], 1)
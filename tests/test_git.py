@@ -0,0 +1,186 @@
+import os
+import sqlite3
+from contextlib import closing
+from tempfile import TemporaryDirectory
+from typing import Dict, Union
+from unittest import TestCase
+from unittest.mock import patch
+
+from pygit2 import Oid, Signature, init_repository
+from pygit2.repository import Repository
+
+from backends.software_package import SoftwarePackage
+from backends.sqlite import SqliteBackend
+from definitions.definition import SoftwareDefinition
+from indexing.indexer import Indexer
+from providers.git import GIT_FILEMODE_COMMIT, GIT_FILEMODE_TREE, GitTagProvider
+
+
+# the file modes of regular files within trees
+GIT_FILEMODE_BLOB = 0o100644
+
+
+def create_tree(repository: Repository, files: Dict[str, Union[bytes, Oid]]) -> Oid:
+    """
+    Create a tree of files by their paths. Commit ids are inserted as
+    submodules.
+    """
+    builder = repository.TreeBuilder()
+    subtrees = {}
+    for path, content in files.items():
+        name, _, subpath = path.partition('/')
+        if subpath:
+            subtrees.setdefault(name, {})[subpath] = content
+        elif isinstance(content, Oid):
+            builder.insert(name, content, GIT_FILEMODE_COMMIT)
+        else:
+            builder.insert(
+                name, repository.create_blob(content), GIT_FILEMODE_BLOB)
+    for name, subtree_files in subtrees.items():
+        builder.insert(
+            name, create_tree(repository, subtree_files), GIT_FILEMODE_TREE)
+    return builder.write()
+
+
+def create_tag(
+        repository: Repository, tag: str, files: Dict[str, Union[bytes, Oid]],
+        time: int) -> Oid:
+    """Commit files and tag the commit."""
+    signature = Signature('Foo', 'foo@example.com', time, 0)
+    parents = [] if repository.head_is_unborn else [repository.head.target]
+    commit = repository.create_commit(
+        'HEAD', signature, signature, tag, create_tree(repository, files),
+        parents)
+    repository.references.create('refs/tags/{}'.format(tag), commit)
+    return commit
+
+
+class GitDefinition(SoftwareDefinition):
+    software_package = SoftwarePackage('Foo', 'Foo Inc.')
+    provider = None
+    path_map = {
+        '/': '/static',
+    }
+
+
+class GitTestCase(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.repository = init_repository(
+            os.path.join(self.directory.name, 'source'), bare=True)
+        base = create_tag(self.repository, '1.0', {
+            'static/a.js': b'var a;',
+            'static/b.js': b'var b;',
+            'static/c.css': b'a { color: red; }',
+            'README': b'Foo',
+        }, 946684800)
+        create_tag(self.repository, '2.0', {
+            'static/a.js': b'var a = 1;',
+            'static/c.css': b'a { color: red; }',
+            'static/sub/d.js': b'var d;',
+            'static/lib': base,
+            'README': b'Foo',
+        }, 978307200)
+
+        self.provider = GitTagProvider(
+            GitDefinition.software_package, self.repository.path)
+        self.provider.cache_directory = os.path.join(
+            self.directory.name, 'cache')
+        provider_patch = patch.object(GitDefinition, 'provider', self.provider)
+        provider_patch.start()
+        self.addCleanup(provider_patch.stop)
+
+    def get_versions(self) -> dict:
+        return {
+            version.name: version
+            for version in self.provider.get_versions()
+        }
+
+
+class TestIncrementalIndexing(GitTestCase):
+    def test_diff_files(self):
+        versions = self.get_versions()
+        self.assertEqual(
+            self.provider.diff_files(versions['1.0'], versions['2.0']), (
+                {'static/a.js', 'static/b.js', 'static/lib', 'static/sub/d.js'},
+                {'static/a.js', 'static/sub/d.js'},
+            ))
+
+    def test_same_uses_as_full_indexing(self):
+        uses = self.index(incremental=False)
+        self.assertEqual(
+            {webroot_path for _, webroot_path, _ in uses['2.0']},
+            {'a.js', 'c.css', 'sub/d.js'})
+        self.assertEqual(self.index(incremental=True), uses)
+
+    def index(self, incremental: bool) -> Dict[str, set]:
+        """Index all versions and get the uses of all versions."""
+        path = os.path.join(
+            self.directory.name, 'db_{}.sqlite3'.format(incremental))
+        backend = SqliteBackend(path)
+        indexer = Indexer()
+        indexer.incremental = incremental
+        with patch('indexing.indexer.BACKEND', backend), \
+                patch('indexing.writer.BACKEND', backend), \
+                patch('indexing.checksum_cache.CHECKSUM_CACHE_FILE', None), \
+                patch('indexing.indexer.definitions', [GitDefinition]):
+            indexer.index_all(max_workers=2)
+        counters = indexer.metrics['Foo'].counters
+        self.assertEqual(counters['indexed_versions'], 2)
+        # only the unchanged stylesheet is copied from the base version
+        self.assertEqual(
+            counters['copied_static_file_uses'], 1 if incremental else 0)
+
+        with closing(sqlite3.connect(path)) as connection:
+            rows = connection.execute('''
+            SELECT
+                software_version.name,
+                static_file.src_path,
+                static_file.webroot_path,
+                static_file.checksum
+            FROM static_file_use
+            JOIN software_version
+                ON software_version.id = static_file_use.software_version_id
+            JOIN static_file
+                ON static_file.id = static_file_use.static_file_id
+            ''').fetchall()
+        uses = {}
+        for version_name, *static_file in rows:
+            uses.setdefault(version_name, set()).add(tuple(static_file))
+        return uses
+
+
+class TestIterateFiles(GitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.version = self.get_versions()['2.0']
+
+    def test_files(self):
+        files = {
+            path: (key, read())
+            for path, key, read in self.provider.iterate_files(self.version)
+        }
+        tree = self.repository.revparse_single('2.0').tree
+        self.assertEqual(files, {
+            path: ('git:{}'.format(tree[path].id), tree[path].data)
+            for path in (
+                'README', 'static/a.js', 'static/c.css', 'static/sub/d.js')
+        })
+        self.assertEqual(self.provider.metrics.counters['trees'], 3)
+
+    def test_file_paths(self):
+        files = self.provider.iterate_files(
+            self.version, ['static/a.js', 'static/missing.js', 'other/b.js'])
+        self.assertEqual(
+            [(path, read()) for path, _, read in files],
+            [('static/a.js', b'var a = 1;')])
+        # the subdirectory is not walked
+        self.assertEqual(self.provider.metrics.counters['trees'], 2)
+
+    def test_agrees_with_single_files(self):
+        for path, key, read in self.provider.iterate_files(self.version):
+            self.assertEqual(
+                self.provider.get_file_key(self.version, path), key)
+            self.assertEqual(
+                self.provider.get_file_data(self.version, path), read())
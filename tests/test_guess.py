@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+from analysis.guess import Guess
+
+
+class FakeAsset:
+    def __init__(self, idf_weight: float):
+        self.idf_weight = idf_weight
+
+
+class TestGuess(TestCase):
+    def setUp(self):
+        self.assets = [FakeAsset(weight) for weight in (0.5, 1, 2)]
+
+    def test_initial_strength(self):
+        guess = Guess(None, set(self.assets[:2]), {self.assets[2]})
+        self.assertEqual(guess.positive_strength, 1.5)
+        self.assertEqual(guess.negative_strength, 2)
+
+    def test_accumulation(self):
+        guess = Guess(None)
+        self.assertEqual(guess.strength, 0)
+        guess.add_positive_matches(self.assets[:2])
+        guess.add_positive_matches(self.assets[1:])
+        self.assertEqual(guess.positive_strength, 3.5)
+        self.assertEqual(len(guess.positive_matches), 3)
+
+    def test_matches_are_copied(self):
+        positive_matches = {self.assets[0]}
+        guess = Guess(None, positive_matches)
+        positive_matches.add(self.assets[1])
+        self.assertEqual(guess.positive_matches, {self.assets[0]})
+        self.assertEqual(guess.positive_strength, 0.5)
+
+    def test_ordering(self):
+        weak = Guess(None, {self.assets[0]})
+        strong = Guess(None, {self.assets[2]})
+        self.assertLess(weak, strong)
+        self.assertEqual(sorted([strong, weak]), [weak, strong])
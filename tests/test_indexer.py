@@ -0,0 +1,80 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import TestCase
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from indexing.indexer import Indexer
+
+
+def fake_definition(name: str, can_diff: bool) -> SimpleNamespace:
+    return SimpleNamespace(
+        software_package=SoftwarePackage(name, 'Foo Inc.'),
+        provider=SimpleNamespace(can_diff=can_diff))
+
+
+def versions(definition: SimpleNamespace, *names: str) -> list:
+    return [
+        SoftwareVersion(
+            definition.software_package, name, name,
+            datetime(2000, 1, 1 + index))
+        for index, name in enumerate(names)
+    ]
+
+
+class TestWorkUnits(TestCase):
+    def setUp(self):
+        self.indexer = Indexer()
+        self.definition = fake_definition('Foo', can_diff=True)
+        self.indexed = set(versions(self.definition, '0.1'))
+        self.missing = versions(self.definition, '1.0', '2.0', '3.0')
+
+    def test_single_version_units(self):
+        units = self.indexer._get_work_units(
+            self.definition, self.indexed, set(self.missing))
+        self.assertEqual(
+            sorted(units, key=lambda unit: unit[1][0].name), [
+                (self.definition, [version], set())
+                for version in self.missing
+            ])
+
+    def test_chained_unit(self):
+        self.indexer.incremental = True
+        self.assertEqual(
+            self.indexer._get_work_units(
+                self.definition, self.indexed, set(reversed(self.missing))),
+            [(self.definition, self.missing, self.indexed)])
+
+    def test_chained_unit_requires_diff(self):
+        self.indexer.incremental = True
+        self.definition.provider.can_diff = False
+        self.assertEqual(
+            len(self.indexer._get_work_units(
+                self.definition, self.indexed, set(self.missing))),
+            3)
+
+    def test_no_missing_versions(self):
+        self.indexer.incremental = True
+        self.assertEqual(
+            self.indexer._get_work_units(self.definition, self.indexed, set()),
+            [])
+
+    def test_schedule(self):
+        foo, bar, baz, qux = (
+            fake_definition(name, can_diff=False)
+            for name in ('Foo', 'Bar', 'Baz', 'Qux'))
+        foo_units = [(foo, [version], set()) for version in versions(foo, '1', '2', '3')]
+        bar_units = [(bar, [version], set()) for version in versions(bar, '1')]
+        baz_unit = (baz, versions(baz, '1', '2'), set())
+        qux_unit = (qux, versions(qux, '1', '2', '3'), set())
+        self.assertEqual(
+            Indexer._schedule_work_units(
+                [foo_units, [baz_unit], bar_units, [qux_unit]]),
+            [
+                qux_unit,
+                baz_unit,
+                foo_units[0],
+                bar_units[0],
+                foo_units[1],
+                foo_units[2],
+            ])
@@ -0,0 +1,18 @@
+from unittest import TestCase
+
+from indexing.metrics import Metrics, merge_metrics
+
+
+class TestMetrics(TestCase):
+    def test_merge_and_pop(self):
+        metrics = Metrics()
+        with metrics.time('read'):
+            pass
+        metrics.count('files', 2)
+        merged = {'foo': Metrics()}
+        merged['foo'].count('files')
+        merge_metrics(merged, {'foo': metrics.pop(), 'bar': Metrics()})
+        self.assertEqual(merged['foo'].counters['files'], 3)
+        self.assertIn('read', merged['foo'].timers)
+        self.assertIn('bar', merged)
+        self.assertEqual(metrics.serialize(), {'timers': {}, 'counters': {}})
@@ -0,0 +1,40 @@
+import pickle
+from datetime import datetime
+from unittest import TestCase
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from backends.static_file import StaticFile
+
+
+class TestModel(TestCase):
+    def setUp(self):
+        self.version = SoftwareVersion(
+            SoftwarePackage('Foo', 'Foo Inc.', ['foocms']), '1.0', 'v1.0',
+            datetime(2000, 1, 1))
+        self.static_file = StaticFile(self.version, 'a.js', '/a.js', b'a')
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.version.unknown = True
+
+    def test_pickle_excludes_hash(self):
+        hash(self.static_file)
+        self.assertEqual(
+            self.static_file.__reduce__(),
+            (StaticFile, (self.version, 'a.js', '/a.js', b'a')))
+        restored = pickle.loads(pickle.dumps(self.static_file))
+        self.assertEqual(restored, self.static_file)
+        self.assertEqual(hash(restored), hash(self.static_file))
+        self.assertEqual(restored.software_version.software_package.alternative_names, ['foocms'])
+
+    def test_legacy_state(self):
+        restored = SoftwareVersion.__new__(SoftwareVersion)
+        restored.__setstate__({
+            'software_package': self.version.software_package,
+            'name': '1.0',
+            'internal_identifier': 'v1.0',
+            'release_date': datetime(2000, 1, 1),
+        })
+        self.assertEqual(restored, self.version)
+        self.assertEqual({restored: True}.get(self.version), True)
@@ -0,0 +1,100 @@
+import os
+from contextlib import closing
+from datetime import datetime
+from unittest import SkipTest, TestCase
+from uuid import uuid4
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from backends.static_file import StaticFile
+
+# the connection string of a database to run the tests in, e.g.,
+# "dbname=test user=postgres"
+POSTGRES_TEST_DSN = os.environ.get('POSTGRES_TEST_DSN')
+
+
+class TestPostgresqlBackend(TestCase):
+    """
+    The tests are run within a schema of their own, which is dropped
+    afterwards.
+    """
+    def setUp(self):
+        if not POSTGRES_TEST_DSN:
+            raise SkipTest('POSTGRES_TEST_DSN is not set')
+        try:
+            import psycopg2
+        except ImportError:
+            raise SkipTest('psycopg2 is not installed')
+        from backends.postgresql import PostgresqlBackend
+
+        self.schema = 'test_{}'.format(uuid4().hex)
+        with closing(psycopg2.connect(POSTGRES_TEST_DSN)) as connection, \
+                closing(connection.cursor()) as cursor:
+            cursor.execute('CREATE SCHEMA {}'.format(self.schema))
+            connection.commit()
+        self.addCleanup(self._drop_schema, psycopg2)
+        self.backend = PostgresqlBackend(
+            POSTGRES_TEST_DSN, options='-c search_path={}'.format(self.schema))
+
+        self.package = SoftwarePackage('Foo', 'Foo Inc.')
+        self.versions = [
+            SoftwareVersion(self.package, name, name, datetime(2000, 1, 1))
+            for name in ('1.0', '2.0')
+        ]
+
+    def _drop_schema(self, psycopg2):
+        if hasattr(self, 'backend'):
+            self.backend._connection.close()
+        with closing(psycopg2.connect(POSTGRES_TEST_DSN)) as connection, \
+                closing(connection.cursor()) as cursor:
+            cursor.execute('DROP SCHEMA {} CASCADE'.format(self.schema))
+            connection.commit()
+
+    def test_bulk_store(self):
+        self.backend.store(StaticFile(self.versions[0], 'a.js', '/a.js', b'a'))
+        static_files = [
+            StaticFile(self.versions[0], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[0], 'b.js', '/b.js', b'b'),
+            StaticFile(self.versions[1], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[1], 'b.js', '/b.js', b'b'),
+            StaticFile(self.versions[1], 'b.js', '/b.js', b'b'),
+        ]
+        self.assertEqual(
+            self.backend.store(static_files),
+            [False, True, True, True, False])
+        self.assertEqual(
+            self.backend.retrieve_static_file_users_by_checksum(b'a'),
+            set(self.versions))
+        self.assertEqual(
+            len(self.backend.retrieve_static_files_by_checksum(b'b')), 1)
+        self.assertEqual(self.backend.static_file_count(self.versions[1]), 2)
+
+    def test_nested_bulk_stores(self):
+        with self.backend.transaction():
+            self.backend.store([
+                StaticFile(self.versions[0], 'a.js', '/a.js', b'a'),
+                StaticFile(self.versions[0], 'b.js', '/b.js', b'b'),
+            ])
+            self.backend.store([
+                StaticFile(self.versions[1], 'c.js', '/c.js', b'c'),
+            ])
+            with closing(self.backend._connection.cursor()) as cursor:
+                # only the static files of the last store are staged
+                cursor.execute('SELECT COUNT(*) FROM static_file_staging')
+                self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(self.backend.static_file_count(self.versions[0]), 2)
+        self.assertEqual(self.backend.static_file_count(self.versions[1]), 1)
+        self.assertEqual(
+            self.backend.retrieve_static_file_users_by_checksum(b'c'),
+            {self.versions[1]})
+
+    def test_interleaved_exports(self):
+        self.backend.store([
+            StaticFile(self.versions[0], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[1], 'b.js', '/b.js', b'b'),
+        ])
+        static_files = self.backend.export_static_files()
+        uses = self.backend.export_static_file_uses()
+        self.assertEqual(
+            [(next(static_files)[1], next(uses)[1]) for _ in range(2)],
+            [('a.js', 1), ('b.js', 2)])
@@ -0,0 +1,65 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from requests.exceptions import ConnectionError
+
+from analysis.replay import ReplayEngine
+from analysis.resource import Resource
+from analysis.resource_cache import CachedResponse, ResourceCache
+
+
+class TestReplayEngine(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.response = CachedResponse(
+            'https://example.com/static/a.js', 200,
+            {'Content-Type': 'application/javascript'}, 'utf-8', b'a();')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persisted_resources(self):
+        resource = Resource('https://example.com/a.js')
+        resource._success = True
+        resource._response = self.response
+        resource.persist(self.directory.name)
+
+        engine = ReplayEngine(self.directory.name)
+        response = engine.get('https://example.com/a.js')
+        self.assertEqual(response.url, 'https://example.com/static/a.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers['content-type'], 'application/javascript')
+        self.assertEqual(response.encoding, 'utf-8')
+        self.assertEqual(response.content, b'a();')
+
+    def test_resource_cache(self):
+        ResourceCache(self.directory.name)['https://example.com/a.js'] = \
+            self.response
+
+        engine = ReplayEngine(self.directory.name)
+        response = engine.get('https://example.com/a.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'a();')
+
+    def test_unrecorded_url(self):
+        resource = Resource('https://example.com/a.js')
+        resource._success = True
+        resource._response = self.response
+        resource.persist(self.directory.name)
+
+        engine = ReplayEngine(self.directory.name)
+        with self.assertRaises(ConnectionError):
+            engine.get('https://example.com/b.js')
+        self.assertEqual(engine.unrecorded, ['https://example.com/b.js'])
+
+    def test_responses(self):
+        engine = ReplayEngine(
+            responses={'https://example.com/a.js': self.response})
+        self.assertIs(engine.get('https://example.com/a.js'), self.response)
+        with self.assertRaises(ConnectionError):
+            engine.get('https://example.com/b.js')
+
+    def test_missing_arguments(self):
+        with self.assertRaises(ValueError):
+            ReplayEngine()
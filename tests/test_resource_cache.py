@@ -0,0 +1,35 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from analysis.resource_cache import CachedResponse, ResourceCache
+
+
+class TestResourceCache(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.cache = ResourceCache(self.directory.name)
+        self.response = CachedResponse(
+            'https://example.com/', 200, {'Server': 'nginx'}, 'utf-8',
+            'Grüße'.encode())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_roundtrip(self):
+        self.assertNotIn('http://example.com', self.cache)
+        self.cache['http://example.com'] = self.response
+        cached = self.cache['http://example.com']
+        self.assertEqual(cached.url, 'https://example.com/')
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.headers['server'], 'nginx')
+        self.assertEqual(cached.text, 'Grüße')
+        with self.assertRaises(KeyError):
+            self.cache['http://example.org']
+
+    def test_shared_between_instances(self):
+        other = ResourceCache(self.directory.name)
+        self.cache['http://example.com'] = self.response
+        self.cache['http://example.com/copy'] = self.response
+        self.assertIn('http://example.com/copy', other)
+        self.assertEqual(other['http://example.com'].content, self.response.content)
+        self.assertEqual(len(ResourceCache(self.directory.name)), 2)
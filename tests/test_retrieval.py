@@ -0,0 +1,40 @@
+from threading import Lock
+from time import sleep
+from unittest import TestCase
+
+from analysis.retrieval import RetrievalEngine
+
+
+class FakeResource:
+    def __init__(self, host: str, counter: dict):
+        self.host = host
+        self.retrieved = False
+        self._counter = counter
+
+    def retrieve(self):
+        with self._counter['lock']:
+            self._counter['active'] += 1
+            self._counter['max_active'] = max(
+                self._counter['max_active'], self._counter['active'])
+        sleep(0.01)
+        with self._counter['lock']:
+            self._counter['active'] -= 1
+        self.retrieved = True
+
+
+class TestRetrievalEngine(TestCase):
+    def setUp(self):
+        self.counter = {'lock': Lock(), 'active': 0, 'max_active': 0}
+
+    def test_retrieves_all(self):
+        resources = [FakeResource('a{}'.format(i), self.counter) for i in range(8)]
+        RetrievalEngine(max_concurrent=4, max_per_host=2).retrieve(resources)
+        self.assertTrue(all(resource.retrieved for resource in resources))
+        self.assertGreater(self.counter['max_active'], 1)
+        self.assertLessEqual(self.counter['max_active'], 4)
+
+    def test_per_host_limit(self):
+        resources = [FakeResource('a', self.counter) for _ in range(6)]
+        RetrievalEngine(max_concurrent=4, max_per_host=2).retrieve(resources)
+        self.assertTrue(all(resource.retrieved for resource in resources))
+        self.assertLessEqual(self.counter['max_active'], 2)
@@ -0,0 +1,183 @@
+import os
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from backends.sqlite import SqliteBackend
+from backends.static_file import StaticFile
+
+
+class TestSqliteBackend(TestCase):
+    def setUp(self):
+        self.backend = SqliteBackend(':memory:')
+        self.package = SoftwarePackage('Foo', 'Foo Inc.')
+        self.versions = [
+            SoftwareVersion(self.package, name, name, datetime(2000, 1, 1))
+            for name in ('1.0', '2.0')
+        ]
+
+    def test_bulk_store(self):
+        self.backend.store(StaticFile(self.versions[0], 'a.js', '/a.js', b'a'))
+        static_files = [
+            StaticFile(self.versions[0], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[0], 'b.js', '/b.js', b'b'),
+            StaticFile(self.versions[1], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[1], 'b.js', '/b.js', b'b'),
+            StaticFile(self.versions[1], 'b.js', '/b.js', b'b'),
+        ]
+        self.assertEqual(
+            self.backend.store(static_files),
+            [False, True, True, True, False])
+        self.assertEqual(
+            self.backend.retrieve_static_file_users_by_checksum(b'a'),
+            set(self.versions))
+        self.assertEqual(
+            len(self.backend.retrieve_static_files_by_checksum(b'b')), 1)
+        self.assertEqual(self.backend.static_file_count(self.versions[1]), 2)
+
+    def test_transaction_rollback(self):
+        self.backend.store(self.package)
+        with self.assertRaises(ValueError):
+            with self.backend.transaction():
+                self.backend.store(self.versions[0])
+                with self.backend.transaction():
+                    self.backend.store(self.versions[1])
+                raise ValueError
+        self.assertEqual(
+            self.backend.retrieve_versions(self.package, indexed_only=False),
+            set())
+
+    def test_changes_are_persisted(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'db.sqlite3')
+            self.backend = SqliteBackend(path)
+            self.backend.store([
+                StaticFile(self.versions[0], 'a.js', '/a.js', b'a')])
+            self.backend.store(self.versions[1])
+            reopened = SqliteBackend(path)
+            self.assertEqual(
+                reopened.retrieve_versions(self.package, indexed_only=False),
+                set(self.versions))
+
+    def test_duplicate_static_files_are_merged(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'db.sqlite3')
+            self.backend = SqliteBackend(path)
+            self.backend.store(self.versions[0])
+            self.backend.store(self.versions[1])
+            # databases from before static files were unique
+            self.backend._connection.execute('DROP INDEX static_file_unique')
+            for version in self.versions:
+                self.backend._connection.execute('''
+                INSERT INTO static_file (src_path, webroot_path, checksum)
+                VALUES ('a.js', '/a.js', ?)
+                ''', (b'a',))
+                self.backend._connection.execute('''
+                INSERT INTO static_file_use (software_version_id, static_file_id)
+                VALUES (?, last_insert_rowid())
+                ''', (self.backend._get_id(version),))
+            reopened = SqliteBackend(path)
+            self.assertEqual(
+                len(reopened.retrieve_static_files_by_checksum(b'a')), 1)
+            self.assertEqual(
+                reopened.retrieve_static_file_users_by_checksum(b'a'),
+                set(self.versions))
+
+    def test_copy_static_file_uses(self):
+        self.backend.store([
+            StaticFile(self.versions[0], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[0], 'b.js', '/b.js', b'b'),
+        ])
+        self.backend.store(self.versions[1])
+        self.assertEqual(
+            self.backend.copy_static_file_uses(
+                self.versions[0], self.versions[1], {'b.js'}),
+            1)
+        self.assertEqual(
+            self.backend.retrieve_static_file_users_by_checksum(b'a'),
+            set(self.versions))
+        self.assertEqual(
+            self.backend.retrieve_static_file_users_by_checksum(b'b'),
+            {self.versions[0]})
+
+    def test_path_entropy(self):
+        other_package = SoftwarePackage('Bar', 'Bar Inc.')
+        other_version = SoftwareVersion(other_package, '1.0', '1.0', datetime(2000, 1, 1))
+        for version in self.versions + [other_version]:
+            self.backend.store(version)
+            self.backend.mark_indexed(version)
+        self.backend.store([
+            StaticFile(self.versions[0], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[1], 'a.js', '/a.js', b'a2'),
+            StaticFile(self.versions[1], 'b.js', '/b.js', b'b'),
+            StaticFile(other_version, 'a.js', '/a.js', b'a'),
+            StaticFile(other_version, 'c.js', '/c.js', b'c'),
+        ])
+        version_sets = [
+            self.versions,
+            self.versions[1:],
+            self.versions + [other_version],
+        ]
+        expected = [
+            sorted(self.backend.retrieve_webroot_paths_with_high_entropy(
+                versions, None))
+            for versions in version_sets
+        ]
+        self.backend.update_path_entropy(self.package)
+        self.backend.update_path_entropy(other_package)
+        for versions, result in zip(version_sets, expected):
+            self.assertEqual(
+                sorted(self.backend._evaluate_path_entropy(
+                    {
+                        package: {
+                            self.backend._get_id(version)
+                            for version in versions
+                            if version.software_package == package}
+                        for package in {version.software_package for version in versions}
+                    }, None, ())),
+                result)
+            self.assertEqual(
+                sorted(self.backend.retrieve_webroot_paths_with_high_entropy(
+                    versions, None)),
+                result)
+        self.assertEqual(
+            self.backend.retrieve_webroot_paths_with_high_entropy(
+                self.versions, None, exclude=['/a.js']),
+            [('/b.js', 1, 1)])
+
+        # versions indexed afterwards are not covered
+        new_version = SoftwareVersion(self.package, '3.0', '3.0', datetime(2001, 1, 1))
+        self.backend.store(StaticFile(new_version, 'b.js', '/b.js', b'b'))
+        self.backend.mark_indexed(new_version)
+        self.assertIsNone(self.backend._evaluate_path_entropy(
+            {self.package: {self.backend._get_id(new_version)}}, None, ()))
+        self.assertEqual(
+            self.backend.retrieve_webroot_paths_with_high_entropy(
+                [new_version, self.versions[1]], None),
+            [('/a.js', 1, 1)])
+
+    def test_models_are_interned(self):
+        package = SoftwarePackage('Bar', 'Bar Inc.', ['barcms'])
+        version = SoftwareVersion(package, '1.0', '1.0', datetime(2000, 1, 1))
+        self.backend.store([
+            StaticFile(self.versions[0], 'a.js', '/a.js', b'a'),
+            StaticFile(self.versions[1], 'a.js', '/a.js', b'a'),
+            StaticFile(version, 'a.js', '/a.js', b'a'),
+        ])
+        users = self.backend.retrieve_static_file_users_by_checksum(b'a')
+        self.assertEqual(users, set(self.versions + [version]))
+        self.assertEqual(
+            {id(user) for user in users},
+            {id(user) for user in self.backend.retrieve_static_file_users_by_webroot_paths('/a.js')})
+        self.assertEqual(
+            {id(user) for user in users},
+            {id(user)
+             for retrieved_package in self.backend.retrieve_packages()
+             for user in self.backend.retrieve_versions(retrieved_package, indexed_only=False)})
+        self.assertEqual(len({id(user.software_package) for user in users}), 2)
+        self.assertEqual(
+            {user.software_package.name: user.software_package.alternative_names
+             for user in users},
+            {'Foo': [], 'Bar': ['barcms']})
@@ -0,0 +1,23 @@
+from unittest import TestCase
+
+import settings
+from backends.compiled_index import CompiledIndexBackend
+from sweep_parameters import parse_grid
+
+
+class TestParseGrid(TestCase):
+    def test_grid(self):
+        self.assertEqual(
+            parse_grid(['min-support=0.1,0.2', 'MAX_ITERATIONS=5']), [
+                ('MIN_SUPPORT', [0.1, 0.2]),
+                ('MAX_ITERATIONS', [5]),
+            ])
+
+    def test_unknown_setting(self):
+        with self.assertRaises(ValueError):
+            parse_grid(['BACKEND=sqlite'])
+
+
+class TestImport(TestCase):
+    def test_backend_is_not_wrapped(self):
+        self.assertNotIsInstance(settings.BACKEND, CompiledIndexBackend)
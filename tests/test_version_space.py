@@ -0,0 +1,30 @@
+from datetime import datetime
+from unittest import TestCase
+
+from analysis.version_space import VersionSpace
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+
+
+class TestVersionSpace(TestCase):
+    def setUp(self):
+        self.space = VersionSpace()
+        package = SoftwarePackage('Foo', 'Foo Inc.')
+        self.versions = [
+            SoftwareVersion(package, name, name, datetime(2000, 1, 1))
+            for name in ('1.0', '1.1', '2.0')
+        ]
+
+    def test_bits_are_dense(self):
+        self.assertEqual(self.space.bitset(self.versions[1:]), 0b11)
+        self.assertEqual(self.space.bitset(self.versions[:2]), 0b101)
+        self.assertEqual(len(self.space), 3)
+        self.assertEqual(self.space.version(2), self.versions[0])
+
+    def test_materialize(self):
+        bitset = self.space.bitset(self.versions)
+        self.assertEqual(self.space.materialize(bitset), set(self.versions))
+        self.assertEqual(
+            self.space.materialize(bitset & ~self.space.bitset(self.versions[:1])),
+            set(self.versions[1:]))
+        self.assertEqual(self.space.materialize(0), set())
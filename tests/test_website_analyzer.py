@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Iterable
+from unittest import TestCase
+
+from analysis.asset import Asset
+from analysis.resource_cache import CachedResponse
+from analysis.version_space import version_space
+from analysis.website_analyzer import WebsiteAnalyzer
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from base.bitset import iterate_bits
+
+
+def asset(
+        name: str, expected: Iterable[SoftwareVersion],
+        using: Iterable[SoftwareVersion], idf_weight: float) -> Asset:
+    """Create a retrieved asset with the versions of the index mocked."""
+    url = 'https://example.com/' + name
+    result = Asset(url, {url: CachedResponse(url, 200, {}, None, name.encode())})
+    result.retrieve()
+    result._expected_bits = version_space.bitset(expected)
+    result._using_bits = version_space.bitset(using)
+    result._idf_weight = idf_weight
+    return result
+
+
+def failed_asset(name: str, expected: Iterable[SoftwareVersion]) -> Asset:
+    result = Asset('https://example.com/' + name)
+    result._success = False
+    result._expected_bits = version_space.bitset(expected)
+    return result
+
+
+class TestWebsiteAnalyzer(TestCase):
+    def setUp(self):
+        package = SoftwarePackage('Foo', 'Foo Inc.')
+        self.versions = [
+            SoftwareVersion(package, name, name, datetime(2000, 1, 1))
+            for name in ('1.0', '1.1', '1.2', '2.0', '2.1')
+        ]
+        v = self.versions
+        self.assets = [
+            asset('core.js', v, v, 0.1),
+            asset('app.js', v, v[:3], 0.7),
+            asset('theme.css', v[1:], v[3:], 1.3),
+            asset('new.js', v[3:], v[4:], 2.0),
+            asset('old.js', v[:2], (), 0.4),
+            failed_asset('missing.js', v[2:4]),
+        ]
+        self.analyzer = WebsiteAnalyzer('https://example.com')
+
+    def test_version_strength_matches_guesses(self):
+        self.analyzer.retrieved_resources = set(self.assets)
+        mapped_versions = self.analyzer._map_retrieved_assets_to_versions()
+        bits = list(iterate_bits(mapped_versions))
+        self.assertEqual(
+            {version_space.version(bit) for bit in bits}, set(self.versions))
+        guesses = {bit: self.analyzer._materialize_guess(bit) for bit in bits}
+        for bit, guess in guesses.items():
+            self.assertAlmostEqual(
+                self.analyzer._version_strength(bit), guess.strength)
+        self.assertEqual(
+            sorted(bits, key=self.analyzer._version_strength, reverse=True),
+            sorted(bits, key=lambda bit: guesses[bit].strength, reverse=True))
+
+    def test_incremental_mapping(self):
+        for assets in (self.assets[:2], self.assets[:5], self.assets):
+            self.analyzer.retrieved_resources.update(assets)
+            self.analyzer._map_retrieved_assets_to_versions()
+        analyzer = WebsiteAnalyzer('https://example.com')
+        analyzer.retrieved_resources = set(self.assets)
+        self.assertEqual(
+            self.analyzer._map_retrieved_assets_to_versions(),
+            analyzer._map_retrieved_assets_to_versions())
+        for bit in range(len(version_space)):
+            self.assertAlmostEqual(
+                self.analyzer._version_strength(bit),
+                analyzer._version_strength(bit))
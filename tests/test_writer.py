@@ -0,0 +1,143 @@
+import os
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from threading import Timer
+from unittest import TestCase
+from unittest.mock import patch
+
+from backends.software_package import SoftwarePackage
+from backends.software_version import SoftwareVersion
+from backends.sqlite import SqliteBackend
+from backends.static_file import StaticFile
+from definitions.definition import SoftwareDefinition
+from indexing import writer
+from indexing.indexer import Indexer, IndexerException
+from indexing.writer import IndexWriter, connect_writer, write_result
+from providers.provider import Provider
+
+
+class StaticProvider(Provider):
+    """A provider of a single version containing a single file."""
+    def get_versions(self):
+        return {self._get_software_version('1.0', '1.0', datetime(2000, 1, 1))}
+
+    def list_files(self, version):
+        return ['a.js']
+
+    def get_file_data(self, version, path):
+        return b'var a;'
+
+
+class StaticDefinition(SoftwareDefinition):
+    software_package = SoftwarePackage('Foo', 'Foo Inc.')
+    provider = StaticProvider(software_package)
+    path_map = {
+        '/': '/',
+    }
+
+
+class TestIndexWriter(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'db.sqlite3')
+        self.backend = SqliteBackend(self.path)
+        self.package = SoftwarePackage('Foo', 'Foo Inc.')
+        self.versions = [
+            SoftwareVersion(self.package, name, name, datetime(2000, 1, 1))
+            for name in ('1.0', '2.0')
+        ]
+        self.backend.store(self.package)
+        self.backend.store(self.versions)
+        for target in ('indexing.writer.BACKEND', 'indexing.indexer.BACKEND'):
+            backend_patch = patch(target, self.backend)
+            backend_patch.start()
+            self.addCleanup(backend_patch.stop)
+        # the writer connection of this process is restored afterwards
+        for target in ('indexing.writer._queue', 'indexing.writer._failed'):
+            connection_patch = patch(target, None)
+            connection_patch.start()
+            self.addCleanup(connection_patch.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def static_files(self, version: SoftwareVersion):
+        return [
+            StaticFile(version, 'a.js', '/a.js', b'a'),
+            StaticFile(version, 'b.js', '/b.js', b'b'),
+        ]
+
+    def start_writer(self, max_pending: int = 64) -> IndexWriter:
+        index_writer = IndexWriter(max_pending=max_pending)
+        index_writer.start()
+        self.addCleanup(index_writer._process.kill)
+        connect_writer(index_writer.queue, index_writer.failed)
+        return index_writer
+
+    def test_write_results(self):
+        index_writer = self.start_writer()
+        for version in self.versions:
+            write_result(version, self.static_files(version))
+        index_writer.stop()
+
+        self.assertFalse(index_writer.failed.is_set())
+        self.assertEqual(
+            index_writer.metrics['Foo'].counters['stored_static_files'], 4)
+        self.assertEqual(
+            index_writer.metrics['Foo'].counters['indexed_versions'], 2)
+        backend = SqliteBackend(self.path)
+        self.assertEqual(
+            backend.retrieve_versions(self.package), set(self.versions))
+        for version in self.versions:
+            self.assertEqual(backend.static_file_count(version), 2)
+
+    def test_failing_apply(self):
+        with patch('indexing.writer._apply', side_effect=RuntimeError):
+            index_writer = self.start_writer(max_pending=1)
+        write_result(self.versions[0], self.static_files(self.versions[0]))
+        self.assertTrue(index_writer.failed.wait(timeout=10))
+
+        # the writer keeps draining the queue, so that no worker is blocked
+        for _ in range(8):
+            index_writer.queue.put(
+                ('store', self.static_files(self.versions[1])), timeout=10)
+        write_result(self.versions[1], self.static_files(self.versions[1]))
+        index_writer.stop()
+
+        self.assertTrue(index_writer.failed.is_set())
+        self.assertEqual(index_writer._process.exitcode, 0)
+        self.assertEqual(
+            SqliteBackend(self.path).retrieve_versions(self.package), set())
+
+    def test_put_gives_up_once_failed(self):
+        index_writer = IndexWriter(max_pending=1)
+        connect_writer(index_writer.queue, index_writer.failed)
+        index_writer.queue.put(('indexed', self.versions[0], 0, None))
+
+        # the writer process is not started, so the queue stays full
+        timer = Timer(0.5, index_writer.failed.set)
+        timer.start()
+        self.assertFalse(writer._put(('indexed', self.versions[1], 0, None)))
+        timer.join()
+
+    def test_stop_after_process_died(self):
+        index_writer = self.start_writer(max_pending=1)
+        self.assertFalse(index_writer.is_failed())
+        index_writer._process.kill()
+        index_writer._process.join()
+        self.assertTrue(index_writer.is_failed())
+
+        index_writer.queue.put(('indexed', self.versions[0], 0, None))
+        index_writer.stop()
+        self.assertTrue(index_writer.failed.is_set())
+        self.assertEqual(index_writer.metrics, {})
+
+    def test_index_all_fails_with_writer(self):
+        indexer = Indexer()
+        with patch('indexing.writer._apply', side_effect=RuntimeError), \
+                patch('indexing.checksum_cache.CHECKSUM_CACHE_FILE', None), \
+                patch('indexing.indexer.definitions', [StaticDefinition]):
+            with self.assertRaises(IndexerException):
+                indexer.index_all(max_workers=1)
+        self.assertEqual(
+            SqliteBackend(self.path).retrieve_versions(self.package), set())
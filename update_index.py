@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import json
 from argparse import ArgumentParser, Namespace
 from fnmatch import fnmatch
 
@@ -9,6 +10,8 @@ from indexing.indexer import Indexer
 def index(arguments: Namespace):
     """Index all defined software packages versions."""
     indexer = Indexer()
+    indexer.incremental = arguments.incremental
+    indexer.progress = True
 
     if arguments.garbage_collect:
         indexer.gc_all()
@@ -32,8 +35,13 @@ def index(arguments: Namespace):
                 definition.software_package.name
                 for definition in limit_definitions))
 
-    indexer.index_all(
-        max_workers=arguments.max_workers, limit_definitions=limit_definitions)
+    try:
+        indexer.index_all(
+            max_workers=arguments.max_workers, limit_definitions=limit_definitions)
+    finally:
+        if arguments.metrics_file:
+            with open(arguments.metrics_file, 'w') as metrics_file:
+                json.dump(indexer.metrics_summary(), metrics_file, indent=2)
 
 
 if __name__ == '__main__':
@@ -44,6 +52,14 @@ if __name__ == '__main__':
     parser.add_argument(
         '-g', '--garbage-collect', action='store_true', default=False,
     )
+    parser.add_argument(
+        '-i', '--incremental', action='store_true', default=False,
+        help='Index only the files changed relative to the previously released version where supported (git)',
+    )
+    parser.add_argument(
+        '-m', '--metrics-file', type=str,
+        help='Write a JSON summary of the indexing metrics to the given file',
+    )
     parser.add_argument(
         '-l', '--limit-definitions', type=str,
         help='Only index software packages which name matches the given expression',